@@ -1,4 +1,13 @@
 # purchases_backend/__init__.py
-from .celery import app as celery_app
+# Приложение Celery импортируется лениво: веб-процессу Celery нужен только
+# при постановке первой задачи (см. shop/tasks.py), воркер загружает его сам.
 
-__all__ = ('celery_app',)
\ No newline at end of file
+
+def __getattr__(name):
+    if name == 'celery_app':
+        from .celery import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ('celery_app',)
@@ -1,12 +1,20 @@
 import os
 
+from django.conf import settings
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+# `celery -A config ...` импортирует этот модуль раньше настроек Django —
+# тогда процесс получает роль worker; веб-процесс, поставивший задачу, остаётся web
+if not settings.configured:
+    os.environ.setdefault("APP_ROLE", "worker")
+    # системные проверки Django (с импортом всего urlconf) воркер по умолчанию
+    # прогоняет на старте; они выполняются при деплое через manage.py check
+    os.environ.setdefault("CELERY_SKIP_CHECKS", "1")
 
-from config.sentry import init_sentry
-init_sentry()
+# Sentry подключается в settings (init_sentry) при загрузке конфигурации ниже
 
 from celery import Celery
 
 app = Celery("config")
 app.config_from_object("django.conf:settings", namespace="CELERY")
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
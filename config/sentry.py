@@ -1,30 +1,106 @@
 import os
+from functools import partial
 
+_initialized = False
 
-def init_sentry() -> None:
-    dsn = os.getenv("SENTRY_DSN")
-    if not dsn:
-        return
+# Частота трассировки по пути запроса: первое совпадение префикса.
+# Ключи — записи словаря trace_rates(); всё, что не подошло, — "default".
+# "off" действует и при решении родителя (входящий sentry-trace).
+TRACE_RULES = (
+    ("/api/v1/bench/", "off"),
+    ("/api/v1/debug/", "off"),
+    ("/api/schema", "off"),
+    ("/metrics", "off"),
+    ("/api/v1/orders/confirm/", "checkout"),
+    ("/api/v1/products", "catalog"),  # и /products-info/
+    ("/api/v1/categories/", "catalog"),
+    ("/api/v1/shops/", "catalog"),
+)
 
-    traces_sample_rate_str = os.getenv("SENTRY_TRACES_SAMPLE_RATE", "0.0")
+
+def _env_rate(name: str, default: float) -> float:
     try:
-        traces_sample_rate = float(traces_sample_rate_str)
+        return min(1.0, max(0.0, float(os.getenv(name, default))))
     except ValueError:
-        traces_sample_rate = 0.0
+        return default
 
-    send_pii = os.getenv("SENTRY_SEND_PII", "0") == "1"
 
-    import sentry_sdk
-    from sentry_sdk.integrations.django import DjangoIntegration
+def trace_rates() -> dict:
+    """Частоты из env (SENTRY_TRACES_*), по умолчанию трассировка выключена везде, кроме оформления заказа."""
+    default = _env_rate("SENTRY_TRACES_SAMPLE_RATE", 0.0)
+    return {
+        "off": 0.0,
+        "default": default,
+        "checkout": _env_rate("SENTRY_TRACES_CHECKOUT_RATE", 1.0),
+        "catalog": _env_rate("SENTRY_TRACES_CATALOG_RATE", min(default, 0.01)),
+        # задачи без родителя (Celery beat); задачи из запроса наследуют решение запроса
+        "task": _env_rate("SENTRY_TRACES_TASK_RATE", default),
+    }
+
+
+def _request_path(sampling_context: dict):
+    environ = sampling_context.get("wsgi_environ")
+    if environ is not None:
+        return environ.get("PATH_INFO", "")
+    scope = sampling_context.get("asgi_scope")
+    if scope is not None:
+        return scope.get("path", "")
+    return None
+
+
+def traces_sampler(sampling_context: dict, rates: dict) -> float:
+    """
+    traces_sampler для sentry_sdk.init: пути с правилом "off" не
+    трассируются никогда; в остальном решение родителя (входящий
+    sentry-trace, задача Celery из запроса) сохраняется, иначе частота
+    выбирается по пути запроса (TRACE_RULES) или "task" для задач Celery.
+    """
+    path = _request_path(sampling_context)
+    key = None
+    if path is not None:
+        key = next((key for prefix, key in TRACE_RULES if path.startswith(prefix)), "default")
+    if key == "off":
+        # клиент не может включить трассировку служебных эндпоинтов своим sentry-trace
+        return 0.0
+
+    parent_sampled = sampling_context.get("parent_sampled")
+    if parent_sampled is not None:
+        return float(parent_sampled)
+
+    if key is None:
+        return rates["task"] if "celery_job" in sampling_context else rates["default"]
+    return rates[key]
+
+
+def sentry_options(dsn: str) -> dict:
+    """Аргументы sentry_sdk.init (тесты добавляют к ним свой transport)."""
     from sentry_sdk.integrations.celery import CeleryIntegration
+    from sentry_sdk.integrations.django import DjangoIntegration
 
-    sentry_sdk.init(
-        dsn=dsn,
-        environment=os.getenv("SENTRY_ENVIRONMENT", "local"),
-        send_default_pii=send_pii,
-        traces_sample_rate=traces_sample_rate,
-        integrations=[
+    return {
+        "dsn": dsn,
+        "environment": os.getenv("SENTRY_ENVIRONMENT", "local"),
+        "send_default_pii": os.getenv("SENTRY_SEND_PII", "0") == "1",
+        "traces_sampler": partial(traces_sampler, rates=trace_rates()),
+        "integrations": [
             DjangoIntegration(),
-            CeleryIntegration(),
+            # заголовки sentry-trace/baggage уходят с задачей: воркер продолжает трассу запроса
+            CeleryIntegration(propagate_traces=True),
         ],
-    )
\ No newline at end of file
+    }
+
+
+def init_sentry() -> None:
+    """Подключает Sentry один раз на процесс (вызывается из settings)."""
+    global _initialized
+    if _initialized:
+        return
+
+    dsn = os.getenv("SENTRY_DSN")
+    if not dsn:
+        return
+
+    import sentry_sdk
+
+    sentry_sdk.init(**sentry_options(dsn))
+    _initialized = True
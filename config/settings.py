@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -70,11 +71,53 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'shop.db_router.PrimaryStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'social_django.middleware.SocialAuthExceptionMiddleware',
 ]
 
+# Роль процесса: web (по умолчанию) | worker (Celery) | import (load_yaml_data.py).
+# Воркерам и импорту не нужны админка, документация API и OAuth — эти
+# приложения не загружаются, и процесс стартует быстрее (manage.py importtime).
+APP_ROLE = os.getenv('APP_ROLE', 'web')
+APP_ROLES = ('web', 'worker', 'import')
+if APP_ROLE not in APP_ROLES:
+    raise ImproperlyConfigured(f'APP_ROLE must be one of {APP_ROLES}, got {APP_ROLE!r}')
+
+WEB_ONLY_APPS = [
+    'baton',
+    'django.contrib.admin',
+    'drf_spectacular',
+    'drf_spectacular_sidecar',
+    'social_django',
+]
+if APP_ROLE != 'web':
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in WEB_ONLY_APPS]
+    MIDDLEWARE = [m for m in MIDDLEWARE if not m.startswith('social_django.')]
+
+# метрики Prometheus (shop/metrics.py): GET /metrics только с Bearer-токеном
+# METRICS_TOKEN (пустой — /metrics закрыт); у воркера Celery — экспортёр на CELERY_METRICS_PORT (0 — выключен).
+# Несколько процессов: PROMETHEUS_MULTIPROC_DIR (см. README)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') == '1'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+CELERY_METRICS_PORT = int(os.getenv('CELERY_METRICS_PORT', '0'))
+if METRICS_ENABLED:
+    MIDDLEWARE = ['shop.metrics.MetricsMiddleware'] + MIDDLEWARE
+
+# сжатие ответов (shop/compression.py): zstd / br / gzip от COMPRESSION_MIN_SIZE байт;
+# сжатые тела горячих ответов кэшируются по хэшу тела на COMPRESSION_CACHE_TIMEOUT сек
+# (0 — без кэша), тела больше COMPRESSION_CACHE_MAX_SIZE не кэшируются
+COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', '1') == '1'
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_CACHE_ALIAS = os.getenv('COMPRESSION_CACHE_ALIAS', 'default')
+COMPRESSION_CACHE_TIMEOUT = int(os.getenv('COMPRESSION_CACHE_TIMEOUT', '300'))
+COMPRESSION_CACHE_MAX_SIZE = int(os.getenv('COMPRESSION_CACHE_MAX_SIZE', str(1024 * 1024)))
+if COMPRESSION_ENABLED:
+    # сразу после SecurityMiddleware — раньше всех, кто читает или меняет тело ответа
+    _index = MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1
+    MIDDLEWARE = MIDDLEWARE[:_index] + ['shop.compression.CompressionMiddleware'] + MIDDLEWARE[_index:]
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -98,13 +141,74 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.sqlite3')
+
+# Профиль SQLite для продакшена на одном узле (shop/sqlite.py): PRAGMA на каждое
+# новое соединение и BEGIN IMMEDIATE для транзакций. SQLITE_TUNING=0 — как раньше.
+SQLITE_TUNING = os.getenv('SQLITE_TUNING', '1') == '1'
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024))),
+    # отрицательное значение — размер в КиБ (здесь ~32 МБ на соединение)
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', '-32000')),
+}
+
+
+def _database(**overrides):
+    """
+    Параметры подключения из env (DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT).
+
+    DB_CONN_MAX_AGE         — время жизни постоянного соединения, сек (0 — закрывать после запроса)
+    DB_CONN_HEALTH_CHECKS   — 1: проверять постоянное соединение перед использованием
+    DB_POOL                 — 1: пул соединений psycopg (только PostgreSQL),
+                              размер — DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE
+    """
+    db = {
+        'ENGINE': DB_ENGINE,
+        'NAME': os.getenv('DB_NAME', str(BASE_DIR / 'db.sqlite3')),
+        'USER': os.getenv('DB_USER', ''),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        'HOST': os.getenv('DB_HOST', ''),
+        'PORT': os.getenv('DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0')),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', '0') == '1',
+        'OPTIONS': {},
     }
+    if 'sqlite' in DB_ENGINE and SQLITE_TUNING:
+        # блокировка на запись берётся в начале транзакции (shop/sqlite.py)
+        db['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+    if os.getenv('DB_POOL', '0') == '1' and 'postgresql' in DB_ENGINE:
+        db['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+        }
+        # пул и постоянные соединения Django несовместимы
+        db['CONN_MAX_AGE'] = 0
+    db.update(overrides)
+    return db
+
+
+DATABASES = {
+    'default': _database(),
 }
 
+# Реплики для чтения каталога (shop/db_router.py).
+# DB_REPLICAS — через запятую: хосты (PostgreSQL) или пути к файлам (SQLite).
+DATABASE_REPLICAS = []
+for _i, _replica in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    _alias = f'replica_{_i}'
+    _key = 'NAME' if 'sqlite' in DB_ENGINE else 'HOST'
+    DATABASES[_alias] = _database(**{_key: _replica.strip(), 'TEST': {'MIRROR': 'default'}})
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ['shop.db_router.ReplicaRouter']
+
+# после записи клиент ещё столько секунд читает из основной БД (cookie)
+REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', '5'))
+REPLICA_STICKY_COOKIE = 'db_primary'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -149,17 +253,18 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'shop.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 
+    # GCRA-счётчики в общем хранилище (THROTTLE_BACKEND), см. shop/throttling.py
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle',
-        'rest_framework.throttling.ScopedRateThrottle',  # ← добавили
+        'shop.throttling.AnonRateThrottle',
+        'shop.throttling.UserRateThrottle',
+        'shop.throttling.ScopedRateThrottle',
     ],
 
     'DEFAULT_THROTTLE_RATES': {
@@ -169,6 +274,20 @@ REST_FRAMEWORK = {
     },
 }
 
+SIMPLE_JWT = {
+    # username / is_staff / is_superuser в токене — для JWT_USER_RESOLUTION=claims
+    'TOKEN_OBTAIN_SERIALIZER': 'shop.authentication.UserClaimsTokenObtainPairSerializer',
+}
+
+# откуда брать пользователя по JWT: db | cache | claims (см. shop/authentication.py);
+# 'cache' по умолчанию только с общим кэшем (CACHE_REDIS=1): с locmem сброс
+# кэша при деактивации или смене пароля не дошёл бы до других воркеров
+JWT_USER_RESOLUTION = os.getenv(
+    'JWT_USER_RESOLUTION', 'cache' if os.getenv('CACHE_REDIS', '0') == '1' else 'db',
+)
+JWT_USER_CACHE_TIMEOUT = int(os.getenv('JWT_USER_CACHE_TIMEOUT', '60'))
+JWT_USER_CACHE_ALIAS = 'default'
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Purchases API',
     'DESCRIPTION': 'Backend сервиса автоматизации закупок. Здесь описание проекта, что делает API.',
@@ -180,6 +299,11 @@ SPECTACULAR_SETTINGS = {
     'COMPONENT_NO_READ_ONLY_REQUIRED': True,
 }
 
+# заранее собранная схема (manage.py build_openapi_schema, см. shop/schema.py)
+OPENAPI_SCHEMA_DIR = os.getenv('OPENAPI_SCHEMA_DIR', str(BASE_DIR / 'var' / 'openapi'))
+# в DEBUG схема по умолчанию строится на каждый запрос
+OPENAPI_SCHEMA_CACHE_IN_DEBUG = os.getenv('OPENAPI_SCHEMA_CACHE_IN_DEBUG', 'False') == 'True'
+
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 
 # куда сохранять результаты задач (можно тоже в Redis, можно отключить)
@@ -194,6 +318,99 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE  # если TIME_ZONE уже задан в settings
 CELERY_ENABLE_UTC = False
 
+# периодические задачи (celery -A config.celery beat)
+CELERY_BEAT_SCHEDULE = {
+    'refresh-shop-daily-sales': {
+        'task': 'shop.tasks.refresh_shop_daily_sales',
+        'schedule': 5 * 60,
+    },
+    'compact-price-history': {
+        'task': 'shop.tasks.compact_price_history',
+        'schedule': 24 * 60 * 60,
+    },
+    'refresh-category-counts': {
+        'task': 'shop.tasks.refresh_category_counts',
+        'schedule': 24 * 60 * 60,
+    },
+    'archive-orders': {
+        'task': 'shop.tasks.archive_orders',
+        'schedule': 60 * 60,
+    },
+    'cleanup-baskets': {
+        'task': 'shop.tasks.cleanup_baskets',
+        'schedule': 60 * 60,
+    },
+    'refresh-related-products': {
+        'task': 'shop.tasks.refresh_related_products',
+        'schedule': 60 * 60,
+    },
+    'build-catalog-snapshots': {
+        'task': 'shop.tasks.build_catalog_snapshots',
+        'schedule': 60,
+    },
+}
+
+# история цен (shop/price_history.py): сколько дней хранить все изменения,
+# сколько дней хранить историю вообще и сколько дней сжимать за один запуск
+PRICE_HISTORY_RAW_DAYS = int(os.getenv('PRICE_HISTORY_RAW_DAYS', '90'))
+PRICE_HISTORY_KEEP_DAYS = int(os.getenv('PRICE_HISTORY_KEEP_DAYS', '730'))
+PRICE_HISTORY_COMPACT_DAYS_PER_RUN = int(os.getenv('PRICE_HISTORY_COMPACT_DAYS_PER_RUN', '31'))
+
+# отчёт /api/v1/partner/orders/stats/ по умолчанию читает дневную свёртку
+# ShopDailySales вместо агрегации OrderItem "на лету"
+PARTNER_STATS_USE_ROLLUP = os.getenv('PARTNER_STATS_USE_ROLLUP', '0') == '1'
+# перекрытие запусков свёртки, сек: больше самой долгой транзакции, меняющей заказ
+PARTNER_STATS_ROLLUP_LAG_SECONDS = int(os.getenv('PARTNER_STATS_ROLLUP_LAG_SECONDS', '300'))
+
+# архивация доставленных и отменённых заказов (shop/order_archive.py): через сколько
+# дней без изменений, размер пачки, пауза между пачками (сек) и пачек за запуск
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv('ORDER_ARCHIVE_AFTER_DAYS', '180'))
+ORDER_ARCHIVE_BATCH_SIZE = int(os.getenv('ORDER_ARCHIVE_BATCH_SIZE', '500'))
+ORDER_ARCHIVE_BATCH_PAUSE = float(os.getenv('ORDER_ARCHIVE_BATCH_PAUSE', '0.5'))
+ORDER_ARCHIVE_MAX_BATCHES = int(os.getenv('ORDER_ARCHIVE_MAX_BATCHES', '100'))
+
+# очистка корзин (shop/baskets.py): пустые — через часы, с товарами — через дни
+# без изменений; размер пачки и пачек за запуск
+BASKET_EMPTY_TTL_HOURS = int(os.getenv('BASKET_EMPTY_TTL_HOURS', '24'))
+BASKET_TTL_DAYS = int(os.getenv('BASKET_TTL_DAYS', '60'))
+BASKET_CLEANUP_BATCH_SIZE = int(os.getenv('BASKET_CLEANUP_BATCH_SIZE', '1000'))
+BASKET_CLEANUP_MAX_BATCHES = int(os.getenv('BASKET_CLEANUP_MAX_BATCHES', '50'))
+
+# рекомендации «с этим товаром покупают» (shop/recommendations.py):
+# сколько соседей хранить на предложение
+RELATED_PRODUCTS_TOP = int(os.getenv('RELATED_PRODUCTS_TOP', '10'))
+# отставание окна от текущего момента, сек: больше самой долгой транзакции оформления
+RELATED_PRODUCTS_LAG_SECONDS = int(os.getenv('RELATED_PRODUCTS_LAG_SECONDS', '300'))
+
+# снимки каталога (shop/catalog_snapshots.py): готовые ответы products-info
+# для ?category_id= / ?shop_id= в файлах; ACCEL_PREFIX — internal-location nginx
+# для X-Accel-Redirect (пусто — файлы отдаёт Django)
+CATALOG_SNAPSHOTS_ENABLED = os.getenv('CATALOG_SNAPSHOTS_ENABLED', '0') == '1'
+CATALOG_SNAPSHOT_DIR = os.getenv('CATALOG_SNAPSHOT_DIR', str(BASE_DIR / 'var' / 'catalog'))
+CATALOG_SNAPSHOT_ACCEL_PREFIX = os.getenv('CATALOG_SNAPSHOT_ACCEL_PREFIX', '')
+
+# изображения товаров (shop/images.py): лимит загрузки (байт), лимит пикселей
+# (защита от «бомб»), большая сторона и качество JPEG хранимого оригинала
+PRODUCT_IMAGE_MAX_UPLOAD_SIZE = int(os.getenv('PRODUCT_IMAGE_MAX_UPLOAD_SIZE', str(10 * 1024 * 1024)))
+PRODUCT_IMAGE_MAX_PIXELS = int(os.getenv('PRODUCT_IMAGE_MAX_PIXELS', str(40_000_000)))
+PRODUCT_IMAGE_MAX_SIDE = int(os.getenv('PRODUCT_IMAGE_MAX_SIDE', '2000'))
+PRODUCT_IMAGE_QUALITY = int(os.getenv('PRODUCT_IMAGE_QUALITY', '88'))
+
+# загрузки больше 256 КБ пишутся во временный файл, а не в память
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+
+MEDIA_URL = os.getenv('MEDIA_URL', '/media/')
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', str(BASE_DIR / 'media'))
+
+# миниатюры ImageKit создаёт задача, а не обращение к .url в запросе
+IMAGEKIT_DEFAULT_CACHEFILE_STRATEGY = 'shop.images.DeferredThumbnails'
+
+# максимум строк в одном POST /api/v1/partner/stock/
+PARTNER_STOCK_MAX_ROWS = int(os.getenv('PARTNER_STOCK_MAX_ROWS', '10000'))
+
+# сколько секунд воркер доверяет своему кэшу статусов магазинов (shop/active_shops.py)
+ACTIVE_SHOPS_CACHE_TTL = int(os.getenv('ACTIVE_SHOPS_CACHE_TTL', '30'))
+
 BATON = {
     'SITE_HEADER': 'Purchases Backend',
 }
@@ -220,6 +437,34 @@ def _with_redis_db(redis_url: str, db: str) -> str:
         return f"{base}/{db}"
     return f"{url}/{db}"
 
+# --- Django cache ---
+# CACHE_REDIS=1 — общий Redis: сброс кэша (например, пользователя JWT) виден всем воркерам
+if os.getenv("CACHE_REDIS", "0") == "1":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": _with_redis_db(REDIS_URL, os.getenv("CACHE_REDIS_DB", "4")),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# --- Rate limiting (shop/throttling.py) ---
+# Счётчики общие для всех воркеров — в Redis, если задан REDIS_URL; без него
+# (runserver на машине разработчика) — память процесса. Тесты: shop/tests/runner.py
+THROTTLE_BACKEND = os.getenv(
+    "THROTTLE_BACKEND",
+    "shop.throttling.RedisRateLimitBackend" if os.getenv("REDIS_URL") else "shop.throttling.LocMemRateLimitBackend",
+)
+THROTTLE_REDIS_URL = _with_redis_db(REDIS_URL, os.getenv("THROTTLE_REDIS_DB", "3"))
+
+# manage.py test: лимиты в памяти процесса при любом окружении (см. runner)
+TEST_RUNNER = "shop.tests.runner.TestRunner"
+
 if CACHEOPS_ENABLED:
     INSTALLED_APPS += ["cacheops"]
 
@@ -0,0 +1,50 @@
+"""
+Настройки сервера для нагрузочного теста (manage.py loadtest, shop/loadtest/).
+
+Отдельная SQLite-БД вместо рабочей, Celery в eager-режиме (задачи выполняются
+в запросе, брокер в памяти), письма — в память (locmem), без Redis и без
+ограничения частоты запросов.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, REST_FRAMEWORK, SQLITE_TUNING
+
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost', 'testserver']
+
+LOADTEST_DB_NAME = os.getenv('LOADTEST_DB_NAME', str(BASE_DIR / 'var' / 'loadtest.sqlite3'))
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': LOADTEST_DB_NAME,
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE'} if SQLITE_TUNING else {},
+    },
+}
+DATABASE_REPLICAS = []
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+CACHEOPS_ENABLED = False
+# один процесс сервера: кэш в памяти общий для всех запросов, сброс виден сразу
+JWT_USER_RESOLUTION = 'cache'
+THROTTLE_BACKEND = 'shop.throttling.LocMemRateLimitBackend'
+REST_FRAMEWORK = {**REST_FRAMEWORK, 'DEFAULT_THROTTLE_CLASSES': []}
+
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_BROKER_URL = 'memory://'
+CELERY_RESULT_BACKEND = 'cache+memory://'
+
+# письма "отправляются" (send_order_emails проверяет EMAIL_HOST), но остаются в памяти
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+EMAIL_HOST = 'localhost'
+
+# пользователи нагрузочного теста получают токен один раз; PBKDF2 здесь не нужен
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# manage.py loadtest --seed-only заполняет БД только при этих настройках
+LOADTEST = True
@@ -3,10 +3,11 @@ from django.urls import path, include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from shop.views import RegisterView, ProductInfoListView
 from drf_spectacular.views import (
-    SpectacularAPIView,
     SpectacularSwaggerView,
     SpectacularRedocView,
 )
+from shop.schema import CachedSpectacularAPIView
+from shop.metrics import metrics_view
 
 
 urlpatterns = [
@@ -25,13 +26,16 @@ urlpatterns = [
     # Все остальные эндпоинты из приложения shop (магазины, категории, товары, заказы, контакты)
     path('api/v1/', include('shop.urls')),
 
+    # Метрики Prometheus (shop/metrics.py)
+    path('metrics', metrics_view, name='metrics'),
+
     # Логин/логаут для DRF Browsable API
     path('api-auth/', include('rest_framework.urls')),
 
     # ----- DRF Spectacular -----
 
-    # OpenAPI schema (JSON/YAML)
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+    # OpenAPI schema (JSON/YAML), заранее собранная — см. shop/schema.py
+    path('api/schema/', CachedSpectacularAPIView.as_view(), name='schema'),
 
     # Swagger UI
     path(
@@ -3,9 +3,11 @@ import django
 import yaml
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("APP_ROLE", "import")  # без админки, документации API и OAuth
 django.setup()
 
-from shop.models import Shop, Category, Product, ProductInfo, Parameter, ProductParameter
+from shop.models import Shop, Category, Product, ProductInfo, Parameter, ProductParameter, parse_number
+from shop import catalog_cache, catalog_snapshots, category_counts, price_history
 
 # ✅ исправили путь
 file_path = os.path.join(os.path.dirname(__file__), "data", "shop1.yaml")
@@ -17,49 +19,81 @@ with open(file_path, "r", encoding="utf-8") as file:
 shop_name = data["shop"]
 shop, _ = Shop.objects.get_or_create(name=shop_name)
 
-# 2️⃣ Категории
-categories_map = {}
-
-for category_data in data["categories"]:
-    cat_id = category_data["id"]
-    cat_name = category_data["name"]
-
-    category, _ = Category.objects.get_or_create(name=cat_name)
-    category.shops.add(shop)
-
-    categories_map[cat_id] = category
-
-# 3️⃣ Товары
-for product_data in data["goods"]:
-    category_id = product_data["category"]
-    category = categories_map.get(category_id)
-    if category is None:
-        continue
-
-    product, _ = Product.objects.get_or_create(
-        name=product_data["name"],
-        category=category,
-    )
-
-    # ✅ используем update_or_create
-    product_info, _ = ProductInfo.objects.update_or_create(
-        product=product,
-        shop=shop,
-        external_id=product_data["id"],
-        defaults={
-            "model": product_data.get("model", ""),
-            "price": product_data["price"],
-            "price_rrc": product_data.get("price_rrc") or product_data["price"],
-            "quantity": product_data.get("quantity", 0),
-        },
-    )
-
-    for param_name, param_value in product_data.get("parameters", {}).items():
-        parameter, _ = Parameter.objects.get_or_create(name=param_name)
-        ProductParameter.objects.update_or_create(
-            product_info=product_info,
-            parameter=parameter,
-            defaults={"value": str(param_value)},
+# снимки каталога помечаются один раз в конце (invalidate_offers),
+# а не сигналом на каждое сохранение предложения и параметра
+with catalog_snapshots.suspended():
+    # 2️⃣ Категории
+    categories_map = {}
+
+    for category_data in data["categories"]:
+        cat_id = category_data["id"]
+        cat_name = category_data["name"]
+
+        category, _ = Category.objects.get_or_create(name=cat_name)
+        category.shops.add(shop)
+
+        categories_map[cat_id] = category
+
+    # 3️⃣ Товары
+    # цены и остатки до импорта — чтобы записать в историю только изменения
+    previous = {
+        offer_id: (price, quantity)
+        for offer_id, price, quantity in ProductInfo.objects.filter(shop=shop).values_list(
+            "id", "price", "quantity"
+        )
+    }
+    offers = []
+
+    for product_data in data["goods"]:
+        category_id = product_data["category"]
+        category = categories_map.get(category_id)
+        if category is None:
+            continue
+
+        product, _ = Product.objects.get_or_create(
+            name=product_data["name"],
+            category=category,
         )
 
+        # ✅ используем update_or_create
+        product_info, _ = ProductInfo.objects.update_or_create(
+            product=product,
+            shop=shop,
+            external_id=product_data["id"],
+            defaults={
+                "model": product_data.get("model", ""),
+                "price": product_data["price"],
+                "price_rrc": product_data.get("price_rrc") or product_data["price"],
+                "quantity": product_data.get("quantity", 0),
+            },
+        )
+        offers.append(product_info)
+
+        for param_name, param_value in product_data.get("parameters", {}).items():
+            # тип нового параметра определяем по первому значению;
+            # value_num заполняется в ProductParameter.save()
+            parameter, _ = Parameter.objects.get_or_create(
+                name=param_name,
+                defaults={
+                    "value_type": (
+                        Parameter.TYPE_NUMBER if parse_number(param_value) is not None
+                        else Parameter.TYPE_STRING
+                    ),
+                },
+            )
+            ProductParameter.objects.update_or_create(
+                product_info=product_info,
+                parameter=parameter,
+                defaults={"value": str(param_value)},
+            )
+
+# история цен — одной пачкой после импорта
+price_history.record(offers, previous)
+
+# счётчики предложений у категорий прайса и их предков
+category_counts.refresh(category.id for category in categories_map.values())
+
+# ORM-кэш и снимки каталога по категориям прайса
+catalog_cache.invalidate_offers(shop.id, [category.id for category in categories_map.values()])
+
 print("✅ Данные успешно загружены в базу!")
@@ -0,0 +1,55 @@
+"""
+Кэш статусов магазинов (Shop.is_active) в памяти процесса.
+
+Каталог и корзина проверяют статус магазина по shop_id уже загруженных
+строк, поэтому проверка не добавляет JOIN к shop ни в один запрос.
+Набор перечитывается одним запросом после сброса или по истечении TTL.
+
+Сброс делают сигналы post_save/post_delete модели Shop (shop/signals.py)
+в том процессе, где магазин изменили. Остальные воркеры подхватят
+изменение не позже чем через ACTIVE_SHOPS_CACHE_TTL секунд.
+"""
+import time
+
+from django.conf import settings
+
+from .models import Shop
+
+# (момент загрузки, активные id, неактивные id)
+_state = None
+
+
+def _load():
+    global _state
+    active, inactive = set(), set()
+    for shop_id, is_active in Shop.objects.values_list('id', 'is_active'):
+        (active if is_active else inactive).add(shop_id)
+    _state = (time.monotonic(), frozenset(active), frozenset(inactive))
+    return _state
+
+
+def _get_state():
+    state = _state
+    if state is None or time.monotonic() - state[0] > settings.ACTIVE_SHOPS_CACHE_TTL:
+        state = _load()
+    return state
+
+
+def active_shop_ids():
+    """id магазинов, которые принимают заказы."""
+    return _get_state()[1]
+
+
+def inactive_shop_ids():
+    """id отключённых магазинов (обычно их единицы — удобно для exclude)."""
+    return _get_state()[2]
+
+
+def is_shop_active(shop_id):
+    return shop_id not in inactive_shop_ids()
+
+
+def invalidate():
+    """Сбросить кэш; следующий вызов перечитает статусы из БД."""
+    global _state
+    _state = None
@@ -1,4 +1,9 @@
 from django.contrib import admin
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
 from .models import (
     Shop,
     Category,
@@ -9,43 +14,217 @@ from .models import (
     Contact,
     Order,
     OrderItem,
+    ShopOrder,
+    ArchivedOrder,
+    ArchivedOrderItem,
 )
 
 
-class ProductParameterInline(admin.TabularInline):
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для больших таблиц: для списка без фильтров на PostgreSQL
+    берёт оценку числа строк из статистики (pg_class.reltuples) вместо
+    полного COUNT(*). На небольших таблицах и с фильтрами — обычный COUNT.
+    """
+    # ниже этого числа строк точный COUNT дешевле и приятнее
+    estimate_threshold = 100_000
+
+    @cached_property
+    def count(self):
+        estimate = self._estimated_count()
+        if estimate is not None and estimate > self.estimate_threshold:
+            return estimate
+        return super().count
+
+    def _estimated_count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where:
+            return None
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [self.object_list.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Общие настройки списков для больших таблиц:
+    без полного COUNT(*) для "показать всё" и с оценкой числа строк.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class LabelFreeRawIdWidget(ForeignKeyRawIdWidget):
+    """
+    Поле id со значком поиска, но без подписи выбранного объекта:
+    стандартный виджет делает за подписью отдельный запрос на каждую строку.
+    """
+
+    def label_and_url_for_value(self, value):
+        return "", ""
+
+
+class RawIdTabularInline(admin.TabularInline):
+    """
+    Инлайн для больших таблиц: внешние ключи из raw_id_fields вводятся
+    по id (без <select> со всеми объектами и без запроса на строку),
+    а подпись показывается read-only полем из select_related.
+    """
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.raw_id_fields:
+            kwargs["widget"] = LabelFreeRawIdWidget(
+                db_field.remote_field, self.admin_site, using=kwargs.get("using"),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class ProductParameterInline(RawIdTabularInline):
     model = ProductParameter
     extra = 1
+    raw_id_fields = ("parameter",)
+    fields = ("parameter", "parameter_name", "value")
+    readonly_fields = ("parameter_name",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("parameter")
+
+    @admin.display(description="Параметр")
+    def parameter_name(self, obj):
+        return obj.parameter.name if obj.parameter_id else ""
 
 
 @admin.register(ProductInfo)
-class ProductInfoAdmin(admin.ModelAdmin):
+class ProductInfoAdmin(LargeTableAdmin):
     list_display = ("id", "product", "shop", "price", "quantity")
     list_filter = ("shop", "product__category")
+    list_select_related = ("product", "shop")
+    # поиск по началу названия с учётом регистра: LIKE 'abc%' без UPPER()
+    # обслуживается индексом Product.name (в PostgreSQL — его *_like-индексом
+    # с varchar_pattern_ops), а "^" (istartswith) — нет; "=" — точное совпадение
+    search_fields = ("product__name__startswith", "=external_id")
+    autocomplete_fields = ("product", "shop")
     inlines = [ProductParameterInline]
 
 
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
+class OrderItemAdmin(LargeTableAdmin):
     list_display = ("order", "product_info", "quantity")
+    list_select_related = ("order", "product_info__product", "product_info__shop")
+    raw_id_fields = ("order", "product_info", "shop_order")
 
 
-class OrderItemInline(admin.TabularInline):
+class OrderItemInline(RawIdTabularInline):
     model = OrderItem
     extra = 1
+    raw_id_fields = ("product_info",)
+    fields = ("product_info", "offer", "quantity")
+    readonly_fields = ("offer",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            "product_info__product",
+            "product_info__shop",
+        )
+
+    @admin.display(description="Товар")
+    def offer(self, obj):
+        return str(obj.product_info) if obj.product_info_id else ""
+
+
+class ShopOrderInline(admin.TabularInline):
+    """Подзаказы магазинов создаются при оформлении (shop/shop_orders.py)."""
+    model = ShopOrder
+    fields = ("shop", "items_count", "total")
+    readonly_fields = fields
+    can_delete = False
+    extra = 0
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("shop")
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(LargeTableAdmin):
     list_display = ("id", "user", "status", "created_at")
     list_filter = ("status",)
-    inlines = [OrderItemInline]
+    list_select_related = ("user",)
+    search_fields = ("=id", "^user__username")
+    raw_id_fields = ("user", "contact")
+    inlines = [OrderItemInline, ShopOrderInline]
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    fields = ("product_info", "product_name", "shop_name", "price", "quantity")
+    readonly_fields = fields
+    can_delete = False
+    extra = 0
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(LargeTableAdmin):
+    """Архив только для просмотра: записи создаёт shop/order_archive.py."""
+    list_display = ("id", "user", "status", "total", "created_at", "archived_at")
+    list_filter = ("status",)
+    list_select_related = ("user",)
+    search_fields = ("=id", "^user__username")
+    inlines = [ArchivedOrderItemInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Shop)
+class ShopAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "is_active", "user")
+    list_select_related = ("user",)
+    search_fields = ("^name",)
+    raw_id_fields = ("user",)
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "parent", "offers_count", "subtree_offers_count")
+    list_select_related = ("parent",)
+    ordering = ("path",)
+    search_fields = ("^name",)
+    autocomplete_fields = ("parent",)
+
+
+@admin.register(Product)
+class ProductAdmin(LargeTableAdmin):
+    list_display = ("id", "name", "category")
+    list_select_related = ("category",)
+    # с учётом регистра — по индексу, см. ProductInfoAdmin
+    search_fields = ("name__startswith",)
+    autocomplete_fields = ("category",)
 
 
-admin.site.register(Shop)
-admin.site.register(Category)
-admin.site.register(Product)
-admin.site.register(Parameter)
-admin.site.register(Contact)
+@admin.register(Parameter)
+class ParameterAdmin(admin.ModelAdmin):
+    # по уникальному индексу name, см. ProductInfoAdmin
+    search_fields = ("name__startswith",)
 
 
-# Register your models here.
+@admin.register(Contact)
+class ContactAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "city", "address", "phone")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
@@ -0,0 +1,169 @@
+"""
+Агрегаты продаж для кабинета магазина-партнёра.
+
+Все расчёты делаются в SQL (GROUP BY), в Python приходят только
+итоговые строки. Выручка считается по текущей цене ProductInfo,
+т.к. OrderItem не хранит цену на момент заказа; для архивных заказов
+(ArchivedOrderItem) — по цене, сохранённой при архивации.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ArchivedOrderItem, Order, OrderItem, ShopDailySales
+
+REVENUE_FIELD = DecimalField(max_digits=14, decimal_places=2)
+
+GROUP_BY_DAY = 'day'
+GROUP_BY_PRODUCT = 'product'
+GROUP_BY_CHOICES = (GROUP_BY_DAY, GROUP_BY_PRODUCT)
+
+
+def sold_items(shop=None):
+    """Позиции оформленных (не корзина и не отменённые) заказов."""
+    qs = OrderItem.objects.filter(order__status__in=Order.SALES_STATUSES)
+    if shop is not None:
+        qs = qs.filter(product_info__shop=shop)
+    return qs
+
+
+def archived_sold_items(shop=None):
+    """То же для архива заказов (shop/order_archive.py)."""
+    qs = ArchivedOrderItem.objects.filter(
+        order__status__in=Order.SALES_STATUSES, product_info__isnull=False,
+    )
+    if shop is not None:
+        qs = qs.filter(shop=shop)
+    return qs
+
+
+def _created_range(date_from, date_to):
+    """
+    Границы по created_at для дней [date_from, date_to]:
+    фильтр по самой колонке, а не по DATE(created_at), использует индекс.
+    """
+    start = timezone.make_aware(datetime.combine(date_from, time.min))
+    end = timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min))
+    return start, end
+
+
+def live_sales(shop, date_from, date_to, group_by=GROUP_BY_DAY):
+    """
+    Продажи магазина за период [date_from, date_to] прямо по OrderItem
+    (и по архиву заказов, если период его задевает).
+    """
+    start, end = _created_range(date_from, date_to)
+    live = _group(
+        sold_items(shop)
+        .filter(order__created_at__gte=start, order__created_at__lt=end)
+        .annotate(day=TruncDate('order__created_at')),
+        group_by, units='quantity', revenue=F('quantity') * F('product_info__price'),
+    )
+    archived = _group(
+        archived_sold_items(shop)
+        .filter(order__created_at__gte=start, order__created_at__lt=end)
+        .annotate(day=TruncDate('order__created_at')),
+        group_by, units='quantity', revenue=F('quantity') * F('price'), name='product_name',
+    )
+    return _merge(live, archived, group_by) if archived else live
+
+
+def rollup_sales(shop, date_from, date_to, group_by=GROUP_BY_DAY):
+    """
+    То же самое, но по заранее посчитанной таблице ShopDailySales
+    (индекс (shop, day, product_info) — одно сканирование диапазона).
+    """
+    qs = ShopDailySales.objects.filter(shop=shop, day__gte=date_from, day__lte=date_to)
+    return _group(qs, group_by, units='units', revenue='revenue')
+
+
+def _group(qs, group_by, units, revenue, name='product_info__product__name'):
+    if group_by == GROUP_BY_PRODUCT:
+        keys = ('product_info', name)
+        ordering = ('product_info',)
+    else:
+        keys = ('day',)
+        ordering = ('day',)
+
+    rows = (
+        qs.values(*keys)
+        .annotate(
+            units_sum=Sum(units),
+            revenue_sum=Sum(revenue, output_field=REVENUE_FIELD),
+        )
+        .order_by(*ordering)
+    )
+
+    result = []
+    for row in rows:
+        item = {'units': row['units_sum'] or 0, 'revenue': row['revenue_sum'] or 0}
+        if group_by == GROUP_BY_PRODUCT:
+            item['product_info'] = row['product_info']
+            item['product'] = row[name]
+        else:
+            item['day'] = row['day']
+        result.append(item)
+    return result
+
+
+def _merge(first, second, group_by):
+    """Складывает две выборки _group() с одинаковой группировкой."""
+    key = 'product_info' if group_by == GROUP_BY_PRODUCT else 'day'
+    merged = {row[key]: dict(row) for row in first}
+    for row in second:
+        if row[key] in merged:
+            merged[row[key]]['units'] += row['units']
+            merged[row[key]]['revenue'] += row['revenue']
+        else:
+            merged[row[key]] = dict(row)
+    return [merged[k] for k in sorted(merged)]
+
+
+def rebuild_daily_sales(days):
+    """
+    Пересчитывает ShopDailySales за указанные дни (по всем магазинам).
+
+    Каждый день пересобирается целиком в своей транзакции:
+    старые строки удаляются, новые вставляются одним bulk_create.
+    Возвращает количество записанных строк.
+    """
+    written = 0
+    for day in sorted(set(days)):
+        start, end = _created_range(day, day)
+        totals = {}
+        for source, shop_field, price_field in (
+            (sold_items(), 'product_info__shop_id', 'product_info__price'),
+            (archived_sold_items(), 'shop_id', 'price'),
+        ):
+            rows = (
+                source
+                .filter(order__created_at__gte=start, order__created_at__lt=end)
+                .values(shop_field, 'product_info_id')
+                .annotate(
+                    units=Sum('quantity'),
+                    revenue=Sum(F('quantity') * F(price_field), output_field=REVENUE_FIELD),
+                )
+                .order_by()
+            )
+            for row in rows:
+                key = (row[shop_field], row['product_info_id'])
+                units, revenue = totals.get(key, (0, 0))
+                totals[key] = (units + row['units'], revenue + row['revenue'])
+        objs = [
+            ShopDailySales(
+                shop_id=shop_id,
+                product_info_id=product_info_id,
+                day=day,
+                units=units,
+                revenue=revenue,
+            )
+            for (shop_id, product_info_id), (units, revenue) in totals.items()
+        ]
+        with transaction.atomic():
+            ShopDailySales.objects.filter(day=day).delete()
+            ShopDailySales.objects.bulk_create(objs, batch_size=1000)
+        written += len(objs)
+    return written
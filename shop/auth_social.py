@@ -3,7 +3,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from social_django.utils import load_backend, load_strategy
 from django.contrib.auth import login
-from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import UserClaimsTokenObtainPairSerializer
 
 
 class SocialLoginView(APIView):
@@ -33,7 +33,7 @@ class SocialLoginView(APIView):
 
         if user and user.is_active:
             login(request, user)
-            refresh = RefreshToken.for_user(user)
+            refresh = UserClaimsTokenObtainPairSerializer.get_token(user)
 
             return Response({
                 "refresh": str(refresh),
@@ -0,0 +1,114 @@
+"""
+JWT-аутентификация без обращения к auth_user на каждый запрос.
+
+Стандартный JWTAuthentication из simplejwt загружает пользователя из БД
+на каждом запросе. Режим задаётся настройкой JWT_USER_RESOLUTION:
+
+- 'db'     — как в simplejwt, запрос к БД каждый раз;
+- 'cache'  — поля пользователя для аутентификации (CACHED_FIELDS, без
+             хэша пароля) кэшируются на JWT_USER_CACHE_TIMEOUT секунд, кэш
+             сбрасывается сигналами при сохранении/удалении User (деактивация,
+             смена пароля). Сброс виден всем воркерам только с общим кэшем
+             (CACHE_REDIS=1), поэтому без него по умолчанию режим 'db';
+- 'claims' — пользователь собирается из claims токена (username, is_staff,
+             is_superuser кладутся при выдаче) без БД вообще. Изменения
+             пользователя видны только после выпуска нового access-токена.
+             Токены без этих claims обрабатываются как в режиме 'cache'.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+MODE_DB = 'db'
+MODE_CACHE = 'cache'
+MODE_CLAIMS = 'claims'
+
+USER_CLAIMS = ('username', 'is_staff', 'is_superuser')
+# поля пользователя в кэше режима 'cache'
+CACHED_FIELDS = USER_CLAIMS + ('is_active',)
+
+
+def user_cache_key(user_id):
+    return f'jwt_user:v2:{user_id}'
+
+
+def get_user_cache():
+    return caches[settings.JWT_USER_CACHE_ALIAS]
+
+
+def invalidate_user(user_id):
+    get_user_cache().delete(user_cache_key(user_id))
+
+
+class UserClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Кладёт в токен поля пользователя, нужные режиму 'claims'."""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        mode = settings.JWT_USER_RESOLUTION
+        if mode == MODE_DB:
+            return super().get_user(validated_token)
+
+        if mode == MODE_CLAIMS and all(claim in validated_token for claim in USER_CLAIMS):
+            return self._user_from_claims(validated_token)
+
+        return self._cached_user(validated_token)
+
+    def _user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def _cached_user(self, validated_token):
+        cache = get_user_cache()
+        user_id = self._user_id(validated_token)
+        key = user_cache_key(user_id)
+
+        data = cache.get(key)
+        if data is None:
+            # проверки is_active и отзыва токена делает simplejwt
+            user = super().get_user(validated_token)
+            # в кэш — только поля для аутентификации, без хэша пароля
+            data = {field: getattr(user, field) for field in CACHED_FIELDS}
+            if api_settings.CHECK_REVOKE_TOKEN:
+                data['revoke'] = get_md5_hash_password(user.password)
+            cache.set(key, data, settings.JWT_USER_CACHE_TIMEOUT)
+            return user
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not data['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != data.get('revoke'):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+        return self._build_user(user_id, data)
+
+    def _user_from_claims(self, validated_token):
+        fields = {claim: validated_token[claim] for claim in USER_CLAIMS}
+        return self._build_user(self._user_id(validated_token), {**fields, 'is_active': True})
+
+    @staticmethod
+    def _build_user(user_id, fields):
+        user_model = get_user_model()
+        user = user_model(**{api_settings.USER_ID_FIELD: user_id}, **fields)
+        # объект соответствует существующей строке — годится для фильтров и FK
+        user._state.adding = False
+        user._state.db = 'default'
+        return user
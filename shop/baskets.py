@@ -0,0 +1,74 @@
+"""
+Очистка брошенных корзин (Order со статусом basket).
+
+- пустые корзины, не менявшиеся BASKET_EMPTY_TTL_HOURS, удаляются;
+- корзины с товарами, не менявшиеся BASKET_TTL_DAYS, удаляются вместе с позициями.
+
+"Не менялась" — по Order.updated_at: OrderViewSet.basket обновляет его
+при каждом изменении позиций. Удаление идёт пачками по
+BASKET_CLEANUP_BATCH_SIZE, не больше BASKET_CLEANUP_MAX_BATCHES пачек
+за запуск. Каждая пачка удаляется в транзакции: строки корзин
+блокируются (SELECT ... FOR UPDATE) с повторной проверкой условия
+устаревания, и удаляются только прошедшие её. Изменения корзины
+в OrderViewSet берут ту же блокировку, поэтому корзина, которую успели
+изменить между выборкой и удалением, остаётся вместе с позициями.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Order, OrderItem
+
+
+def _has_items():
+    return Exists(OrderItem.objects.filter(order=OuterRef("pk")))
+
+
+def empty_baskets(now=None):
+    cutoff = (now or timezone.now()) - timedelta(hours=settings.BASKET_EMPTY_TTL_HOURS)
+    return Order.objects.filter(status=Order.STATUS_BASKET, updated_at__lt=cutoff).filter(~_has_items())
+
+
+def stale_baskets(now=None):
+    cutoff = (now or timezone.now()) - timedelta(days=settings.BASKET_TTL_DAYS)
+    return Order.objects.filter(status=Order.STATUS_BASKET, updated_at__lt=cutoff)
+
+
+def _delete_batch(queryset, ids):
+    """Удаляет корзины ids, которые под блокировкой всё ещё попадают в queryset."""
+    with transaction.atomic():
+        locked = list(queryset.filter(pk__in=ids).select_for_update().values_list("pk", flat=True))
+        if not locked:
+            return 0
+        # позиции удаляются каскадом одним DELETE ... WHERE order_id IN (...)
+        _, per_model = Order.objects.filter(pk__in=locked).delete()
+    return per_model.get(Order._meta.label, 0)
+
+
+def _delete_in_batches(queryset, batch_size, max_batches):
+    deleted = 0
+    for _ in range(max_batches):
+        ids = list(queryset.order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        deleted += _delete_batch(queryset, ids)
+    return deleted
+
+
+def cleanup(batch_size=None, max_batches=None):
+    """
+    Удаляет пустые и устаревшие корзины. Возвращает отчёт:
+    {"empty": ..., "expired": ..., "seconds": ...}.
+    """
+    batch_size = batch_size or settings.BASKET_CLEANUP_BATCH_SIZE
+    max_batches = max_batches or settings.BASKET_CLEANUP_MAX_BATCHES
+    started = time.monotonic()
+    now = timezone.now()
+
+    empty = _delete_in_batches(empty_baskets(now), batch_size, max_batches)
+    expired = _delete_in_batches(stale_baskets(now), batch_size, max_batches)
+    return {"empty": empty, "expired": expired, "seconds": round(time.monotonic() - started, 3)}
@@ -0,0 +1,28 @@
+"""
+Сброс кэшей каталога после массовых изменений предложений.
+
+Массовые операции (bulk_update, queryset.update) не вызывают сигналов
+моделей, поэтому кэши, зависящие от ProductInfo, сбрасываются явно.
+"""
+from django.conf import settings
+
+from . import catalog_snapshots
+from .models import ProductInfo
+
+
+def invalidate_offers(shop_id=None, category_ids=None):
+    """
+    Предложения магазина shop_id (или всех магазинов) в категориях
+    category_ids (или во всех) изменились: сбрасываем ORM-кэш cacheops
+    по ProductInfo, если он включён, и помечаем устаревшими снимки
+    каталога (shop/catalog_snapshots.py).
+    """
+    if getattr(settings, 'CACHEOPS_ENABLED', False):
+        from cacheops import invalidate_model
+
+        invalidate_model(ProductInfo)
+
+    catalog_snapshots.mark_stale(
+        shop_ids=None if shop_id is None else [shop_id],
+        category_ids=category_ids,
+    )
@@ -0,0 +1,243 @@
+"""
+Снимки каталога: готовые ответы /api/v1/products-info/ в файлах.
+
+Большая часть анонимных запросов — одни и те же страницы категорий
+и магазинов. Для ?category_id=N и ?shop_id=N ответ заранее рендерится
+в CATALOG_SNAPSHOT_DIR — {scope}-{id}.json, .json.gz и, если установлен
+brotli, .json.br — и дальше отдаётся как статический файл:
+
+- версии (CatalogSnapshot.version) поднимают те, кто меняет предложения
+  и попадающие в ответ поля (catalog_cache.invalidate_offers, сигналы
+  Shop/ProductInfo/Product/Category/ProductParameter/Parameter) —
+  одним UPDATE, без рендеринга;
+- задача shop.tasks.build_catalog_snapshots пересобирает только снимки,
+  у которых версия изменилась; файлы пишутся атомарно (временный файл
+  и os.replace), читатель видит либо старый, либо новый файл целиком;
+- ProductInfoListView отдаёт файл, если запрос совпадает со снимком
+  и снимок собран из текущей версии, иначе строит ответ как обычно.
+  С CATALOG_SNAPSHOT_ACCEL_PREFIX файл отдаёт nginx (X-Accel-Redirect).
+"""
+import gzip
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import F
+from django.http import FileResponse, HttpRequest, HttpResponse, QueryDict
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from . import active_shops, compression, metrics
+from .models import CatalogSnapshot, Category, Shop
+
+try:
+    import brotli
+except ImportError:  # brotli не обязателен: без него пишутся только .json и .json.gz
+    brotli = None
+
+PARAMS = {
+    CatalogSnapshot.SCOPE_CATEGORY: 'category_id',
+    CatalogSnapshot.SCOPE_SHOP: 'shop_id',
+}
+SCOPES = {param: scope for scope, param in PARAMS.items()}
+# (Content-Encoding, суффикс файла) в порядке предпочтения
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _path(scope, object_id):
+    return Path(settings.CATALOG_SNAPSHOT_DIR) / f'{scope}-{object_id}.json'
+
+
+def _write(path, body):
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    tmp.write_bytes(body)
+    os.replace(tmp, path)
+
+
+def _remove(scope, object_id):
+    path = _path(scope, object_id)
+    for suffix in ('', '.gz', '.br'):
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def snapshot_key(params):
+    """(scope, id), если query-параметры — ровно ?category_id=N или ?shop_id=N."""
+    if len(params) != 1:
+        return None
+    param, value = next(iter(params.items()))
+    if param not in SCOPES or not value.isdigit():
+        return None
+    return SCOPES[param], int(value)
+
+
+# ---------- пометка устаревших снимков ----------
+
+# массовая операция сама пометит снимки одним вызовом в конце (suspended())
+_suspended = ContextVar('catalog_snapshots_suspended', default=False)
+
+
+@contextmanager
+def suspended():
+    """
+    Сигналы моделей не помечают снимки внутри блока: массовые изменения
+    (импорт прайса) вызывают catalog_cache.invalidate_offers один раз после него.
+    """
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def tracking():
+    """Нужно ли сигналам моделей помечать снимки (и читать для этого БД)."""
+    return settings.CATALOG_SNAPSHOTS_ENABLED and not _suspended.get()
+
+
+def mark_stale(shop_ids=None, category_ids=None):
+    """
+    Поднимает версии снимков магазинов shop_ids и категорий category_ids
+    вместе с их предками (None — все снимки этого вида). При выключенных
+    снимках ничего не делает: после включения их пересобирают с --force.
+    """
+    if not settings.CATALOG_SNAPSHOTS_ENABLED:
+        return
+    snapshots = CatalogSnapshot.objects.all()
+    stale = CatalogSnapshot.objects.none()
+    for scope, ids in ((CatalogSnapshot.SCOPE_SHOP, shop_ids), (CatalogSnapshot.SCOPE_CATEGORY, category_ids)):
+        if ids is None:
+            stale |= snapshots.filter(scope=scope)
+            continue
+        ids = set(ids)
+        if scope == CatalogSnapshot.SCOPE_CATEGORY and ids:
+            # ?category_id= отдаёт поддерево, поэтому меняются и снимки предков
+            paths = Category.objects.filter(pk__in=ids).values_list('path', flat=True)
+            ids |= {int(pk) for path in paths for pk in path.split('/')[:-1]}
+        if ids:
+            stale |= snapshots.filter(scope=scope, object_id__in=ids)
+    stale.update(version=F('version') + 1)
+
+
+# ---------- сборка ----------
+
+def render(scope, object_id):
+    """Тело ответа ProductInfoListView для ?{category_id|shop_id}=object_id."""
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.request import Request
+
+    from .views import ProductInfoListView
+
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(mutable=True)
+    http_request.GET[PARAMS[scope]] = str(object_id)
+    view = ProductInfoListView(request=Request(http_request), format_kwarg=None, args=(), kwargs={})
+    rows = list(view.filter_queryset(view.get_queryset()))
+    return JSONRenderer().render(view.get_serializer(rows, many=True).data)
+
+
+def write(scope, object_id, body):
+    """Пишет снимок во всех кодировках; возвращает ETag (без кавычек)."""
+    path = _path(scope, object_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _write(path, body)
+    _write(path.with_name(path.name + '.gz'), gzip.compress(body, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write(path.with_name(path.name + '.br'), brotli.compress(body, quality=11))
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def _sync_rows():
+    """Строки снимков для всех категорий и магазинов; снимки удалённых — удаляются."""
+    removed = 0
+    for scope, model in ((CatalogSnapshot.SCOPE_CATEGORY, Category), (CatalogSnapshot.SCOPE_SHOP, Shop)):
+        ids = set(model.objects.values_list('id', flat=True))
+        existing = set(CatalogSnapshot.objects.filter(scope=scope).values_list('object_id', flat=True))
+        CatalogSnapshot.objects.bulk_create(
+            [CatalogSnapshot(scope=scope, object_id=object_id) for object_id in ids - existing],
+            batch_size=1000, ignore_conflicts=True,
+        )
+        gone = existing - ids
+        if gone:
+            CatalogSnapshot.objects.filter(scope=scope, object_id__in=gone).delete()
+            for object_id in gone:
+                _remove(scope, object_id)
+            removed += len(gone)
+    return removed
+
+
+def build(force=False):
+    """
+    Пересобирает устаревшие снимки (force — все).
+    Возвращает {"built": ..., "removed": ..., "seconds": ...}.
+    """
+    started = time.monotonic()
+    # статусы магазинов — из БД, а не из кэша процесса
+    active_shops.invalidate()
+    removed = _sync_rows()
+
+    snapshots = CatalogSnapshot.objects.all()
+    if not force:
+        snapshots = snapshots.filter(built_version__lt=F('version'))
+    built = 0
+    for snapshot in list(snapshots.order_by('scope', 'object_id')):
+        etag = write(snapshot.scope, snapshot.object_id, render(snapshot.scope, snapshot.object_id))
+        # версия могла вырасти во время рендеринга — тогда снимок
+        # остаётся устаревшим и соберётся в следующий раз
+        CatalogSnapshot.objects.filter(pk=snapshot.pk).update(
+            built_version=snapshot.version, etag=etag, built_at=timezone.now(),
+        )
+        built += 1
+    return {'built': built, 'removed': removed, 'seconds': time.monotonic() - started}
+
+
+# ---------- выдача ----------
+
+def serve(request):
+    """
+    Ответ из снимка для DRF-запроса к ProductInfoListView или None,
+    если снимка нет, он устарел или запрос с ним не совпадает.
+    """
+    if not settings.CATALOG_SNAPSHOTS_ENABLED or request.accepted_renderer.format != 'json':
+        return None
+    key = snapshot_key(request.query_params)
+    if key is None:
+        return None
+
+    scope, object_id = key
+    etag = (
+        CatalogSnapshot.objects.filter(scope=scope, object_id=object_id, built_version=F('version'))
+        .values_list('etag', flat=True)
+        .first()
+    )
+    path = _path(scope, object_id)
+    if not etag or not path.exists():
+        metrics.cache_result('catalog_snapshot', False)
+        return None
+    metrics.cache_result('catalog_snapshot', True)
+
+    etag = f'"{etag}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if settings.CATALOG_SNAPSHOT_ACCEL_PREFIX:
+            # сжатый вариант выбирает nginx (gzip_static / brotli_static)
+            response = HttpResponse(content_type='application/json')
+            response['X-Accel-Redirect'] = settings.CATALOG_SNAPSHOT_ACCEL_PREFIX + path.name
+        else:
+            accepted = compression.accepted_encodings(request.headers.get('Accept-Encoding', ''))
+            encoding = None
+            for coding, suffix in ENCODINGS:
+                candidate = path.with_name(path.name + suffix)
+                if coding in accepted and candidate.exists():
+                    encoding, path = coding, candidate
+                    break
+            response = FileResponse(path.open('rb'), content_type='application/json')
+            if encoding:
+                response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
@@ -0,0 +1,98 @@
+"""
+Счётчики предложений по дереву категорий.
+
+Category.offers_count — предложения в наличии (quantity > 0) у магазинов,
+принимающих заказы, у товаров самой категории; subtree_offers_count — то же
+вместе со всеми подкатегориями. Фронтенд показывает их из /categories/
+вместо запроса products-info/?category_id= на каждую категорию.
+
+Счётчики обновляют те, кто меняет остатки (импорт, POST /partner/stock/,
+reset-stock, смена статуса магазина): пересчитываются только затронутые
+категории и их предки. Полный пересчёт — задача refresh_category_counts
+(раз в сутки, страховка от правок в админке).
+"""
+from django.db.models import Count, Q
+
+from .models import Category, ProductInfo
+
+
+def counted_offers():
+    return ProductInfo.objects.filter(quantity__gt=0, shop__is_active=True)
+
+
+def refresh(category_ids=None):
+    """
+    Пересчитывает offers_count у категорий category_ids (None — у всех)
+    и subtree_offers_count у них и их предков.
+    """
+    categories = Category.objects.only("id", "path", "offers_count")
+    offers = counted_offers()
+    if category_ids is not None:
+        category_ids = set(category_ids)
+        if not category_ids:
+            return
+        categories = categories.filter(pk__in=category_ids)
+        offers = offers.filter(product__category_id__in=category_ids)
+
+    counts = dict(
+        offers.values_list("product__category_id").annotate(n=Count("id")).order_by()
+    )
+
+    changed = []
+    ancestors = set()
+    for category in categories:
+        ancestors.add(category.id)
+        ancestors.update(category.ancestor_ids())
+        count = counts.get(category.id, 0)
+        if category.offers_count != count:
+            category.offers_count = count
+            changed.append(category)
+    Category.objects.bulk_update(changed, ["offers_count"], batch_size=1000)
+
+    refresh_subtree_counts(None if category_ids is None else ancestors)
+
+
+def refresh_subtree_counts(category_ids=None):
+    """subtree_offers_count = сумма offers_count по поддереву, для category_ids (None — для всех)."""
+    targets = Category.objects.only("id", "path", "subtree_offers_count")
+    rows = Category.objects.all()
+    if category_ids is not None:
+        targets = list(targets.filter(pk__in=set(category_ids)))
+        if not targets:
+            return
+        # поддеревья всех целей — префиксами по индексу path
+        subtrees = Q()
+        for target in targets:
+            subtrees |= Q(**Category.subtree_lookup(target.path))
+        rows = rows.filter(subtrees)
+
+    totals = {}
+    for path, count in rows.values_list("path", "offers_count"):
+        for pk in path.split("/")[:-1]:
+            totals[int(pk)] = totals.get(int(pk), 0) + count
+
+    changed = []
+    for target in targets:
+        total = totals.get(target.id, 0)
+        if target.subtree_offers_count != total:
+            target.subtree_offers_count = total
+            changed.append(target)
+    Category.objects.bulk_update(changed, ["subtree_offers_count"], batch_size=1000)
+
+
+def refresh_for_offers(offer_ids):
+    """Пересчёт для категорий товаров указанных предложений."""
+    offer_ids = list(offer_ids)
+    if offer_ids:
+        refresh(
+            ProductInfo.objects.filter(id__in=offer_ids)
+            .values_list("product__category_id", flat=True).distinct()
+        )
+
+
+def refresh_for_shop(shop_id):
+    """Пересчёт для категорий, где у магазина есть предложения (смена статуса магазина)."""
+    refresh(
+        ProductInfo.objects.filter(shop_id=shop_id)
+        .values_list("product__category_id", flat=True).distinct()
+    )
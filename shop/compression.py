@@ -0,0 +1,156 @@
+"""
+Сжатие ответов API: gzip, brotli и zstd по Accept-Encoding.
+
+CompressionMiddleware сжимает ответы от COMPRESSION_MIN_SIZE байт
+с текстовыми типами (JSON, HTML, YAML, ...), если ответ ещё не сжат:
+снимки каталога (shop/catalog_snapshots.py) уже лежат сжатыми на диске
+и отдаются как есть.
+
+Сжатые байты кэшируются (COMPRESSION_CACHE_TIMEOUT) по хэшу тела
+ответа: один и тот же горячий ответ — страница каталога, схема API —
+сжимается один раз, а не на каждый запрос; остальные запросы платят
+только за хэш и чтение из кэша. Кэшируются только публичные ответы
+на анонимные GET/HEAD (без Authorization и сессии, без Cache-Control:
+private/no-store): ответы пользователям уникальны и лишь вытесняли бы
+горячие страницы из кэша, а персональные данные в общий кэш не пишутся.
+
+brotli и zstandard необязательны: без них остаётся gzip.
+Замер — `python manage.py bench_compression`.
+"""
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# уровни подобраны под сжатие в запросе: заметно меньше байт, чем
+# у несжатого ответа, за доли миллисекунды на типичный список
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+COMPRESSIBLE_TYPES = (
+    'application/json', 'application/vnd.oai.openapi', 'application/yaml',
+    'application/javascript', 'application/xml', 'text/',
+)
+
+
+def _codecs():
+    codecs = {}
+    if zstandard is not None:
+        codecs['zstd'] = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress
+    if brotli is not None:
+        codecs['br'] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+    codecs['gzip'] = lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return codecs
+
+
+# {Content-Encoding: compress(bytes) -> bytes} в порядке предпочтения сервера
+CODECS = _codecs()
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме явно запрещённых (q=0)."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip().replace(' ', '')
+        if quality.startswith('q=') and not quality[2:].strip('0.'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(header):
+    """Лучшая из поддерживаемых кодировок, которую принимает клиент, или None."""
+    accepted = accepted_encodings(header)
+    for coding in CODECS:
+        if coding in accepted:
+            return coding
+    return None
+
+
+def compress(body, coding, cacheable=True):
+    """
+    Сжатое тело: из кэша по хэшу body или, при промахе, сжатие
+    и запись в кэш. Большие тела (больше COMPRESSION_CACHE_MAX_SIZE)
+    и тела с cacheable=False не кэшируются.
+    """
+    timeout = settings.COMPRESSION_CACHE_TIMEOUT
+    if not cacheable or not timeout or len(body) > settings.COMPRESSION_CACHE_MAX_SIZE:
+        return CODECS[coding](body)
+
+    cache = caches[settings.COMPRESSION_CACHE_ALIAS]
+    key = f'compressed:{coding}:{hashlib.blake2b(body, digest_size=16).hexdigest()}'
+    compressed = cache.get(key)
+    metrics.cache_result('compressed_response', compressed is not None)
+    if compressed is None:
+        compressed = CODECS[coding](body)
+        cache.set(key, compressed, timeout)
+    return compressed
+
+
+def _compressible(response):
+    if response.streaming or response.has_header('Content-Encoding'):
+        return False
+    if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+        return False
+    content_type = response.get('Content-Type', '').lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def _public(request, response):
+    """Ответ на анонимный GET/HEAD, который можно держать в общем кэше."""
+    if request.method not in ('GET', 'HEAD') or 'Authorization' in request.headers:
+        return False
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return False
+    cache_control = response.get('Cache-Control', '').lower()
+    return 'private' not in cache_control and 'no-store' not in cache_control
+
+
+class CompressionMiddleware:
+    """
+    Как django.middleware.gzip.GZipMiddleware, но с выбором из
+    zstd / br / gzip и кэшем сжатых тел. Ставится в MIDDLEWARE сразу
+    после SecurityMiddleware — раньше всех, кто читает или меняет тело.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not _compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        if coding is None:
+            return response
+
+        compressed = compress(response.content, coding, cacheable=_public(request, response))
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = coding
+        # сжатое тело побайтно другое: сильный ETag становится слабым (как в GZipMiddleware)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
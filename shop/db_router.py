@@ -0,0 +1,121 @@
+"""
+Маршрутизация запросов к БД: чтение каталога — с реплик, всё остальное — с основной.
+
+Реплики перечисляются в settings.DATABASE_REPLICAS (алиасы из DATABASES).
+Если список пуст, роутер ничего не меняет.
+
+Read-your-writes:
+- внутри HTTP-запроса после первой записи все чтения идут в основную БД;
+- небезопасные запросы (POST/PUT/PATCH/DELETE) сразу читают из основной;
+- после записи клиенту ставится cookie, и следующие
+  REPLICA_STICKY_SECONDS секунд его запросы тоже читают из основной
+  (чтобы не увидеть отставшую реплику).
+
+Вне HTTP-запроса (Celery, скрипты) автоматического "прилипания" нет —
+для этого есть контекстный менеджер use_primary().
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = 'default'
+
+# (app_label, model_name) моделей каталога, которые можно читать с реплик
+CATALOG_MODELS = frozenset({
+    ('shop', 'shop'),
+    ('shop', 'category'),
+    ('shop', 'category_shops'),
+    ('shop', 'product'),
+    ('shop', 'productinfo'),
+    ('shop', 'parameter'),
+    ('shop', 'productparameter'),
+})
+
+# состояние текущего HTTP-запроса: {"pinned": bool, "wrote": bool} или None вне запроса
+_request_state = ContextVar('db_request_state', default=None)
+# принудительное чтение из основной БД (use_primary)
+_force_primary = ContextVar('db_force_primary', default=False)
+
+
+def is_pinned():
+    if _force_primary.get():
+        return True
+    state = _request_state.get()
+    return bool(state and state['pinned'])
+
+
+def pin_to_primary(wrote=False):
+    """Все следующие чтения в рамках текущего HTTP-запроса — из основной БД."""
+    state = _request_state.get()
+    if state is not None:
+        state['pinned'] = True
+        state['wrote'] = state['wrote'] or wrote
+
+
+@contextmanager
+def use_primary():
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or is_pinned():
+            return PRIMARY
+        if (model._meta.app_label, model._meta.model_name) not in CATALOG_MODELS:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary(wrote=True)
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        allowed = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in allowed and obj2._state.db in allowed:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # реплики получают схему через репликацию
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class PrimaryStickinessMiddleware:
+    """
+    Задаёт состояние роутера на время запроса и ставит/читает cookie
+    "прилипания" к основной БД после записи.
+    """
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        cookie = settings.REPLICA_STICKY_COOKIE
+        pinned = request.method not in self.SAFE_METHODS or cookie in request.COOKIES
+        state = {'pinned': pinned, 'wrote': False}
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+
+        wrote = state['wrote'] or request.method not in self.SAFE_METHODS
+        if wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                cookie,
+                '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,143 @@
+"""
+Изображения товаров: проверка загрузки, обработка оригинала и миниатюры.
+
+В запросе (ProductWriteSerializer) файл только проверяется: размер —
+до того, как его откроет Pillow, размеры в пикселях — по заголовку, без
+декодирования. Загрузки больше FILE_UPLOAD_MAX_MEMORY_SIZE Django пишет
+во временный файл на диске, а не держит в памяти.
+
+Декодирование — в задаче shop.tasks.process_product_image: поворот по
+EXIF, уменьшение до PRODUCT_IMAGE_MAX_SIDE, JPEG без EXIF (prepare()),
+затем миниатюры ImageKit. Миниатюры при обращении к .url не создаются
+(DeferredThumbnails), поэтому чтение каталога не декодирует картинки.
+
+Защита от «бомб» — картинок с огромным числом пикселей при маленьком
+файле: PRODUCT_IMAGE_MAX_PIXELS проверяется по заголовку и при
+декодировании (DecompressionBombWarning превращается в ошибку).
+
+prepare() не использует Django и вызывается в пуле процессов командой
+ingest_product_images.
+"""
+import os
+import warnings
+import zipfile
+import zlib
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+
+
+class ImageRejected(Exception):
+    """Файл не принят: слишком большой, не картинка или «бомба»."""
+
+
+class DeferredThumbnails:
+    """
+    Стратегия ImageKit (IMAGEKIT_DEFAULT_CACHEFILE_STRATEGY): .url не
+    создаёт миниатюру в запросе, её создаёт задача обработки изображения.
+    Если содержимое всё же понадобилось (чтение файла) — создаётся на месте.
+    """
+
+    def on_content_required(self, file):
+        file.generate()
+
+    def should_verify_existence(self, file):
+        return False
+
+
+def check_size(size, max_size):
+    if size is not None and size > max_size:
+        raise ImageRejected(f'Файл больше {max_size // (1024 * 1024)} МБ.')
+
+
+def check_header(source, max_pixels):
+    """
+    Формат и размеры по заголовку (пиксели не декодируются).
+    Возвращает (формат, ширина, высота).
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            with Image.open(source) as image:
+                image_format, (width, height) = image.format, image.size
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise ImageRejected('Слишком большое изображение.')
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise ImageRejected('Файл не является изображением.')
+    if image_format not in ALLOWED_FORMATS:
+        raise ImageRejected(f'Формат {image_format} не поддерживается.')
+    if width * height > max_pixels:
+        raise ImageRejected(f'Больше {max_pixels} пикселей ({width}x{height}).')
+    return image_format, width, height
+
+
+def prepare(source, max_side, max_pixels, quality=88):
+    """
+    Оригинал для хранения: поворот по EXIF, не больше max_side по большей
+    стороне, JPEG без EXIF. source — путь, файл или bytes. Возвращает bytes.
+    """
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    previous_limit = Image.MAX_IMAGE_PIXELS
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            with Image.open(source) as image:
+                if image.format not in ALLOWED_FORMATS:
+                    raise ImageRejected(f'Формат {image.format} не поддерживается.')
+                if image.width * image.height > max_pixels:
+                    raise ImageRejected(f'Больше {max_pixels} пикселей ({image.width}x{image.height}).')
+                # JPEG декодируется сразу в уменьшенном масштабе — меньше памяти и CPU
+                image.draft('RGB', (max_side, max_side))
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+                if image.mode in ('RGBA', 'LA', 'P'):
+                    image = image.convert('RGBA')
+                    background = Image.new('RGB', image.size, 'white')
+                    background.paste(image, mask=image.getchannel('A'))
+                    image = background
+                elif image.mode != 'RGB':
+                    image = image.convert('RGB')
+                output = BytesIO()
+                image.save(output, 'JPEG', quality=quality, optimize=True, progressive=True)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise ImageRejected('Слишком большое изображение.')
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise ImageRejected('Файл не является изображением.')
+    finally:
+        Image.MAX_IMAGE_PIXELS = previous_limit
+    return output.getvalue()
+
+
+def prepare_entry(source, member, max_side, max_pixels, quality):
+    """
+    prepare() для одного файла поставщика: source — каталог или zip,
+    member — имя файла в нём. Выполняется в процессе пула, поэтому читает
+    файл сам — через очередь пула идут только имена и готовые JPEG.
+    Повреждённый или зашифрованный файл архива — ImageRejected.
+    """
+    if zipfile.is_zipfile(source):
+        try:
+            with zipfile.ZipFile(source) as archive, archive.open(member) as file:
+                body = file.read()
+        # BadZipFile — неверная CRC или заголовок, zlib.error/EOFError — битые
+        # сжатые данные, RuntimeError — пароль, NotImplementedError — метод сжатия
+        except (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError, NotImplementedError) as exc:
+            raise ImageRejected(f'Повреждённый файл в архиве: {exc}') from exc
+        return prepare(body, max_side, max_pixels, quality)
+    return prepare(os.path.join(source, member), max_side, max_pixels, quality)
+
+
+def processed_name(name):
+    """products/originals/photo.png -> products/originals/photo.jpg"""
+    return str(PurePosixPath(name).with_suffix('.jpg'))
+
+
+def generate_thumbnails(product):
+    """Миниатюры ImageKit товара (image_small / image_medium / image_large)."""
+    for spec in (product.image_small, product.image_medium, product.image_large):
+        spec.generate()
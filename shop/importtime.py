@@ -0,0 +1,94 @@
+"""
+Профиль холодного старта процесса по ролям (web / worker / import).
+
+Загрузка роли запускается в отдельном интерпретаторе с `python -X importtime`
+(так же, как стартует gunicorn-воркер или воркер Celery), вывод разбирается
+по модулям и пакетам верхнего уровня. Используется командой
+`manage.py importtime` и тестом бюджета времени импорта.
+"""
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+
+# что делает процесс роли до обработки первого запроса / задачи
+BOOTSTRAP = {
+    'web': (
+        'from config.wsgi import application\n'
+        'from django.urls import get_resolver\n'
+        'get_resolver().url_patterns\n'
+    ),
+    'worker': (
+        'from config.celery import app\n'
+        'app.loader.import_default_modules()\n'
+    ),
+    'import': (
+        'import django\n'
+        'django.setup()\n'
+        'import yaml\n'
+        'from shop import models, price_history\n'
+    ),
+}
+
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+
+
+class ImportProfile:
+    def __init__(self, role, wall_ms, modules):
+        self.role = role
+        self.wall_ms = wall_ms
+        # {модуль: (собственное время, время с вложенными импортами)}, мкс
+        self.modules = modules
+
+    @property
+    def total_ms(self):
+        return sum(own for own, _ in self.modules.values()) / 1000
+
+    def imported(self, package):
+        return any(name == package or name.startswith(package + '.') for name in self.modules)
+
+    def packages(self):
+        """Собственное время импорта по пакетам верхнего уровня, мс."""
+        totals = Counter()
+        for name, (own, _) in self.modules.items():
+            totals[name.split('.')[0]] += own / 1000
+        return totals
+
+    def slowest_modules(self, limit):
+        ranked = sorted(self.modules.items(), key=lambda item: item[1][0], reverse=True)
+        return [(name, own / 1000) for name, (own, _) in ranked[:limit]]
+
+
+def parse(output):
+    modules = {}
+    for line in output.splitlines():
+        match = _LINE.match(line)
+        if match:
+            modules[match[4]] = (int(match[1]), int(match[2]))
+    return modules
+
+
+def profile(role):
+    """Запускает загрузку роли в новом интерпретаторе и возвращает ImportProfile."""
+    env = {
+        **os.environ,
+        'APP_ROLE': role,
+        'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),
+    }
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOTSTRAP[role]],
+        cwd=settings.BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode:
+        errors = [line for line in result.stderr.splitlines() if not _LINE.match(line)]
+        raise RuntimeError(f'{role} bootstrap failed:\n' + '\n'.join(errors[-20:]))
+    return ImportProfile(role, wall_ms, parse(result.stderr))
@@ -0,0 +1,13 @@
+"""
+Нагрузочный тест всего стека: сервер Django поднимается локально
+(config.settings_loadtest: SQLite, Celery eager, письма в память),
+виртуальные пользователи ходят по сценариям через asyncio HTTP-клиент.
+
+- client.py    — минимальный HTTP/1.1 клиент на asyncio (keep-alive, JSON);
+- seed.py      — тестовые магазины, товары, пользователи с контактами;
+- scenarios.py — сценарии и их доля в трафике;
+- stats.py     — пропускная способность, гистограммы задержек, ошибки, пороги;
+- runner.py    — запуск сервера и пользователей.
+
+Запуск: python manage.py loadtest (см. README).
+"""
@@ -0,0 +1,112 @@
+"""
+HTTP/1.1 клиент на asyncio: одно keep-alive соединение на виртуального
+пользователя, JSON в запросах и ответах. Сторонние клиенты (aiohttp, httpx)
+для нагрузочного теста не нужны.
+"""
+import asyncio
+import json
+from urllib.parse import urlencode, urlsplit
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    @property
+    def ok(self):
+        return self.status < 400
+
+    def json(self):
+        return json.loads(self.body) if self.body else None
+
+
+class HttpClient:
+    def __init__(self, base_url, timeout=30.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.token = None
+        self._reader = self._writer = None
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+        self._reader = self._writer = None
+
+    async def request(self, method, path, params=None, json_body=None):
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        body = b"" if json_body is None else json.dumps(json_body).encode()
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Accept: application/json",
+            f"Content-Length: {len(body)}",
+        ]
+        if body:
+            lines.append("Content-Type: application/json")
+        if self.token:
+            lines.append(f"Authorization: Bearer {self.token}")
+        raw = ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+        # повторяем один раз, если сервер закрыл keep-alive соединение между запросами
+        for attempt in range(2):
+            if self._writer is None:
+                await self._connect()
+            try:
+                self._writer.write(raw)
+                await self._writer.drain()
+                return await asyncio.wait_for(self._read_response(), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _read_response(self):
+        status_line = await self._reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = await self._read_chunked()
+        elif "content-length" in headers:
+            body = await self._reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await self._reader.read()
+            headers["connection"] = "close"
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return Response(status, headers, body)
+
+    async def _read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            if size == 0:
+                await self._reader.readuntil(b"\r\n")
+                return b"".join(chunks)
+            chunks.append(await self._reader.readexactly(size))
+            await self._reader.readexactly(2)
+
+    async def get(self, path, params=None):
+        return await self.request("GET", path, params=params)
+
+    async def post(self, path, json_body=None):
+        return await self.request("POST", path, json_body=json_body)
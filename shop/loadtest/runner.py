@@ -0,0 +1,134 @@
+"""
+Запуск нагрузочного теста: локальный сервер на отдельной БД и виртуальные
+пользователи, которые по весам MIX выбирают сценарии до конца прогона.
+"""
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+from django.conf import settings
+
+from shop.loadtest.client import HttpClient
+from shop.loadtest.scenarios import MIX, SCENARIOS
+from shop.loadtest.stats import Recorder
+
+SETTINGS_MODULE = "config.settings_loadtest"
+
+
+def _manage(*args, env):
+    subprocess.run(
+        [sys.executable, str(settings.BASE_DIR / "manage.py"), *args],
+        env=env, check=True, stdout=subprocess.DEVNULL,
+    )
+
+
+def _wait_for_port(port, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Сервер завершился с кодом {process.returncode}")
+        with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=0.5):
+            return
+        time.sleep(0.2)
+    raise RuntimeError(f"Сервер не ответил на порту {port} за {timeout:.0f} с")
+
+
+@contextlib.contextmanager
+def local_server(port, shops, products, users):
+    """
+    Новая БД (migrate + seed) и runserver с config.settings_loadtest.
+    Возвращает манифест сценариев; сервер останавливается при выходе.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        manifest_path = os.path.join(directory, "manifest.json")
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": SETTINGS_MODULE,
+            "LOADTEST_DB_NAME": os.path.join(directory, "loadtest.sqlite3"),
+        }
+        _manage("migrate", "--no-input", env=env)
+        _manage(
+            "loadtest", "--seed-only", "--manifest", manifest_path,
+            "--shops", str(shops), "--products", str(products), "--seed-users", str(users),
+            env=env,
+        )
+        with open(manifest_path, encoding="utf-8") as fh:
+            manifest = json.load(fh)
+
+        process = subprocess.Popen(
+            [sys.executable, str(settings.BASE_DIR / "manage.py"), "runserver", "--noreload", f"127.0.0.1:{port}"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            _wait_for_port(port, process)
+            yield manifest
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+class ScenarioFailed(Exception):
+    """Запрос сценария вернул ошибку — остаток сценария не выполняется."""
+
+
+async def _virtual_user(base_url, manifest, user, mix, deadline, recorder, rnd):
+    client = HttpClient(base_url)
+
+    async def record(name, coroutine):
+        started = time.perf_counter()
+        try:
+            response = await coroutine
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            recorder.add_request(name, (time.perf_counter() - started) * 1000, ok=False)
+            raise
+        recorder.add_request(name, (time.perf_counter() - started) * 1000, ok=response.ok)
+        if not response.ok:
+            raise ScenarioFailed(f"{name}: HTTP {response.status}")
+        return response
+
+    try:
+        token = await client.post(
+            "/api/v1/auth/token/", {"username": user["username"], "password": manifest["password"]},
+        )
+        if not token.ok:
+            recorder.add_scenario("login", 0.0, ok=False)
+            return
+        client.token = token.json()["access"]
+
+        ctx = SimpleNamespace(random=rnd, manifest=manifest, user=user)
+        names, weights = list(mix), list(mix.values())
+        while time.monotonic() < deadline:
+            name = rnd.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                await SCENARIOS[name](client, ctx, record)
+                ok = True
+            except (ScenarioFailed, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                ok = False
+            recorder.add_scenario(name, (time.perf_counter() - started) * 1000, ok)
+    finally:
+        await client.close()
+
+
+async def run(base_url, manifest, users=10, duration=30.0, mix=None, random_seed=0):
+    """Прогон: users виртуальных пользователей в течение duration секунд, отчёт stats."""
+    recorder = Recorder()
+    accounts = manifest["users"]
+    started = time.monotonic()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _virtual_user(
+            base_url, manifest, accounts[i % len(accounts)], mix or MIX, deadline, recorder,
+            random.Random(random_seed + i),
+        )
+        for i in range(users)
+    ))
+    return recorder.report(time.monotonic() - started)
@@ -0,0 +1,55 @@
+"""
+Сценарии нагрузочного теста. Сценарий — корутина (client, ctx, record),
+где record(name, coroutine) выполняет и замеряет один HTTP-запрос.
+Доля сценария в трафике — вес в MIX.
+"""
+API = "/api/v1"
+
+
+async def browse(client, ctx, record):
+    """Каталог: предложения с фильтрами и товары категории."""
+    rnd = ctx.random
+    category_id = rnd.choice(ctx.manifest["category_ids"])
+    await record("products-info?category", client.get(
+        f"{API}/products-info/", {"category_id": category_id, "in_stock": 1},
+    ))
+    await record("products-info?search", client.get(
+        f"{API}/products-info/", {"search": rnd.choice(ctx.manifest["search_terms"]), "price_max": 50_000},
+    ))
+    await record("products?category", client.get(f"{API}/products/", {"category_id": category_id}))
+
+
+async def add_to_basket(client, ctx, record):
+    """Добавление позиций в корзину и просмотр корзины."""
+    offers = ctx.random.sample(ctx.manifest["offer_ids"], k=2)
+    await record("basket POST", client.post(
+        f"{API}/orders/basket/", {"items": [{"product_info": pk, "quantity": 1} for pk in offers]},
+    ))
+    await record("basket GET", client.get(f"{API}/orders/basket/"))
+
+
+async def checkout(client, ctx, record):
+    """Полное оформление: корзина → подтверждение (письма — через Celery в eager-режиме)."""
+    await add_to_basket(client, ctx, record)
+    await record("confirm", client.post(f"{API}/orders/confirm/", {"contact_id": ctx.user["contact_id"]}))
+
+
+async def order_history(client, ctx, record):
+    """История заказов пользователя: первая страница keyset-пагинации."""
+    await record("orders", client.get(f"{API}/orders/history/", {"page_size": 20}))
+
+
+SCENARIOS = {
+    "browse": browse,
+    "basket": add_to_basket,
+    "checkout": checkout,
+    "orders": order_history,
+}
+
+# доли трафика (веса), ближе к реальному: в основном просмотр каталога
+MIX = {
+    "browse": 70,
+    "basket": 15,
+    "checkout": 10,
+    "orders": 5,
+}
@@ -0,0 +1,68 @@
+"""
+Данные для нагрузочного теста: дерево категорий, магазины, товары с
+предложениями и пользователи с контактами. Всё создаётся bulk_create.
+"""
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from shop import active_shops, category_counts
+from shop.models import Category, Contact, Product, ProductInfo, Shop
+
+PASSWORD = "loadtest-password"
+USERNAME_PREFIX = "loadtest-user-"
+
+
+def seed(shops=5, products=500, users=50, random_seed=0):
+    """Заполняет пустую БД и возвращает манифест для сценариев (id и логины)."""
+    rnd = random.Random(random_seed)
+
+    shop_objs = Shop.objects.bulk_create([Shop(name=f"Loadtest shop {i}") for i in range(shops)])
+    # bulk_create не шлёт post_save, кэш статусов магазинов сбрасываем сами
+    active_shops.invalidate()
+
+    roots = [Category.objects.create(name=f"Раздел {i}") for i in range(3)]
+    categories = list(roots)
+    for root in roots:
+        categories += [Category.objects.create(name=f"{root.name}.{j}", parent=root) for j in range(4)]
+    leaves = categories[len(roots):]
+
+    product_objs = Product.objects.bulk_create([
+        Product(name=f"Товар {i}", category=rnd.choice(leaves)) for i in range(products)
+    ])
+    offers = ProductInfo.objects.bulk_create([
+        ProductInfo(
+            product=product,
+            shop=shop,
+            external_id=product.id,
+            # пятая часть не в наличии; остального хватает на весь прогон с оформлением заказов
+            quantity=0 if rnd.random() < 0.2 else rnd.randint(10_000, 100_000),
+            price=rnd.randint(100, 100_000),
+        )
+        for product in product_objs
+        for shop in rnd.sample(shop_objs, k=min(2, len(shop_objs)))
+    ], batch_size=1000)
+    category_counts.refresh()
+
+    password = make_password(PASSWORD)
+    user_objs = User.objects.bulk_create([
+        User(username=f"{USERNAME_PREFIX}{i}", email=f"loadtest{i}@example.com", password=password)
+        for i in range(users)
+    ])
+    # bulk_create на SQLite/PostgreSQL возвращает pk
+    contacts = Contact.objects.bulk_create([
+        Contact(user=user, city="Москва", address=f"Улица {user.id}", phone="+70000000000")
+        for user in user_objs
+    ])
+
+    return {
+        "password": PASSWORD,
+        "users": [
+            {"username": user.username, "contact_id": contact.id}
+            for user, contact in zip(user_objs, contacts)
+        ],
+        "category_ids": [category.id for category in categories],
+        "offer_ids": [offer.id for offer in offers if offer.quantity > 0],
+        "search_terms": ["Товар 1", "Товар 2", "Товар 3"],
+    }
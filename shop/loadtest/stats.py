@@ -0,0 +1,99 @@
+"""
+Результаты нагрузочного теста: пропускная способность, гистограммы задержек
+и доля ошибок по сценариям и запросам, проверка порогов и регрессий.
+"""
+import bisect
+
+# верхние границы корзин гистограммы задержек, мс (последняя — всё, что дольше)
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Series:
+    """Замеры одной группы: задержки успешных и неуспешных запросов, мс."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+
+    def add(self, latency_ms, ok):
+        self.latencies.append(latency_ms)
+        if not ok:
+            self.errors += 1
+
+    def summary(self, duration):
+        values = sorted(self.latencies)
+        histogram = [0] * (len(BUCKETS_MS) + 1)
+        for value in values:
+            histogram[bisect.bisect_left(BUCKETS_MS, value)] += 1
+        count = len(values)
+        return {
+            "count": count,
+            "per_sec": count / duration if duration else 0.0,
+            "errors": self.errors,
+            "error_rate": self.errors / count if count else 0.0,
+            "p50_ms": percentile(values, 0.50),
+            "p95_ms": percentile(values, 0.95),
+            "p99_ms": percentile(values, 0.99),
+            "max_ms": values[-1] if values else 0.0,
+            "histogram": dict(zip([f"<={b}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"], histogram)),
+        }
+
+
+class Recorder:
+    def __init__(self):
+        # сценарий целиком (итерация = одно прохождение) и отдельные запросы
+        self.scenarios = {}
+        self.requests = {}
+
+    def add_request(self, name, latency_ms, ok):
+        self.requests.setdefault(name, Series()).add(latency_ms, ok)
+
+    def add_scenario(self, name, latency_ms, ok):
+        self.scenarios.setdefault(name, Series()).add(latency_ms, ok)
+
+    def report(self, duration):
+        return {
+            "duration_sec": duration,
+            "scenarios": {name: s.summary(duration) for name, s in sorted(self.scenarios.items())},
+            "requests": {name: s.summary(duration) for name, s in sorted(self.requests.items())},
+        }
+
+
+def check(report, thresholds, baseline=None, max_regression=None):
+    """
+    Проверяет отчёт и возвращает список нарушений (пустой — всё в порядке).
+
+    thresholds: {"default": {...}, "scenarios": {"checkout": {...}}}, ключи —
+    max_error_rate, max_p95_ms, min_per_sec (итераций сценария в секунду).
+    baseline/max_regression: прошлый отчёт и допустимая доля ухудшения
+    per_sec (вниз) и p95_ms (вверх) по каждому сценарию.
+    """
+    failures = []
+    default = thresholds.get("default", {})
+    for name, result in report["scenarios"].items():
+        limits = {**default, **thresholds.get("scenarios", {}).get(name, {})}
+        if "max_error_rate" in limits and result["error_rate"] > limits["max_error_rate"]:
+            failures.append(f"{name}: error_rate {result['error_rate']:.3f} > {limits['max_error_rate']}")
+        if "max_p95_ms" in limits and result["p95_ms"] > limits["max_p95_ms"]:
+            failures.append(f"{name}: p95 {result['p95_ms']:.0f} ms > {limits['max_p95_ms']} ms")
+        if "min_per_sec" in limits and result["per_sec"] < limits["min_per_sec"]:
+            failures.append(f"{name}: {result['per_sec']:.1f}/s < {limits['min_per_sec']}/s")
+
+        previous = (baseline or {}).get("scenarios", {}).get(name)
+        if previous and max_regression is not None:
+            if result["per_sec"] < previous["per_sec"] * (1 - max_regression):
+                failures.append(
+                    f"{name}: throughput {result['per_sec']:.1f}/s regressed from {previous['per_sec']:.1f}/s"
+                )
+            if result["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+                failures.append(
+                    f"{name}: p95 {result['p95_ms']:.0f} ms regressed from {previous['p95_ms']:.0f} ms"
+                )
+    return failures
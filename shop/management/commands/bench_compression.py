@@ -0,0 +1,89 @@
+import json
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.http import HttpRequest, HttpResponse
+from django.test import override_settings
+
+from shop import compression
+
+
+def catalog_page(rows, seed=1):
+    """Тело ответа products-info на rows предложений (поля как у ProductInfoSerializer)."""
+    rnd = random.Random(seed)
+    data = [
+        {
+            "id": n,
+            "model": f"model-{rnd.randint(1000, 9999)}",
+            "price": str(Decimal(rnd.randint(1000, 200000))),
+            "price_rrc": str(Decimal(rnd.randint(1000, 200000))),
+            "quantity": rnd.randint(0, 50),
+            "product": f"Смартфон {rnd.choice(['Apple', 'Samsung', 'Xiaomi'])} {rnd.randint(1, 15)} "
+                       f"{rnd.choice([64, 128, 256])} ГБ",
+            "shop": rnd.choice(["Связной", "Евросеть", "DNS"]),
+            "category": "Смартфоны",
+            "parameters": [
+                {"id": n * 10 + i, "parameter": i, "parameter_name": name, "value": value, "value_num": None}
+                for i, (name, value) in enumerate([
+                    ("Диагональ (дюйм)", str(rnd.choice([5.8, 6.1, 6.5, 6.7]))),
+                    ("Разрешение (пикс)", rnd.choice(["1920x1080", "2532x1170", "2778x1284"])),
+                    ("Встроенная память (Гб)", str(rnd.choice([64, 128, 256]))),
+                    ("Цвет", rnd.choice(["черный", "белый", "синий"])),
+                ])
+            ],
+        }
+        for n in range(rows)
+    ]
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер сжатия ответов (shop/compression.py) на странице каталога: "
+        "байт на ответ и CPU на запрос для каждой кодировки — со сжатием "
+        "на каждый запрос и с кэшем сжатых тел (COMPRESSION_CACHE_*)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500, help="Предложений в ответе.")
+        parser.add_argument("--requests", type=int, default=200, help="Запросов на каждый вариант.")
+
+    def handle(self, *args, rows=500, requests=200, **options):
+        body = catalog_page(rows)
+        self.stdout.write(
+            f"Ответ: {rows} предложений, {len(body)} байт; кодировки: {', '.join(compression.CODECS)}"
+        )
+        self.stdout.write(f"{'кодировка':10} {'байт':>9} {'доля':>6} {'CPU/запрос':>11} {'с кэшем':>9}")
+
+        identity = self._run(body, "identity", requests)
+        self._print("identity", identity["bytes"], len(body), identity["cpu"], identity["cpu"])
+        for coding in compression.CODECS:
+            with override_settings(COMPRESSION_CACHE_TIMEOUT=0):
+                uncached = self._run(body, coding, requests)
+            with override_settings(COMPRESSION_CACHE_TIMEOUT=300):
+                self._run(body, coding, 1)  # первый запрос заполняет кэш
+                cached = self._run(body, coding, requests)
+            self._print(coding, uncached["bytes"], len(body), uncached["cpu"], cached["cpu"])
+
+    def _run(self, body, accept_encoding, requests):
+        middleware = compression.CompressionMiddleware(
+            lambda request: HttpResponse(body, content_type="application/json"),
+        )
+        request = HttpRequest()
+        request.method = "GET"
+        request.META["HTTP_ACCEPT_ENCODING"] = accept_encoding
+
+        size = 0
+        started = time.process_time()
+        for _ in range(requests):
+            size = len(middleware(request).content)
+        cpu = (time.process_time() - started) / requests
+        return {"bytes": size, "cpu": cpu}
+
+    def _print(self, coding, size, original, cpu, cached_cpu):
+        self.stdout.write(
+            f"{coding:10} {size:>9} {size / original:>6.1%} "
+            f"{cpu * 1000:>8.3f} мс {cached_cpu * 1000:>6.3f} мс"
+        )
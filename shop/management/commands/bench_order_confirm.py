@@ -0,0 +1,100 @@
+import statistics
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from django.urls import reverse
+
+from shop import active_shops, shop_orders
+from shop.models import Category, Contact, Order, OrderItem, Product, ProductInfo, Shop
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер оформления заказа (POST /api/v1/orders/confirm/) для корзины "
+        "из --lines позиций --shops магазинов: задержка, число SQL-запросов "
+        "и доля разбиения на подзаказы (shop/shop_orders.py). Работает "
+        "на отдельной тестовой БД; письма не отправляются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, default=100, help="Позиций в корзине.")
+        parser.add_argument("--shops", type=int, default=10, help="Магазинов в корзине.")
+        parser.add_argument("--runs", type=int, default=50, help="Оформлений.")
+
+    def handle(self, *args, lines=100, shops=10, runs=50, **options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            result = self._run(lines, shops, runs)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(
+            f"Корзина: {lines} позиций, {shops} магазинов; оформлений {runs}, "
+            f"SQL-запросов на оформление {result['queries']} (из них разбиение {result['split_queries']})"
+        )
+        self.stdout.write(
+            f"confirm   p50 {result['p50']:.2f} мс, p95 {result['p95']:.2f} мс; "
+            f"разбиение p50 {result['split_p50']:.2f} мс"
+        )
+
+    def _run(self, lines, shops, runs):
+        from rest_framework.test import APIClient
+
+        category = Category.objects.create(name="Bench")
+        shop_objs = Shop.objects.bulk_create([Shop(name=f"Bench shop {i}") for i in range(shops)])
+        active_shops.invalidate()
+        products = Product.objects.bulk_create([Product(name=f"Bench {i}", category=category) for i in range(lines)])
+        offers = ProductInfo.objects.bulk_create([
+            ProductInfo(product=product, shop=shop_objs[i % shops], external_id=i, quantity=10 ** 6, price=100 + i)
+            for i, product in enumerate(products)
+        ])
+        user = User.objects.create_user(username="bench", password="bench12345")
+        contact = Contact.objects.create(user=user, city="Москва", address="Улица", phone="+70000000000")
+
+        client = APIClient()
+        client.force_authenticate(user)
+        url = reverse("order-confirm")
+
+        latencies, split_latencies = [], []
+        queries = split_queries = 0
+        split = shop_orders.split
+
+        def timed_split(order):
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as captured:
+                result = split(order)
+            split_latencies.append((time.perf_counter() - started) * 1000)
+            nonlocal split_queries
+            split_queries = len(captured)
+            return result
+
+        with mock.patch("shop.tasks.send_order_emails.delay"), \
+                mock.patch.object(shop_orders, "split", timed_split):
+            for _ in range(runs):
+                basket = Order.objects.create(user=user, status=Order.STATUS_BASKET)
+                OrderItem.objects.bulk_create([OrderItem(order=basket, product_info=offer) for offer in offers])
+
+                started = time.perf_counter()
+                with CaptureQueriesContext(connection) as captured:
+                    response = client.post(url, {"contact_id": contact.id}, format="json")
+                latencies.append((time.perf_counter() - started) * 1000)
+                queries = len(captured)
+                if response.status_code != 200:
+                    raise CommandError(f"confirm ответил {response.status_code}: {response.content!r}")
+
+        latencies.sort()
+        return {
+            "queries": queries,
+            "split_queries": split_queries,
+            "p50": statistics.median(latencies),
+            "p95": latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0],
+            "split_p50": statistics.median(split_latencies),
+        }
@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from shop import sqlite
+
+PROFILES = {
+    # как Django до профиля: rollback journal, BEGIN (DEFERRED), sqlite3 timeout по умолчанию
+    "default": {"pragmas": {}, "begin": "BEGIN"},
+    "tuned": {"pragmas": None, "begin": "BEGIN IMMEDIATE"},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест конкурентной записи в SQLite: потоки оформляют "
+        "'корзины' (чтение остатка, вставка позиции, списание) в отдельном "
+        "файле БД, сравниваются профили default и tuned (shop/sqlite.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--transactions", type=int, default=200, help="Транзакций на поток.")
+        parser.add_argument("--profile", choices=sorted(PROFILES), action="append")
+
+    def handle(self, *args, threads=8, transactions=200, profile=None, **options):
+        self.stdout.write(f"PRAGMA профиля tuned: {settings.SQLITE_PRAGMAS}")
+        for name in profile or PROFILES:
+            with tempfile.TemporaryDirectory() as directory:
+                result = self._run(os.path.join(directory, "bench.sqlite3"), PROFILES[name], threads, transactions)
+            self.stdout.write(
+                f"{name:8} потоков {threads}, транзакций {result['committed']}/{threads * transactions}, "
+                f"'database is locked' {result['locked']}, "
+                f"{result['rate']:.0f} тр/с, p50 {result['p50']:.2f} мс, p95 {result['p95']:.2f} мс"
+            )
+
+    def _connect(self, path, profile):
+        connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        sqlite.configure_connection(connection, profile["pragmas"])
+        return connection
+
+    def _run(self, path, profile, threads, transactions):
+        setup = self._connect(path, profile)
+        setup.executescript(
+            "CREATE TABLE stock (id INTEGER PRIMARY KEY, quantity INTEGER NOT NULL);"
+            "CREATE TABLE basket_item (id INTEGER PRIMARY KEY, basket INTEGER, offer INTEGER, quantity INTEGER);"
+        )
+        setup.executemany("INSERT INTO stock VALUES (?, ?)", [(i, 10 ** 6) for i in range(100)])
+        setup.close()
+
+        latencies, locked = [], []
+        lock = threading.Lock()
+
+        def worker(index):
+            connection = self._connect(path, profile)
+            own_latencies, own_locked = [], 0
+            for n in range(transactions):
+                offer = (index * transactions + n) % 100
+                started = time.perf_counter()
+                try:
+                    connection.execute(profile["begin"])
+                    (quantity,) = connection.execute(
+                        "SELECT quantity FROM stock WHERE id = ?", [offer],
+                    ).fetchone()
+                    connection.execute(
+                        "INSERT INTO basket_item (basket, offer, quantity) VALUES (?, ?, 1)", [index, offer],
+                    )
+                    connection.execute("UPDATE stock SET quantity = ? WHERE id = ?", [quantity - 1, offer])
+                    connection.execute("COMMIT")
+                except sqlite3.OperationalError as e:
+                    if "locked" not in str(e):
+                        raise
+                    if connection.in_transaction:
+                        connection.execute("ROLLBACK")
+                    own_locked += 1
+                    continue
+                own_latencies.append((time.perf_counter() - started) * 1000)
+            connection.close()
+            with lock:
+                latencies.extend(own_latencies)
+                locked.append(own_locked)
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            "committed": len(latencies),
+            "locked": sum(locked),
+            "rate": len(latencies) / elapsed,
+            "p50": statistics.median(latencies) if latencies else 0.0,
+            "p95": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0.0,
+        }
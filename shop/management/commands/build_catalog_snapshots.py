@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from shop import catalog_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Собирает снимки каталога (products-info по категориям и магазинам) "
+        "в CATALOG_SNAPSHOT_DIR. Обычно это делает задача build_catalog_snapshots."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Пересобрать все снимки, а не только устаревшие (например, на новом диске).",
+        )
+
+    def handle(self, *args, force=False, **options):
+        report = catalog_snapshots.build(force=force)
+        self.stdout.write(self.style.SUCCESS(
+            "Собрано снимков: {built}, удалено: {removed}, {seconds:.2f} с".format(**report)
+        ))
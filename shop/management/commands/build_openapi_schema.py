@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from shop import schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Собирает OpenAPI-схему для текущей версии кода в OPENAPI_SCHEMA_DIR. "
+        "Запускается при деплое перед стартом веб-процессов."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Пересобрать, даже если схема для этой версии кода уже есть.",
+        )
+
+    def handle(self, *args, force=False, **options):
+        for path in schema.build(force=force):
+            self.stdout.write(f"{path} ({path.stat().st_size} байт)")
+        self.stdout.write(self.style.SUCCESS(f"Схема собрана, версия {schema.fingerprint()}"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from shop import importtime
+
+
+class Command(BaseCommand):
+    help = (
+        "Профиль холодного старта (python -X importtime) для ролей web / worker / import: "
+        "время старта, время импорта и самые медленные пакеты и модули."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--role", choices=sorted(importtime.BOOTSTRAP), action="append",
+            help="Роль процесса (можно несколько раз); по умолчанию — все.",
+        )
+        parser.add_argument("--top", type=int, default=10, help="Сколько пакетов и модулей показать.")
+
+    def handle(self, *args, role=None, top=10, **options):
+        for name in role or importtime.BOOTSTRAP:
+            report = importtime.profile(name)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{name}: старт {report.wall_ms:.0f} мс, импорт {report.total_ms:.0f} мс, "
+                f"модулей {len(report.modules)}"
+            ))
+            self.stdout.write("  пакеты:")
+            for package, ms in report.packages().most_common(top):
+                self.stdout.write(f"    {ms:8.1f} мс  {package}")
+            self.stdout.write("  модули:")
+            for module, ms in report.slowest_modules(top):
+                self.stdout.write(f"    {ms:8.1f} мс  {module}")
@@ -0,0 +1,129 @@
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+
+from shop import images
+from shop.models import Product, ProductInfo
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает изображения товаров из архива поставщика (zip или каталог). "
+        "Имя файла без расширения — id товара или, с --shop, external_id "
+        "предложения магазина. Декодирование и уменьшение (shop/images.py) — "
+        "в пуле процессов, запись файлов и товаров — в основном процессе."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("source", help="zip-архив или каталог с изображениями.")
+        parser.add_argument("--shop", type=int, help="Имена файлов — external_id предложений этого магазина.")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1,
+            help="Процессов в пуле (по умолчанию — число CPU).",
+        )
+        parser.add_argument(
+            "--no-thumbnails", action="store_true",
+            help="Не ставить задачи на миниатюры (например, если их создадут позже).",
+        )
+
+    def handle(self, *args, source, shop=None, workers=1, no_thumbnails=False, **options):
+        if not os.path.exists(source):
+            raise CommandError(f"Нет такого файла или каталога: {source}")
+        started = time.monotonic()
+
+        entries, rejected = self._entries(source)
+        products = self._products(shop, {stem for _, stem in entries})
+        todo = [(member, products[stem]) for member, stem in entries if stem in products]
+        skipped = len(entries) - len(todo)
+
+        saved = []
+        options = (settings.PRODUCT_IMAGE_MAX_SIDE, settings.PRODUCT_IMAGE_MAX_PIXELS, settings.PRODUCT_IMAGE_QUALITY)
+        with ProcessPoolExecutor(max_workers=max(workers, 1)) as pool:
+            # в очереди пула — не больше workers * 2 файлов: память не растёт с размером архива
+            pending = {}
+            queue = iter(todo)
+            while True:
+                while len(pending) < max(workers, 1) * 2:
+                    item = next(queue, None)
+                    if item is None:
+                        break
+                    member, product_id = item
+                    pending[pool.submit(images.prepare_entry, source, member, *options)] = (member, product_id)
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    member, product_id = pending.pop(future)
+                    try:
+                        body = future.result()
+                    except images.ImageRejected as exc:
+                        self.stderr.write(f"{member}: {exc}")
+                        rejected += 1
+                        continue
+                    except Exception as exc:
+                        # непредвиденная ошибка одного файла не должна останавливать загрузку остальных
+                        self.stderr.write(f"{member}: ошибка обработки: {exc!r}")
+                        rejected += 1
+                        continue
+                    self._save(product_id, body)
+                    saved.append(product_id)
+
+        if saved and not no_thumbnails:
+            from shop.tasks import generate_product_thumbnails  # Celery — только когда нужен
+            for product_id in saved:
+                generate_product_thumbnails.delay(product_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Загружено: {len(saved)}, отклонено: {rejected}, без товара: {skipped}, "
+            f"{time.monotonic() - started:.2f} с"
+        ))
+
+    def _entries(self, source):
+        """[(имя файла в source, имя без расширения)] и число отклонённых по размеру."""
+        limit = settings.PRODUCT_IMAGE_MAX_UPLOAD_SIZE
+        if zipfile.is_zipfile(source):
+            with zipfile.ZipFile(source) as archive:
+                # file_size — размер после распаковки: «zip-бомбу» не распаковываем
+                files = [(info.filename, info.file_size) for info in archive.infolist() if not info.is_dir()]
+        else:
+            files = [
+                (entry.name, entry.stat().st_size)
+                for entry in os.scandir(source) if entry.is_file()
+            ]
+
+        entries, rejected = [], 0
+        for name, size in files:
+            try:
+                images.check_size(size, limit)
+            except images.ImageRejected as exc:
+                self.stderr.write(f"{name}: {exc}")
+                rejected += 1
+                continue
+            entries.append((name, PurePosixPath(name).stem))
+        return entries, rejected
+
+    def _products(self, shop_id, stems):
+        """{имя файла без расширения: id товара}"""
+        ids = {int(stem) for stem in stems if stem.isdigit()}
+        if shop_id is None:
+            found = Product.objects.filter(id__in=ids).values_list("id", "id")
+        else:
+            found = ProductInfo.objects.filter(shop_id=shop_id, external_id__in=ids).values_list(
+                "external_id", "product_id",
+            )
+        return {str(key): product_id for key, product_id in found}
+
+    def _save(self, product_id, body):
+        product = Product.objects.only("id", "image").get(id=product_id)
+        old = product.image.name
+        storage = product.image.storage
+        name = storage.save(f"{Product._meta.get_field('image').upload_to}{product_id}.jpg", ContentFile(body))
+        Product.objects.filter(id=product_id).update(image=name)
+        if old and old != name:
+            storage.delete(old)
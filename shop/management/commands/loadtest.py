@@ -0,0 +1,113 @@
+import asyncio
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.loadtest import runner, stats
+
+DEFAULT_THRESHOLDS = Path(__file__).resolve().parents[2] / "loadtest" / "thresholds.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест всего стека: поднимает сервер на отдельной БД с тестовыми "
+        "данными (или бьёт в --url), гоняет виртуальных пользователей по сценариям "
+        "каталог / корзина / оформление / история заказов и проверяет пороги."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20, help="Виртуальных пользователей.")
+        parser.add_argument("--duration", type=float, default=30.0, help="Длительность прогона, с.")
+        parser.add_argument("--seed", type=int, default=0, help="Seed генератора сценариев.")
+        parser.add_argument(
+            "--url",
+            help="Уже запущенный сервер (например, gunicorn) с данными из --seed-only; "
+                 "без него сервер поднимается локально через runserver.",
+        )
+        parser.add_argument("--port", type=int, default=8765, help="Порт локального сервера.")
+        parser.add_argument("--shops", type=int, default=5)
+        parser.add_argument("--products", type=int, default=500)
+        parser.add_argument("--seed-users", type=int, default=50)
+        parser.add_argument(
+            "--seed-only", action="store_true",
+            help="Только заполнить БД (при config.settings_loadtest) и записать манифест в --manifest.",
+        )
+        parser.add_argument("--manifest", help="Файл манифеста (id и логины для сценариев).")
+        parser.add_argument("--output", help="Сохранить отчёт в JSON (например, как новый baseline).")
+        parser.add_argument("--thresholds", default=str(DEFAULT_THRESHOLDS), help="JSON с порогами.")
+        parser.add_argument("--baseline", help="Отчёт прошлого прогона для сравнения.")
+        parser.add_argument(
+            "--max-regression", type=float, default=0.25,
+            help="Допустимое ухудшение относительно --baseline (доля, по умолчанию 0.25).",
+        )
+
+    def handle(self, *args, **options):
+        if options["seed_only"]:
+            return self._seed(options)
+
+        if options["url"]:
+            if not options["manifest"]:
+                raise CommandError("С --url нужен --manifest от --seed-only на сервере.")
+            manifest = self._read_json(options["manifest"])
+            report = self._run(options["url"], manifest, options)
+        else:
+            with runner.local_server(
+                options["port"], options["shops"], options["products"], options["seed_users"],
+            ) as manifest:
+                report = self._run(f"http://127.0.0.1:{options['port']}", manifest, options)
+
+        self._print(report)
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+        failures = stats.check(
+            report,
+            self._read_json(options["thresholds"]),
+            baseline=self._read_json(options["baseline"]) if options["baseline"] else None,
+            max_regression=options["max_regression"],
+        )
+        if failures:
+            raise CommandError("Пороги нагрузочного теста нарушены:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("Пороги выполнены."))
+
+    def _seed(self, options):
+        if not getattr(settings, "LOADTEST", False):
+            raise CommandError("--seed-only работает только с DJANGO_SETTINGS_MODULE=config.settings_loadtest.")
+        if not options["manifest"]:
+            raise CommandError("Укажите --manifest.")
+        from shop.loadtest.seed import seed
+
+        manifest = seed(options["shops"], options["products"], options["seed_users"])
+        Path(options["manifest"]).write_text(json.dumps(manifest), encoding="utf-8")
+        self.stdout.write(
+            f"Создано: магазинов {options['shops']}, товаров {options['products']}, "
+            f"пользователей {options['seed_users']}."
+        )
+
+    def _run(self, base_url, manifest, options):
+        self.stdout.write(
+            f"{options['users']} пользователей, {options['duration']:.0f} с, {base_url}"
+        )
+        return asyncio.run(runner.run(
+            base_url, manifest, users=options["users"], duration=options["duration"], random_seed=options["seed"],
+        ))
+
+    def _read_json(self, path):
+        try:
+            return json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Не удалось прочитать {path}: {exc}")
+
+    def _print(self, report):
+        for title, rows in (("Сценарии", report["scenarios"]), ("Запросы", report["requests"])):
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(
+                f"  {'':24} {'всего':>7} {'в с':>8} {'ошибок':>7} {'p50 мс':>8} {'p95 мс':>8} {'p99 мс':>8}"
+            )
+            for name, row in rows.items():
+                self.stdout.write(
+                    f"  {name:24} {row['count']:7d} {row['per_sec']:8.1f} {row['error_rate']:7.1%} "
+                    f"{row['p50_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f}"
+                )
@@ -0,0 +1,157 @@
+"""
+Метрики Prometheus: HTTP-запросы, запросы к БД, кэши, задачи Celery
+и бизнес-счётчики корзины и оформления заказа.
+
+Значения копятся в памяти процесса (prometheus_client), отдаются
+GET /metrics (metrics_view) и, у воркера Celery, отдельным HTTP-экспортёром
+на CELERY_METRICS_PORT.
+
+Несколько процессов (gunicorn --workers N, prefork-пул Celery): задайте
+PROMETHEUS_MULTIPROC_DIR — пустой каталог, общий для процессов одного
+сервиса и очищаемый при перезапуске. Каждый процесс пишет свои значения
+в mmap-файлы этого каталога, /metrics суммирует их (MultiProcessCollector).
+"""
+import hmac
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+
+HTTP_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+REQUESTS = Counter(
+    "http_requests", "HTTP-запросы по view, методу и статусу ответа.", ["view", "method", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Время обработки запроса.", ["view", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "SQL-запросов на один HTTP-запрос.", ["view"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests", "Чтения кэшей: hit / miss.", ["cache", "result"],
+)
+TASK_DURATION = Histogram(
+    "celery_task_duration_seconds", "Время выполнения задачи Celery.", ["task", "state"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 1800),
+)
+TASK_FAILURES = Counter("celery_task_failures", "Задачи Celery, завершившиеся ошибкой.", ["task"])
+BASKET_MUTATIONS = Counter("shop_basket_mutations", "Изменения корзины.", ["action"])
+ORDERS_CONFIRMED = Counter("shop_orders_confirmed", "Оформленные заказы.")
+ORDERS_REJECTED = Counter("shop_order_confirm_rejected", "Отказы в оформлении заказа.", ["reason"])
+
+
+def registry():
+    """Реестр для выдачи: сумма по процессам в мультипроцессном режиме."""
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    combined = CollectorRegistry()
+    multiprocess.MultiProcessCollector(combined)
+    return combined
+
+
+def metrics_view(request):
+    """
+    GET /metrics в текстовом формате Prometheus. Требует Bearer-токен
+    METRICS_TOKEN; без заданного токена доступ закрыт.
+    """
+    token = settings.METRICS_TOKEN
+    expected = f"Bearer {token}".encode()
+    if not token or not hmac.compare_digest(request.headers.get("Authorization", "").encode(), expected):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+def cache_result(cache, hit):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """
+    Первый в MIDDLEWARE: число запросов и время по view (имя маршрута,
+    а не путь — чтобы id в URL не плодили метки) и число SQL-запросов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = _QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "<unresolved>"
+        method = request.method if request.method in HTTP_METHODS else "other"
+        REQUESTS.labels(view, method, str(response.status_code)).inc()
+        REQUEST_LATENCY.labels(view, method).observe(elapsed)
+        REQUEST_QUERIES.labels(view).observe(queries.count)
+        return response
+
+
+# ---------- Celery ----------
+
+_task_started = {}
+
+
+def _task_prerun(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - started)
+
+
+def _task_failure(sender=None, **kwargs):
+    TASK_FAILURES.labels(sender.name).inc()
+
+
+def _start_worker_exporter(**kwargs):
+    port = settings.CELERY_METRICS_PORT
+    if port:
+        from prometheus_client import start_http_server
+
+        start_http_server(port, registry=registry())
+
+
+def _worker_process_shutdown(pid=None, **kwargs):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+def connect_celery():
+    """Подписывает метрики задач на сигналы Celery (вызывается из shop/tasks.py)."""
+    from celery import signals
+
+    signals.task_prerun.connect(_task_prerun, dispatch_uid="shop.metrics.task_prerun")
+    signals.task_postrun.connect(_task_postrun, dispatch_uid="shop.metrics.task_postrun")
+    signals.task_failure.connect(_task_failure, dispatch_uid="shop.metrics.task_failure")
+    # экспортёр — в главном процессе воркера; дочерние процессы пула
+    # пишут в PROMETHEUS_MULTIPROC_DIR, который он и читает
+    signals.worker_ready.connect(_start_worker_exporter, dispatch_uid="shop.metrics.worker_ready")
+    signals.worker_process_shutdown.connect(
+        _worker_process_shutdown, dispatch_uid="shop.metrics.worker_process_shutdown",
+    )
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0004_order_history_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='Продано, шт.')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Выручка')),
+            ],
+            options={
+                'verbose_name': 'Продажи магазина за день',
+                'verbose_name_plural': 'Продажи магазинов по дням',
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Задача')),
+                ('position', models.DateTimeField(blank=True, null=True, verbose_name='Обработано до')),
+            ],
+            options={
+                'verbose_name': 'Отметка фоновой задачи',
+                'verbose_name_plural': 'Отметки фоновых задач',
+            },
+        ),
+        migrations.AddField(
+            model_name='shop',
+            name='user',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='shop', to=settings.AUTH_USER_MODEL, verbose_name='Владелец (партнёр)'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at'], name='order_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='shopdailysales',
+            name='product_info',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='shop.productinfo', verbose_name='Товар'),
+        ),
+        migrations.AddField(
+            model_name='shopdailysales',
+            name='shop',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='shop.shop', verbose_name='Магазин'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='shopdailysales',
+            unique_together={('shop', 'day', 'product_info')},
+        ),
+    ]
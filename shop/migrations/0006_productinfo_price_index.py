@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0005_partner_sales'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productinfo',
+            index=models.Index(fields=['product', 'price'], name='productinfo_product_price_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0006_productinfo_price_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='name',
+            field=models.CharField(db_index=True, max_length=255, verbose_name='Название'),
+        ),
+    ]
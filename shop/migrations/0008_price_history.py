@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0007_product_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(verbose_name='Время')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена')),
+                ('price_min', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Мин. цена')),
+                ('price_max', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Макс. цена')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Остаток')),
+                ('product_info', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history', to='shop.productinfo', verbose_name='Товар')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='shop.shop', verbose_name='Магазин')),
+            ],
+            options={
+                'verbose_name': 'История цены',
+                'verbose_name_plural': 'История цен',
+                'indexes': [models.Index(fields=['product_info', 'recorded_at'], name='pricehistory_offer_idx'), models.Index(fields=['shop', 'recorded_at'], name='pricehistory_shop_idx')],
+            },
+        ),
+    ]
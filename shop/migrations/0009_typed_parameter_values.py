@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0008_price_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parameter',
+            name='value_type',
+            field=models.CharField(choices=[('string', 'Строка'), ('number', 'Число'), ('enum', 'Перечисление')], default='string', max_length=16, verbose_name='Тип значения'),
+        ),
+        migrations.AddField(
+            model_name='productparameter',
+            name='value_num',
+            field=models.FloatField(blank=True, null=True, verbose_name='Числовое значение'),
+        ),
+        migrations.AddIndex(
+            model_name='productparameter',
+            index=models.Index(fields=['parameter', 'value_num'], name='productparam_value_num_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+import math
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def _parse_number(value):
+    try:
+        number = float(str(value).strip().replace(',', '.'))
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+def backfill_value_num(apps, schema_editor):
+    """
+    Заполняет ProductParameter.value_num пачками по первичному ключу
+    (без одной огромной транзакции/выборки на больших таблицах)
+    и помечает параметры, у которых все значения числовые, типом "number".
+
+    Миграция не атомарна (Migration.atomic = False): каждая пачка
+    коммитится своим bulk_update. Прерванный запуск безопасно повторить —
+    value_num пересчитывается из value заново.
+    """
+    Parameter = apps.get_model('shop', 'Parameter')
+    ProductParameter = apps.get_model('shop', 'ProductParameter')
+
+    non_numeric = set()
+    last_id = 0
+    while True:
+        batch = list(
+            ProductParameter.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', 'parameter_id', 'value')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for row in batch:
+            row.value_num = _parse_number(row.value)
+            if row.value_num is None:
+                non_numeric.add(row.parameter_id)
+        ProductParameter.objects.bulk_update(batch, ['value_num'])
+        last_id = batch[-1].id
+
+    used = ProductParameter.objects.values_list('parameter_id', flat=True).distinct()
+    Parameter.objects.filter(id__in=used).exclude(id__in=non_numeric).update(value_type='number')
+
+
+class Migration(migrations.Migration):
+    # пачки коммитятся по отдельности, а не одной транзакцией на всю таблицу
+    atomic = False
+
+    dependencies = [
+        ('shop', '0009_typed_parameter_values'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_value_num, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_paths_and_counts(apps, schema_editor):
+    """
+    Все существующие категории — корневые: path = "<id>/".
+    Счётчики — предложения в наличии у магазинов, принимающих заказы
+    (поддерево совпадает с самой категорией).
+    """
+    Category = apps.get_model('shop', 'Category')
+    ProductInfo = apps.get_model('shop', 'ProductInfo')
+
+    counts = dict(
+        ProductInfo.objects.filter(quantity__gt=0, shop__is_active=True)
+        .values_list('product__category_id').annotate(n=Count('id')).order_by()
+    )
+    categories = list(Category.objects.only('id'))
+    for category in categories:
+        category.path = f'{category.id}/'
+        category.offers_count = category.subtree_offers_count = counts.get(category.id, 0)
+    Category.objects.bulk_update(
+        categories, ['path', 'offers_count', 'subtree_offers_count'], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0010_backfill_parameter_value_num'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='offers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Предложений в категории'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='shop.category', verbose_name='Родительская категория'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=255, verbose_name='Путь'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='subtree_offers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Предложений с подкатегориями'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='category_path_idx'),
+        ),
+        migrations.RunPython(fill_paths_and_counts, migrations.RunPython.noop),
+    ]
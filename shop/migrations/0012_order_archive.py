@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-19 13:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0011_category_tree'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='id заказа')),
+                ('status', models.CharField(choices=[('basket', 'Корзина'), ('new', 'Новый'), ('confirmed', 'Подтверждён'), ('sent', 'Отправлен'), ('delivered', 'Доставлен'), ('cancelled', 'Отменён')], max_length=16, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(verbose_name='Создан')),
+                ('updated_at', models.DateTimeField(verbose_name='Обновлён')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Перенесён в архив')),
+                ('items_count', models.PositiveIntegerField(default=0, verbose_name='Позиций')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Сумма')),
+                ('contact', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_orders', to='shop.contact', verbose_name='Контакт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Архивный заказ',
+                'verbose_name_plural': 'Архив заказов',
+                'ordering': ('-created_at',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='id позиции')),
+                ('product_name', models.CharField(max_length=255, verbose_name='Название товара')),
+                ('shop_name', models.CharField(max_length=255, verbose_name='Название магазина')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Цена')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Количество')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='shop.archivedorder', verbose_name='Заказ')),
+                ('product_info', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_order_items', to='shop.productinfo', verbose_name='Товар')),
+                ('shop', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_order_items', to='shop.shop', verbose_name='Магазин')),
+            ],
+            options={
+                'verbose_name': 'Позиция архивного заказа',
+                'verbose_name_plural': 'Позиции архивных заказов',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedorder',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='archived_order_user_idx'),
+        ),
+    ]
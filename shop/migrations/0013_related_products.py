@@ -0,0 +1,76 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0012_order_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductInfoCooccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='Заказов')),
+            ],
+            options={
+                'verbose_name': 'Совместная покупка',
+                'verbose_name_plural': 'Совместные покупки',
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedProductInfo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Место')),
+                ('orders', models.PositiveIntegerField(verbose_name='Заказов вместе')),
+            ],
+            options={
+                'verbose_name': 'Рекомендуемый товар',
+                'verbose_name_plural': 'Рекомендуемые товары',
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='confirmed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Оформлен'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['confirmed_at'], name='order_confirmed_idx'),
+        ),
+        migrations.AddField(
+            model_name='productinfocooccurrence',
+            name='product_info',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cooccurrences', to='shop.productinfo', verbose_name='Товар'),
+        ),
+        migrations.AddField(
+            model_name='productinfocooccurrence',
+            name='related',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shop.productinfo', verbose_name='Купленный вместе'),
+        ),
+        migrations.AddField(
+            model_name='relatedproductinfo',
+            name='product_info',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_offers', to='shop.productinfo', verbose_name='Товар'),
+        ),
+        migrations.AddField(
+            model_name='relatedproductinfo',
+            name='related',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='shop.productinfo', verbose_name='Рекомендуемый товар'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='productinfocooccurrence',
+            unique_together={('product_info', 'related')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='relatedproductinfo',
+            unique_together={('product_info', 'rank')},
+        ),
+    ]
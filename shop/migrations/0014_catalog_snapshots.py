@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0013_related_products'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('category', 'Категория'), ('shop', 'Магазин')], max_length=16, verbose_name='Фильтр')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id категории или магазина')),
+                ('version', models.PositiveIntegerField(default=1, verbose_name='Версия данных')),
+                ('built_version', models.PositiveIntegerField(default=0, verbose_name='Собранная версия')),
+                ('etag', models.CharField(blank=True, max_length=40, verbose_name='ETag')),
+                ('built_at', models.DateTimeField(blank=True, null=True, verbose_name='Собран')),
+            ],
+            options={
+                'verbose_name': 'Снимок каталога',
+                'verbose_name_plural': 'Снимки каталога',
+                'unique_together': {('scope', 'object_id')},
+            },
+        ),
+    ]
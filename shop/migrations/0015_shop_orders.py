@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum
+
+
+def split_existing_orders(apps, schema_editor):
+    """Подзаказы магазинов для уже оформленных заказов (как shop_orders.split)."""
+    OrderItem = apps.get_model('shop', 'OrderItem')
+    ShopOrder = apps.get_model('shop', 'ShopOrder')
+
+    items = OrderItem.objects.exclude(order__status='basket')
+    rows = (
+        items.values('order_id', 'product_info__shop_id')
+        .annotate(
+            items_count=Count('id'),
+            total=Sum(
+                F('quantity') * F('product_info__price'),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+        .order_by()
+    )
+    ShopOrder.objects.bulk_create(
+        (
+            ShopOrder(
+                order_id=row['order_id'], shop_id=row['product_info__shop_id'],
+                items_count=row['items_count'], total=row['total'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+    items.update(
+        shop_order=Subquery(
+            ShopOrder.objects.filter(
+                order=OuterRef('order_id'), shop__product_infos=OuterRef('product_info_id'),
+            ).values('pk')[:1]
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0014_catalog_snapshots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('items_count', models.PositiveIntegerField(default=0, verbose_name='Позиций')),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Сумма')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shop_orders', to='shop.order', verbose_name='Заказ')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shop_orders', to='shop.shop', verbose_name='Магазин')),
+            ],
+            options={
+                'verbose_name': 'Подзаказ магазина',
+                'verbose_name_plural': 'Подзаказы магазинов',
+                'unique_together': {('order', 'shop')},
+            },
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='shop_order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='items', to='shop.shoporder', verbose_name='Подзаказ магазина'),
+        ),
+        migrations.RunPython(split_existing_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0015_shop_orders'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='category',
+            name='category_path_idx',
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='category_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -1,5 +1,11 @@
+import math
+
 from django.conf import settings
 from django.db import models
+from django.db.models import (
+    Count, DecimalField, F, IntegerField, OuterRef, Prefetch, Subquery, Sum, Value,
+)
+from django.db.models.functions import Coalesce
 from imagekit.models import ImageSpecField
 from imagekit.processors import ResizeToFill
 
@@ -9,6 +15,14 @@ class Shop(models.Model):
     name = models.CharField(max_length=255, verbose_name="Название")
     url = models.URLField(blank=True, null=True, verbose_name="Сайт")
     is_active = models.BooleanField(default=True, verbose_name="Принимает заказы")
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        related_name="shop",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Владелец (партнёр)",
+    )
 
     class Meta:
         verbose_name = "Магазин"
@@ -18,25 +32,139 @@ class Shop(models.Model):
         return self.name
 
 
+class CategoryQuerySet(models.QuerySet):
+    def subtree(self, path):
+        """
+        Категория с путём path и все её потомки — одним LIKE 'path%' по индексу path.
+
+        Путь — id предков и самой категории через "/" ("3/17/42/"). Все пути
+        поддерева начинаются с path; в путях только цифры и "/", поэтому
+        экранировать в шаблоне нечего.
+        """
+        return self.filter(**Category.subtree_lookup(path))
+
+
 class Category(models.Model):
     name = models.CharField(max_length=255, verbose_name="Название")
+    parent = models.ForeignKey(
+        "self",
+        related_name="children",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name="Родительская категория",
+    )
+    # материализованный путь, см. CategoryQuerySet.subtree; заполняется в save()
+    path = models.CharField(max_length=255, default="", editable=False, verbose_name="Путь")
     shops = models.ManyToManyField(
         Shop,
         related_name="categories",
         blank=True,
         verbose_name="Магазины",
     )
+    # предложения в наличии у магазинов, принимающих заказы (shop/category_counts.py)
+    offers_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Предложений в категории",
+    )
+    subtree_offers_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Предложений с подкатегориями",
+    )
+
+    objects = CategoryQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Категория"
         verbose_name_plural = "Категории"
+        indexes = [
+            # varchar_pattern_ops (PostgreSQL): LIKE 'path%' идёт по индексу при любой
+            # collation БД; диапазон строк по обычному индексу зависел бы от неё
+            models.Index(fields=["path"], name="category_path_idx", opclasses=["varchar_pattern_ops"]),
+        ]
 
     def __str__(self) -> str:
         return self.name
 
+    @staticmethod
+    def subtree_lookup(path, prefix=""):
+        """Условия filter() для поддерева с путём path (prefix — путь к полю, напр. "product__category__")."""
+        return {f"{prefix}path__startswith": path}
+
+    def ancestor_ids(self):
+        """id предков от корня к родителю."""
+        return [int(pk) for pk in self.path.split("/")[:-2]]
+
+    def _moves_into_own_subtree(self):
+        return bool(self.pk and self.parent_id) and (
+            self.parent_id == self.pk or str(self.pk) in self.parent.path.split("/")
+        )
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+
+        if self._moves_into_own_subtree():
+            raise ValidationError({"parent": "Категория не может быть вложена сама в себя."})
+
+    # пишутся только через update()/bulk_update: save() устаревшего экземпляра их не затирает
+    MAINTAINED_FIELDS = ("path", "offers_count", "subtree_offers_count")
+
+    def save(self, *args, **kwargs):
+        if self._moves_into_own_subtree():
+            raise ValueError("Category cannot be moved into its own subtree")
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.MAINTAINED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+        parent_path = self.parent.path if self.parent_id else ""
+        path = f"{parent_path}{self.pk}/"
+        if path == self.path:
+            return
+        old_path, self.path = self.path, path
+        Category.objects.filter(pk=self.pk).update(path=path)
+        if not old_path:
+            return
+
+        # перенос: пути потомков и счётчики старых и новых предков
+        descendants = list(Category.objects.subtree(old_path).exclude(pk=self.pk).only("id", "path"))
+        for descendant in descendants:
+            descendant.path = path + descendant.path[len(old_path):]
+        Category.objects.bulk_update(descendants, ["path"], batch_size=1000)
+
+        from . import category_counts
+        old_ancestors = [int(pk) for pk in old_path.split("/")[:-2]]
+        category_counts.refresh_subtree_counts(old_ancestors + self.ancestor_ids())
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_price_summary(self, exclude_shop_ids=()):
+        """
+        Аннотирует товары сводкой по предложениям в наличии:
+        best_price, offers_count, min_price_shop_id / min_price_shop_name.
+
+        Считается коррелированными подзапросами по индексу (product, price),
+        т.е. одним SQL-запросом на всю страницу списка.
+        """
+        offers = ProductInfo.objects.filter(product=OuterRef("pk"), quantity__gt=0)
+        if exclude_shop_ids:
+            offers = offers.exclude(shop_id__in=exclude_shop_ids)
+        cheapest = offers.order_by("price", "id")
+        offers_count = offers.order_by().values("product").annotate(cnt=Count("id")).values("cnt")
+
+        return self.annotate(
+            best_price=Subquery(cheapest.values("price")[:1]),
+            min_price_shop_id=Subquery(cheapest.values("shop_id")[:1]),
+            min_price_shop_name=Subquery(cheapest.values("shop__name")[:1]),
+            offers_count=Coalesce(
+                Subquery(offers_count, output_field=IntegerField()),
+                Value(0),
+            ),
+        )
+
 
 class Product(models.Model):
-    name = models.CharField(max_length=255, verbose_name="Название")
+    name = models.CharField(max_length=255, db_index=True, verbose_name="Название")
     category = models.ForeignKey(
         Category,
         related_name="products",
@@ -72,6 +200,8 @@ class Product(models.Model):
         options={'quality': 90}
     )
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Товар"
         verbose_name_plural = "Товары"
@@ -117,13 +247,46 @@ class ProductInfo(models.Model):
         verbose_name = "Информация о товаре"
         verbose_name_plural = "Информация о товарах"
         unique_together = ("shop", "external_id")
+        indexes = [
+            # самое дешёвое предложение товара: WHERE product_id = ? ORDER BY price
+            models.Index(fields=["product", "price"], name="productinfo_product_price_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.product} ({self.shop})"
 
 
+def parse_number(value):
+    """
+    Число из значения параметра ("512", "6.5", "6,5") или None, если это не число.
+    """
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(str(value).strip().replace(",", "."))
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
 class Parameter(models.Model):
+    TYPE_STRING = "string"
+    TYPE_NUMBER = "number"
+    TYPE_ENUM = "enum"
+
+    TYPE_CHOICES = (
+        (TYPE_STRING, "Строка"),
+        (TYPE_NUMBER, "Число"),
+        (TYPE_ENUM, "Перечисление"),
+    )
+
     name = models.CharField(max_length=255, unique=True, verbose_name="Название")
+    value_type = models.CharField(
+        max_length=16,
+        choices=TYPE_CHOICES,
+        default=TYPE_STRING,
+        verbose_name="Тип значения",
+    )
 
     class Meta:
         verbose_name = "Параметр"
@@ -147,15 +310,28 @@ class ProductParameter(models.Model):
         verbose_name="Параметр",
     )
     value = models.CharField(max_length=255, verbose_name="Значение")
+    # числовое представление value (если это число) — для диапазонов и сортировки
+    value_num = models.FloatField(null=True, blank=True, verbose_name="Числовое значение")
 
     class Meta:
         verbose_name = "Параметр товара"
         verbose_name_plural = "Параметры товара"
         unique_together = ("product_info", "parameter")
+        indexes = [
+            # WHERE parameter_id = ? AND value_num BETWEEN ? AND ?
+            models.Index(fields=["parameter", "value_num"], name="productparam_value_num_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.parameter}: {self.value}"
 
+    def save(self, *args, **kwargs):
+        self.value_num = parse_number(self.value)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "value" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "value_num"}
+        super().save(*args, **kwargs)
+
 
 class Contact(models.Model):
     user = models.ForeignKey(
@@ -176,6 +352,40 @@ class Contact(models.Model):
         return f"{self.city}, {self.address}"
 
 
+class OrderQuerySet(models.QuerySet):
+    def with_items(self):
+        """
+        Подгружает позиции заказа вместе с товаром и магазином
+        (два запроса на всю выборку вместо запросов на каждую позицию).
+        """
+        return self.prefetch_related(
+            Prefetch(
+                "ordered_items",
+                queryset=OrderItem.objects.select_related(
+                    "product_info__product",
+                    "product_info__shop",
+                ),
+            )
+        )
+
+    def with_summary(self):
+        """
+        Аннотирует заказы количеством позиций и суммой,
+        посчитанными в SQL (один запрос с GROUP BY).
+        """
+        return self.annotate(
+            items_count=Count("ordered_items"),
+            total=Coalesce(
+                Sum(
+                    F("ordered_items__quantity") * F("ordered_items__product_info__price"),
+                    output_field=DecimalField(max_digits=14, decimal_places=2),
+                ),
+                Value(0),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+        )
+
+
 class Order(models.Model):
     STATUS_BASKET = "basket"
     STATUS_NEW = "new"
@@ -193,6 +403,9 @@ class Order(models.Model):
         (STATUS_CANCELLED, "Отменён"),
     )
 
+    # статусы, которые считаются продажей в отчётах магазинов
+    SALES_STATUSES = (STATUS_NEW, STATUS_CONFIRMED, STATUS_SENT, STATUS_DELIVERED)
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         related_name="orders",
@@ -215,18 +428,65 @@ class Order(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создан")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлён")
+    # момент оформления корзины (POST /api/v1/orders/confirm/)
+    confirmed_at = models.DateTimeField(null=True, blank=True, verbose_name="Оформлен")
+
+    objects = OrderQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Заказ"
         verbose_name_plural = "Заказы"
         ordering = ("-created_at",)
+        indexes = [
+            # история заказов: WHERE user_id = ? ORDER BY created_at DESC, id DESC
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="order_user_created_idx",
+            ),
+            # инкрементальное обновление отчётов: WHERE updated_at >= ?
+            models.Index(fields=["updated_at"], name="order_updated_idx"),
+            # новые оформленные заказы для рекомендаций: WHERE confirmed_at >= ?
+            models.Index(fields=["confirmed_at"], name="order_confirmed_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Заказ #{self.pk} ({self.get_status_display()})"
 
     @property
     def total_sum(self):
-        return sum(item.total_price for item in self.items.all())
+        return sum(item.total_price for item in self.ordered_items.all())
+
+
+class ShopOrder(models.Model):
+    """
+    Подзаказ магазина: часть заказа с позициями одного магазина.
+    Создаются при оформлении корзины (shop/shop_orders.py); по ним
+    магазин находит свои заказы без просмотра чужих позиций.
+    """
+
+    order = models.ForeignKey(
+        Order,
+        related_name="shop_orders",
+        on_delete=models.CASCADE,
+        verbose_name="Заказ",
+    )
+    shop = models.ForeignKey(
+        Shop,
+        related_name="shop_orders",
+        on_delete=models.CASCADE,
+        verbose_name="Магазин",
+    )
+    # считаются в SQL при оформлении
+    items_count = models.PositiveIntegerField(default=0, verbose_name="Позиций")
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Сумма")
+
+    class Meta:
+        verbose_name = "Подзаказ магазина"
+        verbose_name_plural = "Подзаказы магазинов"
+        unique_together = ("order", "shop")
+
+    def __str__(self) -> str:
+        return f"Заказ #{self.order_id} / {self.shop}"
 
 
 class OrderItem(models.Model):
@@ -243,6 +503,15 @@ class OrderItem(models.Model):
         verbose_name="Товар",
     )
     quantity = models.PositiveIntegerField(default=1, verbose_name="Количество")
+    # подзаказ магазина товара; у позиций корзины — пусто
+    shop_order = models.ForeignKey(
+        ShopOrder,
+        related_name="items",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        verbose_name="Подзаказ магазина",
+    )
 
     class Meta:
         verbose_name = "Позиция заказа"
@@ -254,4 +523,276 @@ class OrderItem(models.Model):
 
     @property
     def total_price(self):
-        return self.quantity * self.product_info.price
\ No newline at end of file
+        return self.quantity * self.product_info.price
+
+
+class ArchivedOrder(models.Model):
+    """
+    Заказ в конечном статусе (доставлен / отменён), перенесённый из Order
+    задачей shop.tasks.archive_orders (shop/order_archive.py).
+
+    id совпадает с id исходного заказа; число позиций и сумма посчитаны
+    при архивации по ценам на тот момент. История заказов и
+    GET /api/v1/orders/{id}/ читают архив вместе с Order.
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name="id заказа")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="archived_orders",
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+    )
+    status = models.CharField(max_length=16, choices=Order.STATUS_CHOICES, verbose_name="Статус")
+    contact = models.ForeignKey(
+        Contact,
+        related_name="archived_orders",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Контакт",
+    )
+    created_at = models.DateTimeField(verbose_name="Создан")
+    updated_at = models.DateTimeField(verbose_name="Обновлён")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Перенесён в архив")
+    items_count = models.PositiveIntegerField(default=0, verbose_name="Позиций")
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Сумма")
+
+    class Meta:
+        verbose_name = "Архивный заказ"
+        verbose_name_plural = "Архив заказов"
+        ordering = ("-created_at",)
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="archived_order_user_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"Заказ #{self.pk} ({self.get_status_display()}, архив)"
+
+
+class ArchivedOrderItem(models.Model):
+    """
+    Позиция архивного заказа: цена, названия товара и магазина
+    сохраняются на момент архивации.
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name="id позиции")
+    order = models.ForeignKey(
+        ArchivedOrder,
+        related_name="items",
+        on_delete=models.CASCADE,
+        verbose_name="Заказ",
+    )
+    product_info = models.ForeignKey(
+        ProductInfo,
+        related_name="archived_order_items",
+        on_delete=models.SET_NULL,
+        null=True,
+        verbose_name="Товар",
+    )
+    shop = models.ForeignKey(
+        Shop,
+        related_name="archived_order_items",
+        on_delete=models.SET_NULL,
+        null=True,
+        verbose_name="Магазин",
+    )
+    product_name = models.CharField(max_length=255, verbose_name="Название товара")
+    shop_name = models.CharField(max_length=255, verbose_name="Название магазина")
+    price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Цена")
+    quantity = models.PositiveIntegerField(verbose_name="Количество")
+
+    class Meta:
+        verbose_name = "Позиция архивного заказа"
+        verbose_name_plural = "Позиции архивных заказов"
+
+    def __str__(self) -> str:
+        return f"{self.product_name} x {self.quantity}"
+
+
+class ShopDailySales(models.Model):
+    """
+    Дневная свёртка продаж магазина по товарным предложениям.
+
+    Заполняется задачей shop.tasks.refresh_shop_daily_sales
+    и используется отчётом /api/v1/partner/orders/stats/,
+    чтобы не агрегировать OrderItem за год на каждый запрос.
+    """
+    shop = models.ForeignKey(
+        Shop,
+        related_name="daily_sales",
+        on_delete=models.CASCADE,
+        verbose_name="Магазин",
+    )
+    product_info = models.ForeignKey(
+        ProductInfo,
+        related_name="daily_sales",
+        on_delete=models.CASCADE,
+        verbose_name="Товар",
+    )
+    day = models.DateField(verbose_name="День")
+    units = models.PositiveIntegerField(default=0, verbose_name="Продано, шт.")
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name="Выручка",
+    )
+
+    class Meta:
+        verbose_name = "Продажи магазина за день"
+        verbose_name_plural = "Продажи магазинов по дням"
+        unique_together = ("shop", "day", "product_info")
+
+    def __str__(self) -> str:
+        return f"{self.shop} {self.day}: {self.product_info_id} x {self.units}"
+
+
+class PriceHistory(models.Model):
+    """
+    История цены и остатка предложения (только изменения, append-only).
+
+    Сырые строки: price_min = price_max = price. Старше
+    PRICE_HISTORY_RAW_DAYS строки сжимаются задачей compact_price_history
+    до одной на предложение в день: price/quantity — последние за день,
+    price_min/price_max — диапазон цены за день.
+    """
+    product_info = models.ForeignKey(
+        ProductInfo,
+        related_name="history",
+        on_delete=models.CASCADE,
+        verbose_name="Товар",
+    )
+    shop = models.ForeignKey(
+        Shop,
+        related_name="price_history",
+        on_delete=models.CASCADE,
+        verbose_name="Магазин",
+    )
+    recorded_at = models.DateTimeField(verbose_name="Время")
+    price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Цена")
+    price_min = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Мин. цена")
+    price_max = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Макс. цена")
+    quantity = models.PositiveIntegerField(verbose_name="Остаток")
+
+    class Meta:
+        verbose_name = "История цены"
+        verbose_name_plural = "История цен"
+        indexes = [
+            # история одного предложения за период — один range scan
+            models.Index(fields=["product_info", "recorded_at"], name="pricehistory_offer_idx"),
+            models.Index(fields=["shop", "recorded_at"], name="pricehistory_shop_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.product_info_id} {self.recorded_at}: {self.price} / {self.quantity}"
+
+
+class ProductInfoCooccurrence(models.Model):
+    """
+    Сколько оформленных заказов содержали оба предложения (разреженная
+    матрица «купили вместе», по строке на каждое направление пары).
+
+    Накапливается задачей shop.tasks.refresh_related_products
+    (shop/recommendations.py), из неё же выбирается RelatedProductInfo.
+    """
+    product_info = models.ForeignKey(
+        ProductInfo,
+        related_name="cooccurrences",
+        on_delete=models.CASCADE,
+        verbose_name="Товар",
+    )
+    related = models.ForeignKey(
+        ProductInfo,
+        related_name="+",
+        on_delete=models.CASCADE,
+        verbose_name="Купленный вместе",
+    )
+    orders = models.PositiveIntegerField(default=0, verbose_name="Заказов")
+
+    class Meta:
+        verbose_name = "Совместная покупка"
+        verbose_name_plural = "Совместные покупки"
+        unique_together = ("product_info", "related")
+
+    def __str__(self) -> str:
+        return f"{self.product_info_id} + {self.related_id}: {self.orders}"
+
+
+class RelatedProductInfo(models.Model):
+    """
+    Топ RELATED_PRODUCTS_TOP предложений, которые чаще всего покупали
+    вместе с данным: /api/v1/products-info/{id}/related/ читает их
+    одним запросом по индексу (product_info, rank).
+    """
+    product_info = models.ForeignKey(
+        ProductInfo,
+        related_name="related_offers",
+        on_delete=models.CASCADE,
+        verbose_name="Товар",
+    )
+    related = models.ForeignKey(
+        ProductInfo,
+        related_name="+",
+        on_delete=models.CASCADE,
+        verbose_name="Рекомендуемый товар",
+    )
+    rank = models.PositiveSmallIntegerField(verbose_name="Место")
+    orders = models.PositiveIntegerField(verbose_name="Заказов вместе")
+
+    class Meta:
+        verbose_name = "Рекомендуемый товар"
+        verbose_name_plural = "Рекомендуемые товары"
+        unique_together = ("product_info", "rank")
+
+    def __str__(self) -> str:
+        return f"{self.product_info_id} #{self.rank}: {self.related_id}"
+
+
+class CatalogSnapshot(models.Model):
+    """
+    Готовый ответ /api/v1/products-info/ для ?category_id= или ?shop_id=
+    в файлах CATALOG_SNAPSHOT_DIR (shop/catalog_snapshots.py).
+
+    version растёт при изменении предложений категории или магазина,
+    built_version — версия, из которой собраны файлы. Отдавать файлы
+    можно, пока они совпадают.
+    """
+    SCOPE_CATEGORY = "category"
+    SCOPE_SHOP = "shop"
+    SCOPE_CHOICES = (
+        (SCOPE_CATEGORY, "Категория"),
+        (SCOPE_SHOP, "Магазин"),
+    )
+
+    scope = models.CharField(max_length=16, choices=SCOPE_CHOICES, verbose_name="Фильтр")
+    object_id = models.PositiveIntegerField(verbose_name="id категории или магазина")
+    version = models.PositiveIntegerField(default=1, verbose_name="Версия данных")
+    built_version = models.PositiveIntegerField(default=0, verbose_name="Собранная версия")
+    etag = models.CharField(max_length=40, blank=True, verbose_name="ETag")
+    built_at = models.DateTimeField(null=True, blank=True, verbose_name="Собран")
+
+    class Meta:
+        verbose_name = "Снимок каталога"
+        verbose_name_plural = "Снимки каталога"
+        unique_together = ("scope", "object_id")
+
+    def __str__(self) -> str:
+        return f"{self.scope}-{self.object_id} v{self.built_version}/{self.version}"
+
+
+class TaskCheckpoint(models.Model):
+    """
+    Отметка, до которой фоновая задача уже обработала данные
+    (для инкрементальных пересчётов).
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name="Задача")
+    position = models.DateTimeField(null=True, blank=True, verbose_name="Обработано до")
+
+    class Meta:
+        verbose_name = "Отметка фоновой задачи"
+        verbose_name_plural = "Отметки фоновых задач"
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.position}"
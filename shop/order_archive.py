@@ -0,0 +1,112 @@
+"""
+Архивация заказов в конечных статусах (доставлен / отменён).
+
+Заказы, не менявшиеся дольше ORDER_ARCHIVE_AFTER_DAYS, переносятся из
+Order/OrderItem в ArchivedOrder/ArchivedOrderItem пачками по
+ORDER_ARCHIVE_BATCH_SIZE: каждая пачка — одна короткая транзакция
+(вставка в архив и удаление из рабочих таблиц), между пачками — пауза
+ORDER_ARCHIVE_BATCH_PAUSE секунд, чтобы не держать блокировки и не
+мешать корзине и оформлению заказов. За один запуск переносится не больше
+ORDER_ARCHIVE_MAX_BATCHES пачек, остальное — в следующий запуск.
+
+Чтение: история заказов и карточка заказа смотрят и в архив
+(OrderViewSet.history / retrieve), отчёты магазинов — shop/analytics.py.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, ShopOrder
+
+ARCHIVE_STATUSES = (Order.STATUS_DELIVERED, Order.STATUS_CANCELLED)
+
+
+def candidates(older_than_days=None):
+    """Заказы, которые пора переносить в архив (по индексу order_updated_idx)."""
+    if older_than_days is None:
+        older_than_days = settings.ORDER_ARCHIVE_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return Order.objects.filter(status__in=ARCHIVE_STATUSES, updated_at__lt=cutoff)
+
+
+def archive_batch(order_ids):
+    """
+    Переносит заказы order_ids (если они всё ещё в конечном статусе)
+    в архив одной транзакцией. Возвращает число перенесённых заказов.
+    """
+    with transaction.atomic():
+        orders = list(
+            Order.objects.select_for_update()
+            .filter(pk__in=order_ids, status__in=ARCHIVE_STATUSES)
+            .with_items()
+        )
+        if not orders:
+            return 0
+
+        archived, items = [], []
+        for order in orders:
+            total = 0
+            lines = order.ordered_items.all()
+            for line in lines:
+                offer = line.product_info
+                total += offer.price * line.quantity
+                items.append(ArchivedOrderItem(
+                    id=line.pk,
+                    order_id=order.pk,
+                    product_info_id=offer.pk,
+                    shop_id=offer.shop_id,
+                    product_name=offer.product.name,
+                    shop_name=offer.shop.name,
+                    price=offer.price,
+                    quantity=line.quantity,
+                ))
+            archived.append(ArchivedOrder(
+                id=order.pk,
+                user_id=order.user_id,
+                status=order.status,
+                contact_id=order.contact_id,
+                created_at=order.created_at,
+                updated_at=order.updated_at,
+                items_count=len(lines),
+                total=total,
+            ))
+
+        ids = [order.pk for order in orders]
+        ArchivedOrder.objects.bulk_create(archived)
+        ArchivedOrderItem.objects.bulk_create(items, batch_size=1000)
+        # позиции ссылаются и на заказ, и на подзаказ магазина (ShopOrder), так
+        # что каскад от Order заставил бы Django выбирать подзаказы в память.
+        # Удаляем от листьев к корню по order_id: позиции — одним DELETE без
+        # выборки строк, у подзаказов и заказов каскадам уже нечего удалять
+        OrderItem.objects.filter(order_id__in=ids).delete()
+        ShopOrder.objects.filter(order_id__in=ids).delete()
+        Order.objects.filter(pk__in=ids).delete()
+    return len(orders)
+
+
+def archive(older_than_days=None, batch_size=None, pause=None, max_batches=None):
+    """
+    Переносит подходящие заказы пачками; возвращает число перенесённых.
+    Параметры по умолчанию — ORDER_ARCHIVE_* из настроек.
+    """
+    batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+    pause = settings.ORDER_ARCHIVE_BATCH_PAUSE if pause is None else pause
+    max_batches = max_batches or settings.ORDER_ARCHIVE_MAX_BATCHES
+
+    archived = 0
+    for batch in range(max_batches):
+        ids = list(
+            candidates(older_than_days).order_by("pk").values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        if batch and pause:
+            time.sleep(pause)
+        moved = archive_batch(ids)
+        if not moved:
+            break
+        archived += moved
+    return archived
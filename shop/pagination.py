@@ -0,0 +1,124 @@
+import base64
+import heapq
+from datetime import datetime
+from itertools import islice
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset-пагинация по паре (created_at, id), от новых к старым.
+
+    В отличие от LIMIT/OFFSET стоимость любой страницы одинакова:
+    курсор превращается в условие
+    created_at < X OR (created_at = X AND id < Y),
+    которое обслуживается индексом (..., -created_at, -id).
+
+    GET ...?page_size=50&cursor=<непрозрачная строка из поля "next">
+    """
+
+    ordering_field = 'created_at'
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        queryset может быть списком querysets с одинаковыми полями
+        (например, заказы и архив заказов): каждый читается тем же
+        keyset-условием, страница собирается слиянием по (created_at, id).
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        position = self.decode_cursor(request)
+        querysets = queryset if isinstance(queryset, (list, tuple)) else [queryset]
+        rows = [self._slice(qs, position) for qs in querysets]
+        if len(rows) > 1:
+            key = lambda obj: (getattr(obj, self.ordering_field), obj.pk)  # noqa: E731
+            page = list(islice(heapq.merge(*rows, key=key, reverse=True), self.page_size + 1))
+        else:
+            page = rows[0]
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+
+        self.next_position = None
+        if self.has_next:
+            last = page[-1]
+            self.next_position = (getattr(last, self.ordering_field), last.pk)
+        return page
+
+    def _slice(self, queryset, position):
+        if position is not None:
+            value, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{self.ordering_field}__lt': value})
+                | Q(**{self.ordering_field: value, 'pk__lt': pk})
+            )
+
+        queryset = queryset.order_by(f'-{self.ordering_field}', '-pk')
+        # берём на одну строку больше, чтобы понять, есть ли следующая страница
+        return list(queryset[:self.page_size + 1])
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            value, pk = raw.rsplit('|', 1)
+            return datetime.fromisoformat(value), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        value, pk = position
+        raw = f'{value.isoformat()}|{pk}'
+        return base64.urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class PriceHistoryPagination(KeysetPagination):
+    ordering_field = 'recorded_at'
+    page_size = 500
+    max_page_size = 5000
+
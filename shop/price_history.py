@@ -0,0 +1,117 @@
+"""
+Запись и сжатие истории цен и остатков (PriceHistory).
+
+История пишется пачками теми, кто меняет предложения массово
+(импорт load_yaml_data.py, POST /api/v1/partner/stock/), а не сигналом
+на каждый save(): одна вставка bulk_create на всю пачку и только
+для предложений, у которых цена или остаток действительно изменились.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Min
+from django.utils import timezone
+
+from .models import PriceHistory, TaskCheckpoint
+
+
+def _decimal(value):
+    # импорт присваивает offer.price значение из YAML как есть (float 19.99),
+    # а previous читается из БД как Decimal: Decimal('19.99') != 19.99
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def record(offers, previous, recorded_at=None):
+    """
+    Добавляет строки истории для offers, у которых (price, quantity)
+    отличается от previous[offer.id]. Предложения, которых нет в previous,
+    считаются новыми и тоже записываются. Возвращает число строк.
+    """
+    recorded_at = recorded_at or timezone.now()
+    rows = []
+    for offer in offers:
+        price = _decimal(offer.price)
+        if previous.get(offer.id) == (price, offer.quantity):
+            continue
+        rows.append(PriceHistory(
+            product_info_id=offer.id,
+            shop_id=offer.shop_id,
+            recorded_at=recorded_at,
+            price=price,
+            price_min=price,
+            price_max=price,
+            quantity=offer.quantity,
+        ))
+    PriceHistory.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def _day_range(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def compact_day(day):
+    """
+    Сжимает историю за день до одной строки на предложение.
+    Возвращает число удалённых строк.
+    """
+    start, end = _day_range(day)
+    day_rows = PriceHistory.objects.filter(recorded_at__gte=start, recorded_at__lt=end)
+    groups = list(
+        day_rows.values('product_info')
+        .annotate(rows=Count('id'), low=Min('price_min'), high=Max('price_max'), last_id=Max('id'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    if not groups:
+        return 0
+
+    with transaction.atomic():
+        last_rows = PriceHistory.objects.in_bulk([g['last_id'] for g in groups])
+        for group in groups:
+            row = last_rows[group['last_id']]
+            row.price_min = group['low']
+            row.price_max = group['high']
+        PriceHistory.objects.bulk_update(last_rows.values(), ['price_min', 'price_max'], batch_size=1000)
+
+        deleted, _ = (
+            day_rows.filter(product_info__in=[g['product_info'] for g in groups])
+            .exclude(id__in=list(last_rows))
+            .delete()
+        )
+    return deleted
+
+
+def compact(raw_days, keep_days, max_days=None):
+    """
+    Поддерживает историю ограниченной:
+    - строки старше keep_days дней удаляются;
+    - дни старше raw_days сжимаются до дневных строк (с прошлого запуска
+      и не больше max_days дней за вызов, чтобы не держать БД долго).
+    Возвращает (сжато строк, удалено устаревших строк).
+    """
+    today = timezone.now().date()
+    expired, _ = PriceHistory.objects.filter(
+        recorded_at__lt=_day_range(today - timedelta(days=keep_days))[0],
+    ).delete()
+
+    checkpoint, _ = TaskCheckpoint.objects.get_or_create(name='price_history_compaction')
+    cutoff = today - timedelta(days=raw_days)
+    if checkpoint.position is not None:
+        day = timezone.localtime(checkpoint.position).date()
+    else:
+        oldest = PriceHistory.objects.order_by('recorded_at').values_list('recorded_at', flat=True).first()
+        day = timezone.localtime(oldest).date() if oldest else cutoff
+
+    compacted = 0
+    processed = 0
+    while day < cutoff and (max_days is None or processed < max_days):
+        compacted += compact_day(day)
+        day += timedelta(days=1)
+        processed += 1
+
+    checkpoint.position = _day_range(day)[0]
+    checkpoint.save(update_fields=['position'])
+    return compacted, expired
@@ -0,0 +1,152 @@
+"""
+«С этим товаром покупают»: рекомендации по совместным покупкам.
+
+Считать их на каждый запрос по OrderItem слишком дорого, поэтому задача
+shop.tasks.refresh_related_products периодически:
+
+1. проходит позиции заказов, оформленных с прошлого запуска (по
+   Order.confirmed_at), и считает пары предложений из одного заказа;
+   окно запуска заканчивается на RELATED_PRODUCTS_LAG_SECONDS раньше
+   текущего момента: confirmed_at пишется до коммита оформления, и заказ,
+   чья транзакция ещё не закончилась, иначе попал бы в уже пройденное окно;
+2. прибавляет их к разреженной матрице ProductInfoCooccurrence;
+3. для затронутых предложений заново выбирает топ RELATED_PRODUCTS_TOP
+   соседей в RelatedProductInfo — её и читает
+   /api/v1/products-info/{id}/related/ одним запросом по индексу.
+
+Первый запуск (rebuild) проходит всю историю, включая архив заказов.
+Отменённые заказы не учитываются ни при полном пересчёте, ни при
+инкрементальном; но заказ, отменённый уже после того, как его пары
+посчитаны, из матрицы не вычитается — до следующего rebuild.
+"""
+import heapq
+from collections import Counter
+from itertools import groupby, permutations
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import ArchivedOrderItem, Order, OrderItem, ProductInfoCooccurrence, RelatedProductInfo
+
+CHUNK_SIZE = 500
+
+
+def _chunks(ids, size=CHUNK_SIZE):
+    ids = sorted(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def order_items(since=None, until=None):
+    """
+    Пары (order_id, product_info_id), упорядоченные по заказу.
+
+    С границами — позиции заказов, оформленных в [since, until), без них —
+    вся история, плюс архив. Корзины и отменённые заказы не учитываются.
+    """
+    live = OrderItem.objects.exclude(order__status__in=[Order.STATUS_BASKET, Order.STATUS_CANCELLED])
+    if since is not None:
+        live = live.filter(order__confirmed_at__gte=since)
+    if until is not None:
+        # заказы без confirmed_at оформлены до появления поля
+        live = live.filter(Q(order__confirmed_at__lt=until) | Q(order__confirmed_at__isnull=True))
+    live = live.order_by('order_id').values_list('order_id', 'product_info_id')
+    if since is not None:
+        return live.iterator(chunk_size=2000)
+
+    archived = (
+        ArchivedOrderItem.objects.filter(order__status__in=Order.SALES_STATUSES, product_info__isnull=False)
+        .order_by('order_id')
+        .values_list('order_id', 'product_info_id')
+    )
+    return heapq.merge(live.iterator(chunk_size=2000), archived.iterator(chunk_size=2000))
+
+
+def count_pairs(items):
+    """
+    Совместные покупки: {(a, b): число заказов} для упорядоченных по
+    заказу пар (order_id, product_info_id), в обе стороны. Возвращает
+    (счётчик, число заказов).
+    """
+    pairs = Counter()
+    orders = 0
+    for _, group in groupby(items, key=lambda item: item[0]):
+        offers = {product_info_id for _, product_info_id in group}
+        orders += 1
+        pairs.update(permutations(offers, 2))
+    return pairs, orders
+
+
+def _add_pairs(pairs):
+    """Прибавляет счётчик пар к ProductInfoCooccurrence."""
+    by_offer = {}
+    for (offer, related), count in pairs.items():
+        by_offer.setdefault(offer, {})[related] = count
+
+    for chunk in _chunks(by_offer):
+        related_ids = {related for offer in chunk for related in by_offer[offer]}
+        existing = {
+            (row.product_info_id, row.related_id): row
+            for row in ProductInfoCooccurrence.objects.filter(
+                product_info_id__in=chunk, related_id__in=related_ids,
+            )
+        }
+        changed, created = [], []
+        for offer in chunk:
+            for related, count in by_offer[offer].items():
+                row = existing.get((offer, related))
+                if row is None:
+                    created.append(ProductInfoCooccurrence(product_info_id=offer, related_id=related, orders=count))
+                else:
+                    row.orders += count
+                    changed.append(row)
+        ProductInfoCooccurrence.objects.bulk_update(changed, ['orders'], batch_size=1000)
+        ProductInfoCooccurrence.objects.bulk_create(created, batch_size=1000)
+
+
+def _refresh_top(offer_ids, top):
+    """Пересобирает RelatedProductInfo для offer_ids по матрице."""
+    for chunk in _chunks(offer_ids):
+        ranked = (
+            ProductInfoCooccurrence.objects.filter(product_info_id__in=chunk)
+            .annotate(rank=Window(
+                RowNumber(),
+                partition_by=[F('product_info_id')],
+                order_by=[F('orders').desc(), F('related_id').asc()],
+            ))
+            .filter(rank__lte=top)
+            .values_list('product_info_id', 'related_id', 'orders', 'rank')
+        )
+        rows = [
+            RelatedProductInfo(product_info_id=offer, related_id=related, orders=orders, rank=rank)
+            for offer, related, orders, rank in ranked
+        ]
+        RelatedProductInfo.objects.filter(product_info_id__in=chunk).delete()
+        RelatedProductInfo.objects.bulk_create(rows, batch_size=1000)
+
+
+def update(since, until, top=None):
+    """
+    Добавляет в рекомендации заказы, оформленные в [since, until).
+    Возвращает {"orders": ..., "pairs": ..., "offers": ...}.
+    """
+    pairs, orders = count_pairs(order_items(since, until))
+    offers = {offer for offer, _ in pairs}
+    with transaction.atomic():
+        _add_pairs(pairs)
+        _refresh_top(offers, top or settings.RELATED_PRODUCTS_TOP)
+    return {'orders': orders, 'pairs': len(pairs), 'offers': len(offers)}
+
+
+def rebuild(until=None, top=None):
+    """Пересчитывает рекомендации по всей истории заказов (до until)."""
+    pairs, orders = count_pairs(order_items(until=until))
+    offers = {offer for offer, _ in pairs}
+    with transaction.atomic():
+        ProductInfoCooccurrence.objects.all().delete()
+        RelatedProductInfo.objects.all().delete()
+        _add_pairs(pairs)
+        _refresh_top(offers, top or settings.RELATED_PRODUCTS_TOP)
+    return {'orders': orders, 'pairs': len(pairs), 'offers': len(offers)}
@@ -0,0 +1,171 @@
+"""
+Заранее собранная OpenAPI-схема.
+
+SpectacularAPIView строит схему на каждый запрос, обходя все view и
+сериализаторы. Здесь схема строится один раз на версию кода:
+
+- fingerprint() — хэш исходников приложений проекта, версий django /
+  DRF / drf-spectacular и SPECTACULAR_SETTINGS; меняется только при
+  изменении кода или зависимостей;
+- при деплое схема собирается командой `manage.py build_openapi_schema`
+  и пишется в OPENAPI_SCHEMA_DIR (schema-<fingerprint>.json/.yaml);
+- процесс при первом запросе читает файлы с диска (или, если их нет,
+  строит схему сам и сохраняет) и дальше отдаёт байты из памяти с ETag.
+
+При DEBUG схема строится на каждый запрос, как раньше (OPENAPI_SCHEMA_CACHE_IN_DEBUG
+включает кэш и в DEBUG).
+"""
+import hashlib
+import json
+import os
+import threading
+from importlib.metadata import version
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import get_conditional_response
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+FORMATS = {
+    'json': OpenApiJsonRenderer,
+    'yaml': OpenApiYamlRenderer,
+}
+PACKAGES = ('django', 'djangorestframework', 'drf-spectacular')
+
+_lock = threading.Lock()
+_fingerprint = None
+# {format: (body, etag)} для текущего fingerprint
+_documents = None
+
+
+def fingerprint():
+    global _fingerprint
+    if _fingerprint is None:
+        _fingerprint = _compute_fingerprint()
+    return _fingerprint
+
+
+def _compute_fingerprint():
+    digest = hashlib.sha256()
+    base_dir = Path(settings.BASE_DIR).resolve()
+    paths = [Path(settings.BASE_DIR) / 'config']
+    paths += [
+        Path(app.path) for app in apps.get_app_configs()
+        if Path(app.path).resolve().is_relative_to(base_dir)
+    ]
+    for root in sorted(set(paths)):
+        for path in sorted(root.rglob('*.py')):
+            if 'tests' in path.relative_to(root).parts:
+                continue
+            digest.update(str(path.relative_to(base_dir)).encode())
+            digest.update(path.read_bytes())
+    for package in PACKAGES:
+        digest.update(f'{package}=={version(package)}'.encode())
+    digest.update(json.dumps(settings.SPECTACULAR_SETTINGS, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+
+def _schema_path(fmt, key=None):
+    return Path(settings.OPENAPI_SCHEMA_DIR) / f'schema-{key or fingerprint()}.{fmt}'
+
+
+def generate():
+    """Строит схему и рендерит во все форматы: {format: bytes}."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS(
+        urlconf=spectacular_settings.SERVE_URLCONF,
+    )
+    schema = generator.get_schema(request=None, public=spectacular_settings.SERVE_PUBLIC)
+    return {fmt: renderer().render(schema, renderer_context={}) for fmt, renderer in FORMATS.items()}
+
+
+def build(force=False):
+    """
+    Собирает схему для текущего кода и сохраняет на диск (атомарно, через
+    временный файл). Файлы от прошлых версий кода удаляются.
+    Возвращает список путей.
+    """
+    directory = Path(settings.OPENAPI_SCHEMA_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = [_schema_path(fmt) for fmt in FORMATS]
+    if force or not all(path.exists() for path in paths):
+        for fmt, body in generate().items():
+            path = _schema_path(fmt)
+            tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+            tmp.write_bytes(body)
+            os.replace(tmp, path)
+
+    for stale in directory.glob('schema-*'):
+        if stale not in paths:
+            stale.unlink(missing_ok=True)
+    return paths
+
+
+def _load():
+    paths = {fmt: _schema_path(fmt) for fmt in FORMATS}
+    if not all(path.exists() for path in paths.values()):
+        build()
+    documents = {}
+    for fmt, path in paths.items():
+        body = path.read_bytes()
+        documents[fmt] = (body, '"%s"' % hashlib.sha256(body).hexdigest()[:32])
+    return documents
+
+
+def get_document(fmt):
+    """(body, etag) схемы в формате fmt; при первом вызове — с диска или сборкой."""
+    global _documents
+    if _documents is None:
+        with _lock:
+            if _documents is None:
+                _documents = _load()
+    return _documents[fmt]
+
+
+def reset():
+    """Сбрасывает кэш процесса (для тестов)."""
+    global _documents, _fingerprint
+    with _lock:
+        _documents = None
+        _fingerprint = None
+
+
+def cache_enabled():
+    return not settings.DEBUG or settings.OPENAPI_SCHEMA_CACHE_IN_DEBUG
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    """Описание JWT-аутентификации для CachedJWTAuthentication (как у simplejwt)."""
+    target_class = 'shop.authentication.CachedJWTAuthentication'
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """
+    /api/schema/ из заранее собранной схемы с ETag (If-None-Match → 304).
+    В DEBUG и для запросов с ?lang= / ?version= схема строится на лету.
+    """
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        if not cache_enabled() or 'lang' in request.GET or 'version' in request.GET:
+            return super().get(request, *args, **kwargs)
+
+        renderer = request.accepted_renderer
+        body, etag = get_document(renderer.format)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(body, content_type=renderer.media_type)
+            response['Content-Disposition'] = (
+                f'inline; filename="{spectacular_settings.TITLE or "schema"}.{renderer.format}"'
+            )
+        elif not isinstance(response, HttpResponseNotModified):
+            return response
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
@@ -3,15 +3,22 @@ from django.contrib.auth.models import User
 
 from .models import (
     Shop, Category, Product, ProductInfo, Order, OrderItem,
-    Parameter, ProductParameter, Contact
+    Parameter, ProductParameter, Contact, PriceHistory,
+    ArchivedOrder, ArchivedOrderItem, RelatedProductInfo,
 )
-from .tasks import generate_product_thumbnails
 
 
 class ShopSerializer(serializers.ModelSerializer):
     class Meta:
         model = Shop
-        fields = '__all__'
+        exclude = ['user']
+
+
+class PartnerShopSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Shop
+        fields = ['id', 'name', 'url', 'is_active']
+        read_only_fields = ['id', 'name', 'url']
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -25,7 +32,7 @@ class ProductParameterSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = ProductParameter
-        fields = ['id', 'parameter', 'parameter_name', 'value']
+        fields = ['id', 'parameter', 'parameter_name', 'value', 'value_num']
 
 
 class ProductInfoSerializer(serializers.ModelSerializer):
@@ -43,9 +50,27 @@ class ProductInfoSerializer(serializers.ModelSerializer):
         ]
 
 
+class RelatedProductInfoSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='related_id', read_only=True)
+    model = serializers.CharField(source='related.model', read_only=True)
+    price = serializers.DecimalField(source='related.price', max_digits=10, decimal_places=2, read_only=True)
+    quantity = serializers.IntegerField(source='related.quantity', read_only=True)
+    product = serializers.CharField(source='related.product.name', read_only=True)
+    shop = serializers.CharField(source='related.shop.name', read_only=True)
+
+    class Meta:
+        model = RelatedProductInfo
+        fields = ['id', 'model', 'price', 'quantity', 'product', 'shop', 'orders']
+
+
 # ✅ для чтения (в ответах API)
 class ProductReadSerializer(serializers.ModelSerializer):
-    product_infos = ProductInfoSerializer(many=True, read_only=True)
+    # предложения только активных магазинов (Prefetch в ProductViewSet.get_queryset)
+    product_infos = ProductInfoSerializer(source='active_infos', many=True, read_only=True)
+    # сводка по предложениям — аннотации Product.objects.with_price_summary()
+    best_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    offers_count = serializers.IntegerField(read_only=True)
+    min_price_shop = serializers.SerializerMethodField()
     image_small = serializers.SerializerMethodField()
     image_medium = serializers.SerializerMethodField()
     image_large = serializers.SerializerMethodField()
@@ -55,9 +80,15 @@ class ProductReadSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'category',
             'image', 'image_small', 'image_medium', 'image_large',
+            'best_price', 'offers_count', 'min_price_shop',
             'product_infos'
         ]
 
+    def get_min_price_shop(self, obj):
+        if obj.min_price_shop_id is None:
+            return None
+        return {'id': obj.min_price_shop_id, 'name': obj.min_price_shop_name}
+
     def get_image_small(self, obj):
         return obj.image_small.url if obj.image else None
 
@@ -67,22 +98,60 @@ class ProductReadSerializer(serializers.ModelSerializer):
     def get_image_large(self, obj):
         return obj.image_large.url if obj.image else None
 
+class ProductImageField(serializers.ImageField):
+    """
+    Загрузка изображения товара: размер файла — до Pillow, формат
+    и число пикселей — по заголовку (shop/images.py). Декодирование
+    и уменьшение — в задаче process_product_image.
+    """
+
+    def to_internal_value(self, data):
+        from django.conf import settings
+
+        from . import images
+
+        try:
+            images.check_size(getattr(data, 'size', None), settings.PRODUCT_IMAGE_MAX_UPLOAD_SIZE)
+        except images.ImageRejected as exc:
+            raise serializers.ValidationError(str(exc))
+        file = super().to_internal_value(data)
+        try:
+            file.seek(0)
+            images.check_header(file, settings.PRODUCT_IMAGE_MAX_PIXELS)
+        except images.ImageRejected as exc:
+            raise serializers.ValidationError(str(exc))
+        finally:
+            file.seek(0)
+        return file
+
+
 # ✅ для записи (upload/update), тут запускаем Celery
 class ProductWriteSerializer(serializers.ModelSerializer):
+    image = ProductImageField(required=False, allow_null=True)
+
     class Meta:
         model = Product
         fields = "__all__"
 
+    def create(self, validated_data):
+        instance = super().create(validated_data)
+        if instance.image:
+            self._process_image(instance)
+        return instance
+
     def update(self, instance, validated_data):
-        image_before = instance.image
+        image_before = instance.image.name
         instance = super().update(instance, validated_data)
 
-        image_after = instance.image
-        if image_after and image_after != image_before:
-            generate_product_thumbnails.delay(instance.id)
+        if instance.image and instance.image.name != image_before:
+            self._process_image(instance)
 
         return instance
 
+    def _process_image(self, instance):
+        from .tasks import process_product_image  # Celery — только когда нужен
+        process_product_image.delay(instance.id, instance.image.name)
+
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product = serializers.CharField(source='product_info.product.name', read_only=True)
@@ -98,7 +167,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
 
 
 class OrderSerializer(serializers.ModelSerializer):
-    ordered_items = OrderItemSerializer(source='items', many=True, read_only=True)
+    ordered_items = OrderItemSerializer(many=True, read_only=True)
     total_sum = serializers.SerializerMethodField()
 
     class Meta:
@@ -111,12 +180,57 @@ class OrderSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'status', 'created_at', 'updated_at']
 
     def get_total_sum(self, obj):
+        # позиции уже подгружены через Order.objects.with_items()
         total = 0
-        for item in obj.items.select_related('product_info'):
+        for item in obj.ordered_items.all():
             total += item.product_info.price * item.quantity
         return total
 
 
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """
+    Облегчённое представление заказа для истории:
+    количество позиций и сумма берутся из аннотаций
+    Order.objects.with_summary(), без запросов на каждую строку.
+    Подходит и для ArchivedOrder — у него это обычные поля.
+    """
+    items_count = serializers.IntegerField(read_only=True)
+    total = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'status', 'items_count', 'total', 'created_at']
+        read_only_fields = fields
+
+
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    product = serializers.CharField(source='product_name', read_only=True)
+    shop = serializers.CharField(source='shop_name', read_only=True)
+
+    class Meta:
+        model = ArchivedOrderItem
+        fields = ['id', 'product_info', 'product', 'shop', 'price', 'quantity', 'order']
+        read_only_fields = fields
+
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    """
+    Архивный заказ в формате OrderSerializer (цены — на момент архивации)
+    плюс archived_at.
+    """
+    ordered_items = ArchivedOrderItemSerializer(source='items', many=True, read_only=True)
+    total_sum = serializers.DecimalField(source='total', max_digits=14, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = [
+            'id', 'user', 'status', 'contact',
+            'ordered_items', 'total_sum',
+            'created_at', 'updated_at', 'archived_at',
+        ]
+        read_only_fields = fields
+
+
 class ContactSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contact
@@ -124,6 +238,34 @@ class ContactSerializer(serializers.ModelSerializer):
         read_only_fields = ['user']
 
 
+class PartnerOrderItemSerializer(serializers.ModelSerializer):
+    product = serializers.CharField(source='product_info.product.name', read_only=True)
+    external_id = serializers.IntegerField(source='product_info.external_id', read_only=True)
+    price = serializers.DecimalField(
+        source='product_info.price', max_digits=10, decimal_places=2, read_only=True
+    )
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'product_info', 'external_id', 'product', 'price', 'quantity']
+        read_only_fields = fields
+
+
+class PartnerOrderSerializer(serializers.ModelSerializer):
+    """
+    Заказ глазами магазина: только позиции этого магазина
+    (prefetch в атрибут shop_items) и сумма по ним (аннотация shop_total).
+    """
+    items = PartnerOrderItemSerializer(source='shop_items', many=True, read_only=True)
+    shop_total = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    contact = ContactSerializer(read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'status', 'created_at', 'contact', 'items', 'shop_total']
+        read_only_fields = fields
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
 
@@ -138,3 +280,10 @@ class RegisterSerializer(serializers.ModelSerializer):
             password=validated_data['password'],
         )
 
+
+class PriceHistorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PriceHistory
+        fields = ['product_info', 'recorded_at', 'price', 'price_min', 'price_max', 'quantity']
+        read_only_fields = fields
+
@@ -0,0 +1,139 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import active_shops, catalog_snapshots, category_counts, sqlite
+from .models import Category, Parameter, Product, ProductInfo, ProductParameter, Shop
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    # WAL, busy_timeout и т.д. для SQLite в продакшене, см. shop/sqlite.py
+    if connection.vendor == 'sqlite' and settings.SQLITE_TUNING:
+        sqlite.configure_connection(connection.connection)
+
+
+@receiver(post_save, sender=Shop)
+@receiver(post_delete, sender=Shop)
+def reset_active_shops(sender, **kwargs):
+    # статус магазина мог измениться — перечитаем набор при следующем запросе
+    active_shops.invalidate()
+
+
+@receiver(post_save, sender=Shop)
+@receiver(post_delete, sender=Shop)
+def mark_catalog_snapshots_stale(sender, **kwargs):
+    if not catalog_snapshots.tracking():
+        return
+    # статус магазина влияет на все снимки каталога, где есть его предложения
+    catalog_snapshots.mark_stale()
+
+
+@receiver(post_save, sender=ProductInfo)
+@receiver(post_delete, sender=ProductInfo)
+def mark_offer_snapshots_stale(sender, instance, **kwargs):
+    # правки по одному предложению (админка); массовые изменения идут
+    # в catalog_snapshots.suspended() и помечают снимки сами через
+    # catalog_cache.invalidate_offers; при выключенных снимках — ни одного запроса
+    if not catalog_snapshots.tracking():
+        return
+    catalog_snapshots.mark_stale(
+        shop_ids=[instance.shop_id],
+        category_ids=Product.objects.filter(pk=instance.product_id).values_list('category_id', flat=True),
+    )
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_category(sender, instance, **kwargs):
+    # при переносе товара устаревают снимки и старой категории
+    if not catalog_snapshots.tracking():
+        return
+    instance._snapshot_category_id = (
+        Product.objects.filter(pk=instance.pk).values_list('category_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def mark_product_snapshots_stale(sender, instance, **kwargs):
+    if not catalog_snapshots.tracking():
+        return
+    # название товара и категории есть в каждом его предложении
+    category_ids = {instance.category_id, getattr(instance, '_snapshot_category_id', None)} - {None}
+    catalog_snapshots.mark_stale(
+        shop_ids=ProductInfo.objects.filter(product_id=instance.pk).values_list('shop_id', flat=True),
+        category_ids=category_ids,
+    )
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def mark_category_snapshots_stale(sender, instance, **kwargs):
+    if not catalog_snapshots.tracking():
+        return
+    # post_save приходит до пересчёта path в Category.save(), поэтому
+    # mark_stale() по pk категории берёт старых предков, а по parent_id —
+    # новых: при переносе устаревают снимки обеих ветвей
+    catalog_snapshots.mark_stale(
+        shop_ids=ProductInfo.objects.filter(product__category_id=instance.pk).values_list('shop_id', flat=True),
+        category_ids={instance.pk, instance.parent_id} - {None},
+    )
+
+
+@receiver(post_save, sender=ProductParameter)
+@receiver(post_delete, sender=ProductParameter)
+def mark_parameter_snapshots_stale(sender, instance, **kwargs):
+    if not catalog_snapshots.tracking():
+        return
+    offer = (
+        ProductInfo.objects.filter(pk=instance.product_info_id)
+        .values('shop_id', 'product__category_id')
+        .first()
+    )
+    if offer is None:  # предложения уже нет — снимки пометил его сигнал
+        return
+    catalog_snapshots.mark_stale(shop_ids=[offer['shop_id']], category_ids=[offer['product__category_id']])
+
+
+@receiver(post_save, sender=Parameter)
+def mark_parameter_name_snapshots_stale(sender, instance, created, **kwargs):
+    if not catalog_snapshots.tracking():
+        return
+    # название параметра (parameter_name) может быть в любом снимке
+    if not created:
+        catalog_snapshots.mark_stale()
+
+
+@receiver(post_save, sender=Shop)
+def refresh_shop_category_counts(sender, instance, created, **kwargs):
+    # предложения магазина, не принимающего заказы, в счётчиках категорий не учитываются
+    if not created:
+        category_counts.refresh_for_shop(instance.pk)
+
+
+@receiver(post_delete, sender=Shop)
+def refresh_category_counts_after_shop_delete(sender, **kwargs):
+    # предложения уже удалены каскадом — затронутые категории не известны
+    category_counts.refresh()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def reset_cached_jwt_user(sender, instance, **kwargs):
+    # деактивация, смена пароля и т.п. — пользователь перечитается из БД
+    # simplejwt/DRF подтягиваются только при изменении пользователя, а не
+    # при старте каждого процесса (воркерам и импорту они не нужны)
+    from .authentication import invalidate_user
+    invalidate_user(instance.pk)
+
+
+if settings.CACHEOPS_ENABLED:
+    from cacheops.signals import cache_read
+
+    @receiver(cache_read)
+    def count_cacheops_read(sender, func, hit, **kwargs):
+        # доля попаданий ORM-кэша — метрика cache_requests{cache="cacheops"}
+        from . import metrics
+        metrics.cache_result('cacheops', hit)
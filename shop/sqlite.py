@@ -0,0 +1,29 @@
+"""
+Профиль SQLite для продакшена на одном узле.
+
+По умолчанию SQLite работает в режиме rollback journal: пишущая транзакция
+блокирует читателей, а транзакция, начатая как читающая (BEGIN DEFERRED) и
+затем пишущая, при конкуренции сразу получает "database is locked" —
+ожидание busy_timeout в этом случае не помогает.
+
+Профиль (settings.SQLITE_TUNING, значения — settings.SQLITE_PRAGMAS)
+применяется к каждому новому соединению через сигнал connection_created:
+
+- journal_mode=WAL      — читатели не блокируются писателем;
+- synchronous=NORMAL    — fsync только на checkpoint (в WAL это безопасно
+                          для целостности, теряются лишь последние коммиты
+                          при отключении питания);
+- busy_timeout          — сколько ждать освобождения блокировки, мс;
+- mmap_size, cache_size — чтение через mmap и больший страничный кэш.
+
+Пишущие транзакции начинаются с BEGIN IMMEDIATE (OPTIONS["transaction_mode"]
+в settings._database): блокировка на запись берётся сразу, и конкурирующие
+транзакции ждут в busy_timeout, а не падают.
+"""
+from django.conf import settings
+
+
+def configure_connection(dbapi_connection, pragmas=None):
+    """Применяет PRAGMA профиля к соединению sqlite3."""
+    for name, value in (pragmas if pragmas is not None else settings.SQLITE_PRAGMAS).items():
+        dbapi_connection.execute(f'PRAGMA {name} = {value}')
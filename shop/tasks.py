@@ -1,9 +1,28 @@
+import logging
+from datetime import timedelta
+
 from celery import shared_task
+# shared_task ставит задачи через текущее приложение Celery — оно создаётся здесь,
+# а не в config/__init__.py, чтобы веб-процесс не импортировал Celery заранее
+import config.celery  # noqa: F401
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.files.base import ContentFile
+from django.core.mail import send_mail, send_mass_mail
 from django.contrib.auth import get_user_model
 from django.apps import apps
-from .models import Order
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from . import (
+    baskets, catalog_snapshots, category_counts, images, metrics, order_archive, price_history,
+    recommendations, shop_orders, tracing,
+)
+from .analytics import rebuild_daily_sales
+from .models import Order, TaskCheckpoint
+
+logger = logging.getLogger(__name__)
+
+# длительность и ошибки задач — в метриках воркера (shop/metrics.py)
+metrics.connect_celery()
 
 
 @shared_task
@@ -14,47 +33,54 @@ def send_order_emails(order_id: int, user_id: int) -> None:
     Выполняется воркером Celery, а не в HTTP-запросе.
     """
     # --- аккуратно достаём Order и User ---
-    try:
-        order = Order.objects.get(id=order_id)
-    except Order.DoesNotExist:
-        return
-
-    User = get_user_model()
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    with tracing.span("task.load", "order and user"):
+        order = Order.objects.filter(id=order_id).first()
+        user = get_user_model().objects.filter(id=user_id).first()
+    if order is None or user is None:
         return
 
     # --- письмо клиенту ---
     if getattr(settings, "EMAIL_HOST", None) and user.email:
-        try:
-            send_mail(
-                subject=f"Ваш заказ #{order.id} принят",
-                message=f"Спасибо за заказ #{order.id} на нашем сервисе.",
-                from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
-                recipient_list=[user.email],
-                fail_silently=True,
-            )
-        except Exception:
-            # в задаче лучше не падать из-за почты
-            pass
+        with tracing.span("email.send", "customer"):
+            try:
+                send_mail(
+                    subject=f"Ваш заказ #{order.id} принят",
+                    message=f"Спасибо за заказ #{order.id} на нашем сервисе.",
+                    from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
+                    recipient_list=[user.email],
+                    fail_silently=True,
+                )
+            except Exception:
+                # в задаче лучше не падать из-за почты
+                pass
 
     # --- письмо менеджеру (если настроено) ---
     manager_email = getattr(settings, "SHOP_MANAGER_EMAIL", None)
     if getattr(settings, "EMAIL_HOST", None) and manager_email:
-        try:
-            send_mail(
-                subject=f"Новый заказ #{order.id}",
-                message=(
-                    f"Поступил новый заказ #{order.id} "
-                    f"от пользователя {user.username}."
-                ),
-                from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
-                recipient_list=[manager_email],
-                fail_silently=True,
-            )
-        except Exception:
-            pass
+        with tracing.span("email.send", "manager"):
+            try:
+                send_mail(
+                    subject=f"Новый заказ #{order.id}",
+                    message=(
+                        f"Поступил новый заказ #{order.id} "
+                        f"от пользователя {user.username}."
+                    ),
+                    from_email=getattr(settings, "DEFAULT_FROM_EMAIL", None),
+                    recipient_list=[manager_email],
+                    fail_silently=True,
+                )
+            except Exception:
+                pass
+
+    # --- письма магазинам: одно на подзаказ, все — через одно SMTP-соединение ---
+    if getattr(settings, "EMAIL_HOST", None):
+        with tracing.span("email.send", "shops"):
+            messages = shop_orders.shop_messages(order)
+            if messages:
+                try:
+                    send_mass_mail(messages, fail_silently=True)
+                except Exception:
+                    pass
 
 @shared_task
 def generate_product_thumbnails(product_id: int) -> None:
@@ -66,7 +92,178 @@ def generate_product_thumbnails(product_id: int) -> None:
     if not product or not product.image:
         return
 
-    # Touching .url triggers ImageKit generation & caching
-    _ = product.image_small.url
-    _ = product.image_medium.url
-    _ = product.image_large.url
+    # .url миниатюры не создаёт (images.DeferredThumbnails) — создаём явно
+    images.generate_thumbnails(product)
+
+
+@shared_task
+def process_product_image(product_id: int, name: str) -> str | None:
+    """
+    Обработка загруженного изображения товара (shop/images.py): поворот
+    по EXIF, уменьшение до PRODUCT_IMAGE_MAX_SIDE, JPEG без EXIF вместо
+    исходного файла, затем миниатюры. name — загруженный файл: если
+    изображение с тех пор заменили, задача ничего не делает.
+    Возвращает имя обработанного файла.
+    """
+    Product = apps.get_model("shop", "Product")
+    product = Product.objects.filter(id=product_id, image=name).first()
+    if product is None:
+        return None
+
+    storage = product.image.storage
+    with tracing.span("image.prepare", name):
+        try:
+            with storage.open(name, "rb") as source:
+                body = images.prepare(
+                    source,
+                    max_side=settings.PRODUCT_IMAGE_MAX_SIDE,
+                    max_pixels=settings.PRODUCT_IMAGE_MAX_PIXELS,
+                    quality=settings.PRODUCT_IMAGE_QUALITY,
+                )
+        except images.ImageRejected as exc:
+            # проверка заголовка при загрузке прошла, а декодирование — нет
+            logger.warning("Product %s image %s rejected: %s", product_id, name, exc)
+            Product.objects.filter(id=product_id, image=name).update(image=None)
+            storage.delete(name)
+            return None
+
+    processed = storage.save(images.processed_name(name), ContentFile(body))
+    updated = Product.objects.filter(id=product_id, image=name).update(image=processed)
+    if not updated:
+        # изображение заменили, пока шла обработка
+        storage.delete(processed)
+        return None
+    if processed != name:
+        storage.delete(name)
+
+    product.image.name = processed
+    with tracing.span("image.thumbnails", processed):
+        images.generate_thumbnails(product)
+    return processed
+
+
+@shared_task
+def refresh_shop_daily_sales() -> int:
+    """
+    Инкрементально обновляет свёртку ShopDailySales (запускается Celery beat).
+
+    Пересчитываются только дни, в которых есть заказы, изменённые
+    с прошлого запуска (по Order.updated_at). Первый запуск
+    пересобирает всю историю. Возвращает количество записанных строк.
+
+    Отметка ставится на PARTNER_STATS_ROLLUP_LAG_SECONDS раньше начала
+    запуска: updated_at пишется до коммита, и заказ, закоммиченный уже
+    во время запуска, попадёт в следующий. Дни пересобираются целиком,
+    поэтому повторная обработка перекрытия безопасна.
+    """
+    checkpoint, _ = TaskCheckpoint.objects.get_or_create(name="shop_daily_sales")
+    position = timezone.now() - timedelta(seconds=settings.PARTNER_STATS_ROLLUP_LAG_SECONDS)
+
+    changed = Order.objects.exclude(status=Order.STATUS_BASKET)
+    if checkpoint.position is not None:
+        changed = changed.filter(updated_at__gte=checkpoint.position)
+    with tracing.span("task.load", "changed days"):
+        days = list(
+            changed.annotate(day=TruncDate("created_at"))
+            .order_by()
+            .values_list("day", flat=True)
+            .distinct()
+        )
+
+    with tracing.span("task.rebuild", f"{len(days)} days"):
+        written = rebuild_daily_sales(days)
+
+    checkpoint.position = position
+    checkpoint.save(update_fields=["position"])
+    return written
+
+
+@shared_task
+def compact_price_history() -> dict:
+    """
+    Держит историю цен ограниченной (запускается Celery beat раз в сутки):
+    дни старше PRICE_HISTORY_RAW_DAYS сжимаются до дневных строк,
+    строки старше PRICE_HISTORY_KEEP_DAYS удаляются.
+    """
+    compacted, expired = price_history.compact(
+        raw_days=settings.PRICE_HISTORY_RAW_DAYS,
+        keep_days=settings.PRICE_HISTORY_KEEP_DAYS,
+        max_days=settings.PRICE_HISTORY_COMPACT_DAYS_PER_RUN,
+    )
+    return {"compacted": compacted, "expired": expired}
+
+
+@shared_task
+def refresh_category_counts() -> None:
+    """
+    Полный пересчёт счётчиков предложений по категориям (раз в сутки).
+    Обычно счётчики обновляются там, где меняются остатки (shop/category_counts.py);
+    этот запуск исправляет расхождения после правок в админке.
+    """
+    category_counts.refresh()
+
+
+@shared_task
+def archive_orders() -> int:
+    """
+    Переносит старые доставленные и отменённые заказы в архив
+    (запускается Celery beat раз в час, объём за запуск ограничен
+    ORDER_ARCHIVE_MAX_BATCHES). Возвращает число перенесённых заказов.
+    """
+    return order_archive.archive()
+
+
+@shared_task
+def cleanup_baskets() -> dict:
+    """
+    Удаляет пустые и давно брошенные корзины (Celery beat, раз в час).
+    Возвращает {"empty": ..., "expired": ..., "seconds": ...} — виден
+    в результате задачи и в логе воркера.
+    """
+    report = baskets.cleanup()
+    logger.info(
+        "Baskets cleanup: %(empty)s empty, %(expired)s expired, %(seconds).3f s", report,
+    )
+    return report
+
+
+@shared_task
+def refresh_related_products() -> dict:
+    """
+    Обновляет рекомендации «с этим товаром покупают» по заказам,
+    оформленным с прошлого запуска (Celery beat, раз в час); первый
+    запуск пересчитывает всю историю. См. shop/recommendations.py.
+    """
+    checkpoint, _ = TaskCheckpoint.objects.get_or_create(name="related_products")
+    # заказы, оформляемые прямо сейчас, ещё не закоммичены — их заберёт следующий запуск
+    until = timezone.now() - timedelta(seconds=settings.RELATED_PRODUCTS_LAG_SECONDS)
+
+    with tracing.span("task.rebuild", "related products"):
+        if checkpoint.position is None:
+            report = recommendations.rebuild(until=until)
+        else:
+            report = recommendations.update(checkpoint.position, until)
+
+    checkpoint.position = until
+    checkpoint.save(update_fields=["position"])
+    logger.info(
+        "Related products: %(orders)s orders, %(pairs)s pairs, %(offers)s offers", report,
+    )
+    return report
+
+
+@shared_task
+def build_catalog_snapshots() -> dict:
+    """
+    Пересобирает снимки каталога, у которых изменилась версия
+    (Celery beat, раз в минуту; при CATALOG_SNAPSHOTS_ENABLED=0 ничего не делает).
+    """
+    if not settings.CATALOG_SNAPSHOTS_ENABLED:
+        return {"built": 0, "removed": 0, "seconds": 0.0}
+    with tracing.span("task.rebuild", "catalog snapshots"):
+        report = catalog_snapshots.build()
+    if report["built"] or report["removed"]:
+        logger.info(
+            "Catalog snapshots: %(built)s built, %(removed)s removed, %(seconds).3f s", report,
+        )
+    return report
@@ -0,0 +1,18 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Тесты не зависят от внешнего Redis: счётчики rate limiting — в памяти
+    процесса, даже если THROTTLE_BACKEND или REDIS_URL заданы в окружении.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._local_services = override_settings(THROTTLE_BACKEND="shop.throttling.LocMemRateLimitBackend")
+        self._local_services.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._local_services.disable()
+        super().teardown_test_environment(**kwargs)
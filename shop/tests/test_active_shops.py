@@ -0,0 +1,110 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from shop import active_shops
+from shop.models import (
+    Shop,
+    Category,
+    Product,
+    ProductInfo,
+    Order,
+    OrderItem,
+    Contact,
+)
+
+
+class ActiveShopTests(APITestCase):
+    """
+    Shop.is_active: предложения отключённых магазинов не попадают в каталог
+    и не принимаются в корзину/к оформлению, а проверка не стоит лишних запросов.
+    """
+
+    def setUp(self):
+        active_shops.invalidate()
+
+        self.partner = User.objects.create_user(username="partner", password="pass12345")
+        self.buyer = User.objects.create_user(username="buyer", password="pass12345")
+
+        self.shop = Shop.objects.create(name="Open shop")
+        self.closed_shop = Shop.objects.create(name="Closed shop", user=self.partner)
+        category = Category.objects.create(name="Category")
+        self.product = Product.objects.create(name="Phone", category=category)
+
+        self.offer = ProductInfo.objects.create(
+            product=self.product, shop=self.shop, external_id=1, quantity=5, price=100,
+        )
+        self.closed_offer = ProductInfo.objects.create(
+            product=self.product, shop=self.closed_shop, external_id=1, quantity=5, price=90,
+        )
+
+        self.list_url = reverse("products-info")
+
+    def _close_shop(self):
+        self.closed_shop.is_active = False
+        self.closed_shop.save()
+
+    def _listing_queries(self):
+        active_shops.active_shop_ids()  # прогреваем кэш
+        with self.assertNumQueries(2) as ctx:  # предложения + параметры
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(ctx.captured_queries), [row["id"] for row in response.data]
+
+    def test_listing_hides_inactive_shop_without_extra_queries(self):
+        queries_before, ids_before = self._listing_queries()
+        self.assertCountEqual(ids_before, [self.offer.id, self.closed_offer.id])
+
+        self._close_shop()
+
+        queries_after, ids_after = self._listing_queries()
+        self.assertEqual(ids_after, [self.offer.id])
+        self.assertEqual(queries_after, queries_before)
+
+    def test_products_render_only_active_offers(self):
+        self._close_shop()
+        response = self.client.get(reverse("product-detail", args=[self.product.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([o["id"] for o in response.data["product_infos"]], [self.offer.id])
+
+    def test_basket_and_confirm_reject_inactive_shop(self):
+        self.client.force_authenticate(user=self.buyer)
+        basket = Order.objects.create(user=self.buyer, status="basket")
+        OrderItem.objects.create(order=basket, product_info=self.closed_offer, quantity=1)
+        contact = Contact.objects.create(user=self.buyer, city="Moscow", address="Street", phone="1")
+
+        self._close_shop()
+
+        response = self.client.post(
+            reverse("order-basket"),
+            {"items": [{"product_info": self.closed_offer.id, "quantity": 1}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(reverse("order-confirm"), {"contact_id": contact.id}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        basket.refresh_from_db()
+        self.assertEqual(basket.status, "basket")
+
+    def test_partner_toggles_status_and_resets_stock(self):
+        self.client.force_authenticate(user=self.partner)
+        self.assertIn(self.closed_shop.id, active_shops.active_shop_ids())
+
+        response = self.client.post(
+            reverse("partner-shop-set-status"), {"is_active": False}, format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["is_active"])
+        # сигнал сбросил кэш — магазин сразу считается отключённым
+        self.assertNotIn(self.closed_shop.id, active_shops.active_shop_ids())
+
+        response = self.client.post(reverse("partner-shop-reset-stock"))
+        self.assertEqual(response.data["updated"], 1)
+        self.closed_offer.refresh_from_db()
+        self.assertEqual(self.closed_offer.quantity, 0)
+        self.offer.refresh_from_db()
+        self.assertEqual(self.offer.quantity, 5)
@@ -0,0 +1,97 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from shop.models import (
+    Shop,
+    Category,
+    Product,
+    ProductInfo,
+    Parameter,
+    ProductParameter,
+    Order,
+    OrderItem,
+)
+
+
+class AdminQueryCountTests(TestCase):
+    """
+    Списки и страницы заказов в админке: число SQL-запросов
+    не зависит от количества строк (нет запросов на каждую строку
+    и <select> со всеми предложениями).
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", "admin@example.com", "pass12345")
+        self.client.force_login(self.admin)
+
+        self.category = Category.objects.create(name="Category")
+        self.order = Order.objects.create(user=self.admin, status="new")
+        self.counter = 0
+
+    def _add_rows(self, n):
+        for _ in range(n):
+            self.counter += 1
+            shop = Shop.objects.create(name=f"Shop {self.counter}")
+            product = Product.objects.create(name=f"Product {self.counter}", category=self.category)
+            offer = ProductInfo.objects.create(
+                product=product, shop=shop, external_id=self.counter, quantity=1, price=10,
+            )
+            buyer = User.objects.create_user(username=f"user{self.counter}")
+            Order.objects.create(user=buyer, status="new")
+            OrderItem.objects.create(order=self.order, product_info=offer, quantity=1)
+
+    def _queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def _assert_constant(self, url):
+        self._add_rows(2)
+        self._queries(url)  # прогрев кэшей ContentType/прав
+        small = self._queries(url)
+        self._add_rows(20)
+        large = self._queries(url)
+        self.assertEqual(small, large)
+
+    def test_productinfo_changelist(self):
+        self._assert_constant(reverse("admin:shop_productinfo_changelist"))
+
+    def test_product_search_is_prefix_without_upper(self):
+        self._add_rows(3)
+        url = reverse("admin:shop_product_changelist")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {"q": '"Product 2"'})
+        self.assertEqual([product.name for product in response.context["cl"].result_list], ["Product 2"])
+        searches = [query["sql"] for query in ctx.captured_queries if "LIKE" in query["sql"]]
+        self.assertTrue(searches)
+        self.assertFalse(any("UPPER" in sql for sql in searches))
+
+    def test_order_changelist(self):
+        self._assert_constant(reverse("admin:shop_order_changelist"))
+
+    def test_orderitem_changelist(self):
+        self._assert_constant(reverse("admin:shop_orderitem_changelist"))
+
+    def test_order_change_page_with_inline(self):
+        self._assert_constant(reverse("admin:shop_order_change", args=[self.order.id]))
+
+    def test_productinfo_change_page_with_inline(self):
+        self._add_rows(1)
+        offer = ProductInfo.objects.first()
+        url = reverse("admin:shop_productinfo_change", args=[offer.id])
+
+        def add_parameters(n):
+            for i in range(n):
+                parameter = Parameter.objects.create(name=f"Param {offer.id}-{self.counter}-{i}")
+                ProductParameter.objects.create(product_info=offer, parameter=parameter, value="1")
+            self.counter += 1
+
+        add_parameters(2)
+        self._queries(url)
+        small = self._queries(url)
+        add_parameters(20)
+        self.assertEqual(small, self._queries(url))
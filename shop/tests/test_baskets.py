@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+
+from shop import baskets
+from shop.models import Category, Order, OrderItem, Product, ProductInfo, Shop
+from shop.tasks import cleanup_baskets
+
+
+@override_settings(BASKET_EMPTY_TTL_HOURS=24, BASKET_TTL_DAYS=60)
+class BasketCleanupTests(APITestCase):
+    """Очистка корзин (shop/baskets.py): пустые и брошенные удаляются пачками."""
+
+    def setUp(self):
+        shop = Shop.objects.create(name="Shop")
+        category = Category.objects.create(name="Category")
+        product = Product.objects.create(name="Phone", category=category)
+        self.offers = [
+            ProductInfo.objects.create(product=product, shop=shop, external_id=i, quantity=10, price=100)
+            for i in range(2)
+        ]
+        self.offer = self.offers[0]
+        self.now = timezone.now()
+        self.users = 0
+
+    def _basket(self, age, items=0, status_value=Order.STATUS_BASKET):
+        self.users += 1
+        user = User.objects.create_user(username=f"user{self.users}", password="pass12345")
+        order = Order.objects.create(user=user, status=status_value)
+        for offer in self.offers[:items]:
+            OrderItem.objects.create(order=order, product_info=offer, quantity=1)
+        Order.objects.filter(pk=order.pk).update(updated_at=self.now - age)
+        return order
+
+    def test_cleanup_removes_empty_and_stale_baskets(self):
+        empty_old = self._basket(timedelta(hours=30))
+        empty_fresh = self._basket(timedelta(hours=2))
+        stale = self._basket(timedelta(days=90), items=2)
+        active = self._basket(timedelta(days=10), items=1)
+        placed = self._basket(timedelta(days=400), items=1, status_value=Order.STATUS_NEW)
+
+        report = cleanup_baskets()
+
+        self.assertEqual((report["empty"], report["expired"]), (1, 1))
+        self.assertGreaterEqual(report["seconds"], 0)
+        self.assertEqual(
+            set(Order.objects.values_list("pk", flat=True)), {empty_fresh.pk, active.pk, placed.pk},
+        )
+        self.assertFalse(OrderItem.objects.filter(order_id__in=[empty_old.pk, stale.pk]).exists())
+
+    def test_cleanup_is_bounded_per_run(self):
+        for _ in range(5):
+            self._basket(timedelta(days=2))
+
+        self.assertEqual(baskets.cleanup(batch_size=2, max_batches=2)["empty"], 4)
+        self.assertEqual(baskets.cleanup(batch_size=2, max_batches=2)["empty"], 1)
+
+    def test_basket_changes_refresh_updated_at(self):
+        order = self._basket(timedelta(days=90), items=1)
+        self.client.force_authenticate(user=order.user)
+
+        self.client.post(
+            reverse("order-basket"), {"items": [{"product_info": self.offer.id, "quantity": 3}]}, format="json",
+        )
+
+        self.assertEqual(baskets.cleanup()["expired"], 0)
+        self.assertTrue(Order.objects.filter(pk=order.pk).exists())
+
+    def test_basket_touched_after_selection_is_kept(self):
+        touched = self._basket(timedelta(days=90), items=1)
+        stale = self._basket(timedelta(days=90), items=1)
+        queryset = baskets.stale_baskets(self.now)
+        ids = list(queryset.values_list("pk", flat=True))
+        # корзину изменили между выборкой пачки и удалением
+        Order.objects.filter(pk=touched.pk).update(updated_at=timezone.now())
+
+        self.assertEqual(baskets._delete_batch(queryset, ids), 1)
+        self.assertTrue(OrderItem.objects.filter(order=touched).exists())
+        self.assertFalse(Order.objects.filter(pk=stale.pk).exists())
@@ -0,0 +1,194 @@
+import gzip
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.test import override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from shop import catalog_cache, catalog_snapshots
+from shop.models import CatalogSnapshot, Category, Parameter, Product, ProductInfo, ProductParameter, Shop
+from shop.tasks import build_catalog_snapshots
+
+
+def content(response):
+    if response.streaming:
+        return b"".join(response.streaming_content)
+    return response.content
+
+
+class CatalogSnapshotTests(APITestCase):
+    """
+    Снимки products-info (shop/catalog_snapshots.py): сборка, выдача файла
+    вместо запроса к БД, пометка устаревших и пересборка только изменённых.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings_override = override_settings(CATALOG_SNAPSHOTS_ENABLED=True, CATALOG_SNAPSHOT_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.partner = User.objects.create_user(username="partner", password="pass12345")
+        self.shop = Shop.objects.create(name="Shop", user=self.partner)
+        self.other_shop = Shop.objects.create(name="Other")
+        self.phones = Category.objects.create(name="Phones")
+        self.smartphones = Category.objects.create(name="Smartphones", parent=self.phones)
+        self.laptops = Category.objects.create(name="Laptops")
+        self.offer = self._offer(self.smartphones, self.shop, 1)
+        self._offer(self.laptops, self.other_shop, 2)
+
+    def _offer(self, category, shop, external_id):
+        product = Product.objects.create(name=f"Product {external_id}", category=category)
+        return ProductInfo.objects.create(
+            product=product, shop=shop, external_id=external_id, quantity=5, price=100 + external_id,
+        )
+
+    def _get(self, params, **headers):
+        return self.client.get(reverse("products-info"), params, **headers)
+
+    def _live(self, params):
+        with self.settings(CATALOG_SNAPSHOTS_ENABLED=False):
+            return self._get(params).content
+
+    def test_build_writes_compressed_files_identical_to_live_response(self):
+        report = catalog_snapshots.build()
+        self.assertEqual(report["built"], 5)  # 3 категории + 2 магазина
+
+        path = Path(self.directory) / f"category-{self.phones.id}.json"
+        live = self._live({"category_id": self.phones.id})
+        self.assertIn(b"Product 1", live)
+        self.assertEqual(path.read_bytes(), live)
+        self.assertEqual(gzip.decompress(path.with_name(path.name + ".gz").read_bytes()), live)
+
+        # повторная сборка без изменений ничего не делает
+        self.assertEqual(catalog_snapshots.build()["built"], 0)
+
+    def test_serves_snapshot_without_catalog_queries(self):
+        catalog_snapshots.build()
+        live = self._live({"shop_id": self.shop.id})
+
+        with self.assertNumQueries(1):
+            response = self._get({"shop_id": self.shop.id}, HTTP_ACCEPT_ENCODING="gzip, br;q=0")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(content(response)), live)
+
+        plain = self._get({"shop_id": self.shop.id})
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertEqual(content(plain), live)
+
+        not_modified = self._get({"shop_id": self.shop.id}, HTTP_IF_NONE_MATCH=plain["ETag"])
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # другие фильтры и browsable API — обычный ответ
+        self.assertFalse(self._get({"shop_id": self.shop.id, "in_stock": 1}).has_header("ETag"))
+        self.assertFalse(self._get({"shop_id": self.shop.id}, HTTP_ACCEPT="text/html").has_header("ETag"))
+
+    @override_settings(CATALOG_SNAPSHOT_ACCEL_PREFIX="/_snapshots/")
+    def test_accel_redirect(self):
+        catalog_snapshots.build()
+        response = self._get({"category_id": self.laptops.id})
+        self.assertEqual(response["X-Accel-Redirect"], f"/_snapshots/category-{self.laptops.id}.json")
+        self.assertEqual(response.content, b"")
+
+    def test_stock_update_rebuilds_only_affected_snapshots(self):
+        catalog_snapshots.build()
+        self.client.force_authenticate(self.partner)
+        response = self.client.post(
+            reverse("partner-stock"), {"items": [{"external_id": 1, "quantity": 0}]}, format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.force_authenticate(None)
+
+        # устаревший снимок не отдаётся, пока не пересобран
+        response = self._get({"category_id": self.phones.id})
+        self.assertFalse(response.has_header("ETag"))
+        self.assertIn(b'"quantity":0', response.content)
+        self.assertTrue(self._get({"category_id": self.laptops.id}).has_header("ETag"))
+
+        report = build_catalog_snapshots()
+        self.assertEqual(report["built"], 3)  # Smartphones, её предок Phones и магазин
+        response = self._get({"category_id": self.phones.id})
+        self.assertIn(b'"quantity":0', content(response))
+
+    def test_shop_status_and_deleted_objects(self):
+        catalog_snapshots.build()
+        self.other_shop.is_active = False
+        self.other_shop.save()
+        self.assertFalse(self._get({"category_id": self.laptops.id}).has_header("ETag"))
+
+        self.laptops.delete()
+        report = catalog_snapshots.build()
+        self.assertEqual(report["removed"], 1)
+        self.assertFalse((Path(self.directory) / f"category-{self.laptops.id}.json.gz").exists())
+        self.assertEqual(content(self._get({"shop_id": self.other_shop.id})), b"[]")
+
+    def _stale(self):
+        return set(
+            CatalogSnapshot.objects.filter(built_version__lt=F("version")).values_list("scope", "object_id")
+        )
+
+    def test_product_category_and_parameter_edits_mark_snapshots_stale(self):
+        category, shop = CatalogSnapshot.SCOPE_CATEGORY, CatalogSnapshot.SCOPE_SHOP
+        catalog_snapshots.build()
+        product = self.offer.product
+        product.name = "Renamed"
+        product.save()
+        self.assertEqual(
+            self._stale(), {(category, self.smartphones.id), (category, self.phones.id), (shop, self.shop.id)},
+        )
+
+        catalog_snapshots.build()
+        product.category = self.laptops
+        product.save()
+        self.assertEqual(self._stale(), {
+            (category, self.smartphones.id), (category, self.phones.id), (category, self.laptops.id),
+            (shop, self.shop.id),
+        })
+
+        catalog_snapshots.build()
+        ProductParameter.objects.create(
+            product_info=self.offer, parameter=Parameter.objects.create(name="Цвет"), value="red",
+        )
+        self.assertEqual(self._stale(), {(category, self.laptops.id), (shop, self.shop.id)})
+        self.assertIn(b"red", content(self._get({"shop_id": self.shop.id})))
+
+    def test_category_move_marks_old_and_new_branches_stale(self):
+        category = CatalogSnapshot.SCOPE_CATEGORY
+        catalog_snapshots.build()
+        self.smartphones.parent = self.laptops
+        self.smartphones.save()
+        self.assertEqual(
+            self._stale() - {(CatalogSnapshot.SCOPE_SHOP, self.shop.id)},
+            {(category, self.smartphones.id), (category, self.phones.id), (category, self.laptops.id)},
+        )
+        build_catalog_snapshots()
+        self.assertEqual(content(self._get({"category_id": self.phones.id})), b"[]")
+        self.assertIn(b"Product 1", content(self._get({"category_id": self.laptops.id})))
+
+    def test_signals_cost_nothing_when_disabled_or_suspended(self):
+        catalog_snapshots.build()
+        self.offer.price = 500
+        with self.settings(CATALOG_SNAPSHOTS_ENABLED=False), self.assertNumQueries(1):
+            self.offer.save()
+        with catalog_snapshots.suspended(), self.assertNumQueries(1):
+            self.offer.save()
+        self.assertEqual(self._stale(), set())
+
+        # массовое изменение помечает снимки одним вызовом после блока
+        catalog_cache.invalidate_offers(self.shop.id, [self.smartphones.id])
+        self.assertIn((CatalogSnapshot.SCOPE_SHOP, self.shop.id), self._stale())
+
+    def test_task_is_noop_when_disabled(self):
+        with self.settings(CATALOG_SNAPSHOTS_ENABLED=False):
+            self.assertEqual(build_catalog_snapshots()["built"], 0)
+        self.assertFalse(CatalogSnapshot.objects.exists())
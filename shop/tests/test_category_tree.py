@@ -0,0 +1,109 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from shop import active_shops, category_counts
+from shop.models import Shop, Category, Product, ProductInfo
+
+
+class CategoryTreeTests(APITestCase):
+    """
+    Дерево категорий с материализованным путём: фильтр category_id
+    с подкатегориями и счётчики предложений, обновляемые при смене остатков.
+    """
+
+    def setUp(self):
+        active_shops.invalidate()
+
+        self.partner = User.objects.create_user(username="partner", password="pass12345")
+        self.shop = Shop.objects.create(name="Shop", user=self.partner)
+
+        self.electronics = Category.objects.create(name="Электроника")
+        self.phones = Category.objects.create(name="Телефоны", parent=self.electronics)
+        self.smartphones = Category.objects.create(name="Смартфоны", parent=self.phones)
+        self.tv = Category.objects.create(name="Телевизоры", parent=self.electronics)
+
+        self.phone_offer = self._offer(self.phones, external_id=1, quantity=2)
+        self.smartphone_offer = self._offer(self.smartphones, external_id=2, quantity=0)
+        self._offer(self.tv, external_id=3, quantity=1)
+        category_counts.refresh()
+
+    def _offer(self, category, external_id, quantity):
+        product = Product.objects.create(name=f"Product {external_id}", category=category)
+        return ProductInfo.objects.create(
+            product=product, shop=self.shop, external_id=external_id, quantity=quantity, price=100,
+        )
+
+    def _counts(self, category):
+        category.refresh_from_db()
+        return category.offers_count, category.subtree_offers_count
+
+    def test_paths(self):
+        self.smartphones.refresh_from_db()
+        self.assertEqual(
+            self.smartphones.path, f"{self.electronics.id}/{self.phones.id}/{self.smartphones.id}/",
+        )
+        self.assertEqual(self.smartphones.ancestor_ids(), [self.electronics.id, self.phones.id])
+
+    def test_category_filter_includes_descendants(self):
+        url = reverse("products-info")
+
+        response = self.client.get(url, {"category_id": self.phones.id})
+        self.assertCountEqual(
+            [row["id"] for row in response.data], [self.phone_offer.id, self.smartphone_offer.id],
+        )
+
+        response = self.client.get(url, {"category_id": self.electronics.id})
+        self.assertEqual(len(response.data), 3)
+
+        response = self.client.get(reverse("product-list"), {"category_id": self.smartphones.id})
+        self.assertEqual([row["id"] for row in response.data], [self.smartphone_offer.product_id])
+
+        response = self.client.get(url, {"category_id": "abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"error": 'Некорректное значение "category_id".'})
+
+    def test_counts_in_category_list(self):
+        with self.assertNumQueries(2):  # категории + магазины
+            response = self.client.get(reverse("category-list"))
+
+        rows = {row["id"]: row for row in response.data}
+        self.assertEqual(response.data[0]["id"], self.electronics.id)  # родитель перед потомками
+        self.assertEqual(rows[self.electronics.id]["subtree_offers_count"], 2)
+        self.assertEqual(rows[self.phones.id]["offers_count"], 1)
+        self.assertEqual(rows[self.smartphones.id]["subtree_offers_count"], 0)
+
+    def test_stock_changes_update_counts(self):
+        self.client.force_authenticate(user=self.partner)
+
+        self.client.post(
+            reverse("partner-stock"), {"items": [{"external_id": 2, "quantity": 5}]}, format="json",
+        )
+        self.assertEqual(self._counts(self.smartphones), (1, 1))
+        self.assertEqual(self._counts(self.phones), (1, 2))
+        self.assertEqual(self._counts(self.electronics), (0, 3))
+
+        self.client.post(reverse("partner-shop-reset-stock"))
+        self.assertEqual(self._counts(self.electronics), (0, 0))
+        self.assertEqual(self._counts(self.phones), (0, 0))
+
+    def test_inactive_shop_not_counted(self):
+        self.shop.is_active = False
+        self.shop.save()
+
+        self.assertEqual(self._counts(self.electronics), (0, 0))
+
+    def test_move_subtree(self):
+        self.phones.parent = self.tv
+        self.phones.save()
+
+        self.smartphones.refresh_from_db()
+        self.assertEqual(self.smartphones.ancestor_ids(), [self.electronics.id, self.tv.id, self.phones.id])
+        self.assertEqual(self._counts(self.tv), (1, 2))
+        self.assertEqual(self._counts(self.electronics), (0, 2))
+
+        self.electronics.parent = self.smartphones
+        with self.assertRaises(ValueError):
+            self.electronics.save()
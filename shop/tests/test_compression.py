@@ -0,0 +1,125 @@
+import gzip
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APITestCase
+
+from shop import compression
+from shop.models import Category, Product, ProductInfo, Shop
+
+
+class AcceptEncodingTests(SimpleTestCase):
+    """Разбор Accept-Encoding и выбор кодировки из доступных."""
+
+    def test_accepted_encodings(self):
+        self.assertEqual(compression.accepted_encodings("gzip, deflate, br;q=0"), {"gzip", "deflate"})
+        self.assertEqual(compression.accepted_encodings("GZIP;q=0.5, zstd;q=0.000"), {"gzip"})
+
+    def test_choose_encoding(self):
+        self.assertEqual(compression.choose_encoding("gzip, br"), "br" if compression.brotli else "gzip")
+        self.assertIsNone(compression.choose_encoding("identity"))
+        self.assertIsNone(compression.choose_encoding(""))
+        self.assertIsNone(compression.choose_encoding("gzip;q=0"))
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100, COMPRESSION_CACHE_TIMEOUT=60)
+class CompressionMiddlewareTests(SimpleTestCase):
+    """CompressionMiddleware: порог размера, типы, ETag и кэш сжатых тел."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def _call(self, response, accept="gzip", **headers):
+        middleware = compression.CompressionMiddleware(lambda request: response)
+        return middleware(self.factory.get("/", HTTP_ACCEPT_ENCODING=accept, **headers))
+
+    def test_compresses_large_json_and_weakens_etag(self):
+        body = b'{"items": [' + b'{"name": "phone"},' * 50 + b'{}]}'
+        response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = '"abc"'
+        with mock.patch.dict(compression.CODECS, {"gzip": compression.CODECS["gzip"]}, clear=True):
+            response = self._call(response)
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), body)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(response["ETag"], 'W/"abc"')
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_skips_small_binary_and_already_encoded(self):
+        small = self._call(HttpResponse(b"{}", content_type="application/json"))
+        self.assertFalse(small.has_header("Content-Encoding"))
+
+        image = self._call(HttpResponse(b"x" * 1000, content_type="image/png"))
+        self.assertFalse(image.has_header("Content-Encoding"))
+
+        encoded = HttpResponse(b"x" * 1000, content_type="application/json")
+        encoded["Content-Encoding"] = "br"
+        self.assertEqual(self._call(encoded).content, b"x" * 1000)
+
+        identity = self._call(HttpResponse(b"x" * 1000, content_type="application/json"), accept="")
+        self.assertEqual(identity.content, b"x" * 1000)
+        self.assertIn("Accept-Encoding", identity["Vary"])
+
+    def test_hot_body_is_compressed_once(self):
+        codec = mock.Mock(side_effect=compression.CODECS["gzip"])
+        body = b"y" * 1000
+        with mock.patch.dict(compression.CODECS, {"gzip": codec}, clear=True):
+            first = self._call(HttpResponse(body, content_type="application/json"))
+            second = self._call(HttpResponse(body, content_type="application/json"))
+            self._call(HttpResponse(b"z" * 1000, content_type="application/json"))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(codec.call_count, 2)
+
+        with override_settings(COMPRESSION_CACHE_TIMEOUT=0), \
+                mock.patch.dict(compression.CODECS, {"gzip": codec}, clear=True):
+            self._call(HttpResponse(body, content_type="application/json"))
+        self.assertEqual(codec.call_count, 3)
+
+
+    def test_private_responses_are_not_cached(self):
+        codec = mock.Mock(side_effect=compression.CODECS["gzip"])
+        body = b"p" * 1000
+
+        def private():
+            response = HttpResponse(body, content_type="application/json")
+            response["Cache-Control"] = "private, max-age=60"
+            return response
+
+        with mock.patch.dict(compression.CODECS, {"gzip": codec}, clear=True):
+            for _ in range(2):
+                authorized = self._call(
+                    HttpResponse(body, content_type="application/json"), HTTP_AUTHORIZATION="Bearer token",
+                )
+                self._call(private())
+            self._call(HttpResponse(body, content_type="application/json"), HTTP_COOKIE="sessionid=abc")
+        self.assertEqual(authorized["Content-Encoding"], "gzip")
+        self.assertEqual(codec.call_count, 5)
+
+
+class CatalogCompressionTests(APITestCase):
+    """Сжатие списка предложений через весь стек middleware."""
+
+    def setUp(self):
+        shop = Shop.objects.create(name="Shop")
+        category = Category.objects.create(name="Phones")
+        for n in range(30):
+            ProductInfo.objects.create(
+                product=Product.objects.create(name=f"Phone {n}", category=category),
+                shop=shop, external_id=n, quantity=5, price=100 + n,
+            )
+
+    def test_products_info_is_compressed(self):
+        plain = self.client.get(reverse("products-info"))
+        self.assertFalse(plain.has_header("Content-Encoding"))
+
+        with mock.patch.dict(compression.CODECS, {"gzip": compression.CODECS["gzip"]}, clear=True):
+            response = self.client.get(reverse("products-info"), HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content) / 3)
@@ -0,0 +1,71 @@
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.contrib.auth.models import User
+
+from shop import db_router
+from shop.models import Product, ProductInfo, Order
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRouterTests(SimpleTestCase):
+    """
+    Маршрутизация: каталог читается с реплики, заказы и пользователи — с основной,
+    после записи в рамках запроса чтения "прилипают" к основной БД.
+    QuerySet.db только спрашивает роутер и не выполняет запросов.
+    """
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _run(self, request, view):
+        middleware = db_router.PrimaryStickinessMiddleware(view)
+        return middleware(request)
+
+    def test_catalog_reads_go_to_replica(self):
+        self.assertEqual(Product.objects.all().db, 'replica_1')
+        self.assertEqual(ProductInfo.objects.all().db, 'replica_1')
+        self.assertEqual(Order.objects.all().db, 'default')
+        self.assertEqual(User.objects.all().db, 'default')
+        # запись — всегда в основную
+        self.assertEqual(router.db_for_write(Product), 'default')
+
+    def test_write_pins_reads_within_request(self):
+        seen = []
+
+        def view(request):
+            seen.append(ProductInfo.objects.all().db)
+            db_router.ReplicaRouter().db_for_write(Order)
+            seen.append(ProductInfo.objects.all().db)
+            return HttpResponse()
+
+        response = self._run(self.factory.get('/api/v1/orders/basket/'), view)
+
+        self.assertEqual(seen, ['replica_1', 'default'])
+        self.assertIn('db_primary', response.cookies)
+        # вне запроса прилипание не сохраняется
+        self.assertEqual(ProductInfo.objects.all().db, 'replica_1')
+
+    def test_unsafe_method_and_cookie_read_from_primary(self):
+        seen = []
+
+        def view(request):
+            seen.append(ProductInfo.objects.all().db)
+            return HttpResponse()
+
+        self._run(self.factory.post('/api/v1/orders/confirm/'), view)
+        request = self.factory.get('/api/v1/products-info/')
+        request.COOKIES['db_primary'] = '1'
+        self._run(request, view)
+        self._run(self.factory.get('/api/v1/products-info/'), view)
+
+        self.assertEqual(seen, ['default', 'default', 'replica_1'])
+
+    def test_use_primary(self):
+        with db_router.use_primary():
+            self.assertEqual(Product.objects.all().db, 'default')
+        self.assertEqual(Product.objects.all().db, 'replica_1')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_means_no_routing(self):
+        self.assertEqual(Product.objects.all().db, 'default')
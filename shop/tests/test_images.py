@@ -0,0 +1,191 @@
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from shop import images
+from shop.models import Category, Product, ProductInfo, Shop
+from shop.tasks import process_product_image
+
+
+def image_bytes(size=(40, 20), mode="RGB", image_format="JPEG", orientation=None):
+    image = Image.new(mode, size, "red")
+    output = BytesIO()
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        image.save(output, image_format, exif=exif)
+    else:
+        image.save(output, image_format)
+    return output.getvalue()
+
+
+class PrepareTests(SimpleTestCase):
+    """images.prepare(): поворот по EXIF, уменьшение, JPEG без EXIF, отказ «бомбам»."""
+
+    def _open(self, body):
+        return Image.open(BytesIO(body))
+
+    def test_exif_rotation_applied_and_stripped(self):
+        body = images.prepare(image_bytes(orientation=6), max_side=100, max_pixels=10_000)
+        with self._open(body) as image:
+            self.assertEqual(image.format, "JPEG")
+            self.assertEqual(image.size, (20, 40))
+            self.assertNotIn(0x0112, image.getexif())
+
+    def test_downscale_and_flatten_alpha(self):
+        body = images.prepare(image_bytes((400, 100), "RGBA", "PNG"), max_side=200, max_pixels=100_000)
+        with self._open(body) as image:
+            self.assertEqual((image.size, image.mode), ((200, 50), "RGB"))
+
+    def test_rejects_bombs_and_garbage(self):
+        bomb = image_bytes((2000, 2000), "L", "PNG")
+        self.assertLess(len(bomb), 50_000)
+        with self.assertRaisesMessage(images.ImageRejected, "Слишком большое"):
+            images.prepare(bomb, max_side=100, max_pixels=1_000_000)
+        with self.assertRaises(images.ImageRejected):
+            images.check_header(BytesIO(bomb), max_pixels=1_000_000)
+        with self.assertRaisesMessage(images.ImageRejected, "не является изображением"):
+            images.prepare(b"not an image", max_side=100, max_pixels=1_000_000)
+        # глобальный лимит Pillow восстановлен
+        self.assertNotEqual(Image.MAX_IMAGE_PIXELS, 1_000_000)
+
+
+class MediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.media_root = Path(media_root)
+        self.category = Category.objects.create(name="Phones")
+
+
+@override_settings(PRODUCT_IMAGE_MAX_UPLOAD_SIZE=50_000, PRODUCT_IMAGE_MAX_PIXELS=1_000_000, PRODUCT_IMAGE_MAX_SIDE=100)
+class ProductImageUploadTests(MediaRootMixin, APITestCase):
+    """Загрузка изображения через API: проверки в запросе, обработка — в задаче."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(User.objects.create_superuser("admin", "admin@example.com", "pass12345"))
+        self.product = Product.objects.create(name="Phone", category=self.category)
+        self.url = reverse("product-detail", args=[self.product.id])
+
+    def _upload(self, body, name="photo.png"):
+        return self.client.patch(self.url, {"image": SimpleUploadedFile(name, body)}, format="multipart")
+
+    def test_rejects_large_files_and_bombs(self):
+        with mock.patch("shop.tasks.process_product_image.delay") as delay:
+            too_large = self._upload(b"x" * 60_000)
+            bomb = self._upload(image_bytes((2000, 2000), "L", "PNG"))
+        self.assertEqual(too_large.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("image", too_large.data)
+        self.assertEqual(bomb.status_code, status.HTTP_400_BAD_REQUEST)
+        delay.assert_not_called()
+        self.product.refresh_from_db()
+        self.assertFalse(self.product.image)
+
+    def test_upload_queues_processing(self):
+        with mock.patch("shop.tasks.process_product_image.delay") as delay:
+            response = self._upload(image_bytes((400, 200), "RGBA", "PNG"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.product.refresh_from_db()
+        delay.assert_called_once_with(self.product.id, self.product.image.name)
+
+        # миниатюры не создаются при чтении товара
+        response = self.client.get(self.url)
+        self.assertTrue(response.data["image_small"])
+        self.assertFalse((self.media_root / "CACHE").exists())
+
+        processed = process_product_image(self.product.id, self.product.image.name)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image.name, processed)
+        self.assertTrue(processed.endswith(".jpg"))
+        self.assertEqual([p.name for p in (self.media_root / "products/originals").iterdir()], [Path(processed).name])
+        with Image.open(self.product.image.path) as image:
+            self.assertEqual(image.size, (100, 50))
+        self.assertTrue(Path(self.product.image_small.path).exists())
+
+    def test_replaced_image_is_not_processed(self):
+        self.product.image.save("old.png", ContentFile(image_bytes(image_format="PNG")))
+        old = self.product.image.name
+        self.product.image.save("new.png", ContentFile(image_bytes(image_format="PNG")))
+        self.assertIsNone(process_product_image(self.product.id, old))
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.image.name.endswith("new.png"))
+
+
+@override_settings(PRODUCT_IMAGE_MAX_UPLOAD_SIZE=50_000, PRODUCT_IMAGE_MAX_PIXELS=1_000_000, PRODUCT_IMAGE_MAX_SIDE=100)
+class IngestProductImagesTests(MediaRootMixin, APITestCase):
+    """Команда ingest_product_images: zip поставщика, пул процессов, отказы."""
+
+    def setUp(self):
+        super().setUp()
+        self.shop = Shop.objects.create(name="Shop")
+        self.products = [Product.objects.create(name=f"Phone {n}", category=self.category) for n in range(3)]
+        for n, product in enumerate(self.products):
+            ProductInfo.objects.create(product=product, shop=self.shop, external_id=500 + n, quantity=1, price=100)
+        self.archive = self.media_root / "supplier.zip"
+        with zipfile.ZipFile(self.archive, "w") as archive:
+            archive.writestr("500.jpg", image_bytes((300, 300), orientation=6))
+            archive.writestr("images/501.png", image_bytes((50, 50), "RGBA", "PNG"))
+            archive.writestr("502.png", image_bytes((2000, 2000), "L", "PNG"))  # «бомба»
+            archive.writestr("503.jpg", image_bytes())  # нет такого предложения
+            archive.writestr("504.jpg", b"\0" * 60_000)  # больше лимита
+
+    def test_ingest_zip_with_pool(self):
+        stdout, stderr = StringIO(), StringIO()
+        with mock.patch("shop.tasks.generate_product_thumbnails.delay") as delay:
+            call_command(
+                "ingest_product_images", str(self.archive), shop=self.shop.id, workers=2,
+                stdout=stdout, stderr=stderr,
+            )
+        self.assertIn("Загружено: 2, отклонено: 2, без товара: 1", stdout.getvalue())
+        self.assertIn("502.png", stderr.getvalue())
+
+        first, second, third = (Product.objects.get(id=p.id) for p in self.products)
+        with Image.open(first.image.path) as image:
+            self.assertEqual(image.size, (100, 100))
+            self.assertNotIn(0x0112, image.getexif())
+        self.assertEqual(second.image.name, f"products/originals/{second.id}.jpg")
+        self.assertFalse(third.image)
+        self.assertEqual(sorted(call.args[0] for call in delay.call_args_list), [first.id, second.id])
+
+
+    def test_corrupt_zip_member_is_rejected(self):
+        body = image_bytes((60, 60))
+        archive_path = self.media_root / "broken.zip"
+        with zipfile.ZipFile(archive_path, "w") as archive:
+            archive.writestr("500.jpg", body)
+            archive.writestr("501.jpg", body)
+        data = bytearray(archive_path.read_bytes())
+        offset = data.index(body) + len(body) // 2  # данные первого файла: CRC не сойдётся
+        data[offset] ^= 0xFF
+        archive_path.write_bytes(bytes(data))
+
+        with self.assertRaisesMessage(images.ImageRejected, "Повреждённый файл"):
+            images.prepare_entry(str(archive_path), "500.jpg", 100, 1_000_000, 88)
+
+        stdout, stderr = StringIO(), StringIO()
+        with mock.patch("shop.tasks.generate_product_thumbnails.delay"):
+            call_command(
+                "ingest_product_images", str(archive_path), shop=self.shop.id, workers=1,
+                stdout=stdout, stderr=stderr,
+            )
+        self.assertIn("Загружено: 1, отклонено: 1, без товара: 0", stdout.getvalue())
+        self.assertIn("500.jpg", stderr.getvalue())
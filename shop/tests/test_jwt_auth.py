@@ -0,0 +1,67 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from shop.authentication import user_cache_key
+from shop.models import Contact
+
+
+@override_settings(JWT_USER_RESOLUTION="cache")
+class CachedJWTAuthenticationTests(APITestCase):
+    """
+    CachedJWTAuthentication: в обычном случае аутентифицированный запрос
+    не обращается к auth_user, а деактивация пользователя видна сразу.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="buyer", password="pass12345")
+        Contact.objects.create(user=self.user, city="Moscow", address="Street", phone="1")
+
+        response = self.client.post(
+            reverse("token_obtain_pair"),
+            {"username": "buyer", "password": "pass12345"},
+            format="json",
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.url = reverse("contacts-list")
+
+    def test_cache_mode_skips_user_query(self):
+        with self.assertNumQueries(2):  # пользователь + контакты
+            self.client.get(self.url)
+
+        with self.assertNumQueries(1):  # только контакты
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+    def test_deactivation_invalidates_cache(self):
+        self.client.get(self.url)
+
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cache_holds_only_auth_fields(self):
+        self.client.get(self.url)
+        cached = cache.get(user_cache_key(self.user.id))
+        self.assertEqual(set(cached), {"username", "is_staff", "is_superuser", "is_active"})
+
+    @override_settings(JWT_USER_RESOLUTION="claims")
+    def test_claims_mode_never_loads_user(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["user"], self.user.id)
+
+    @override_settings(JWT_USER_RESOLUTION="db")
+    def test_db_mode_loads_user_every_time(self):
+        for _ in range(2):
+            with self.assertNumQueries(2):
+                self.client.get(self.url)
@@ -0,0 +1,60 @@
+import asyncio
+from unittest import mock
+
+from django.test import LiveServerTestCase, SimpleTestCase
+
+from shop.loadtest import runner, stats
+from shop.loadtest.seed import seed
+
+
+class LoadtestStatsTests(SimpleTestCase):
+    """Отчёт нагрузочного теста: перцентили, гистограмма, пороги и регрессии."""
+
+    def _report(self, latencies, errors=0, duration=10.0):
+        recorder = stats.Recorder()
+        for index, latency in enumerate(latencies):
+            recorder.add_scenario("browse", latency, ok=index >= errors)
+        return recorder.report(duration)
+
+    def test_summary(self):
+        row = self._report(list(range(1, 101)), errors=5)["scenarios"]["browse"]
+        self.assertEqual(row["count"], 100)
+        self.assertEqual(row["per_sec"], 10.0)
+        self.assertEqual(row["error_rate"], 0.05)
+        self.assertEqual((row["p50_ms"], row["p95_ms"], row["p99_ms"], row["max_ms"]), (50, 95, 99, 100))
+        self.assertEqual(row["histogram"]["<=5"], 5)
+        self.assertEqual(row["histogram"]["<=100"], 50)
+        self.assertEqual(sum(row["histogram"].values()), 100)
+
+    def test_thresholds(self):
+        report = self._report([100] * 19 + [2000], errors=1)
+        thresholds = {
+            "default": {"max_error_rate": 0.01, "max_p95_ms": 1000},
+            "scenarios": {"browse": {"min_per_sec": 5}},
+        }
+        failures = stats.check(report, thresholds)
+        self.assertEqual(len(failures), 2)
+        self.assertTrue(failures[0].startswith("browse: error_rate"))
+        self.assertTrue(failures[1].startswith("browse: 2.0/s"))
+        self.assertEqual(stats.check(report, {"default": {"max_p95_ms": 1000}}), [])
+
+    def test_regression_against_baseline(self):
+        baseline = self._report([100] * 100)
+        self.assertEqual(stats.check(self._report([110] * 90), {}, baseline, max_regression=0.25), [])
+        failures = stats.check(self._report([200] * 50), {}, baseline, max_regression=0.25)
+        self.assertEqual(len(failures), 2)
+
+
+class LoadtestSmokeTests(LiveServerTestCase):
+    """Короткий прогон всех сценариев против live-сервера без ошибок."""
+
+    def test_scenarios_run_without_errors(self):
+        manifest = seed(shops=2, products=20, users=2)
+        with mock.patch("shop.tasks.send_order_emails.delay"):
+            report = asyncio.run(runner.run(
+                self.live_server_url, manifest, users=2, duration=1.5,
+                mix={"browse": 1, "basket": 1, "checkout": 1, "orders": 1},
+            ))
+        self.assertTrue(report["scenarios"])
+        for name, row in report["requests"].items():
+            self.assertEqual(row["errors"], 0, name)
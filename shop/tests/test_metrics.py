@@ -0,0 +1,144 @@
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+from pathlib import Path
+from unittest import mock
+
+from celery import shared_task
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from config.celery import app as celery_app
+from shop.models import Category, Contact, Product, ProductInfo, Shop
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@shared_task
+def _failing_task():
+    raise RuntimeError("boom")
+
+
+class MetricsEndpointTests(APITestCase):
+    """GET /metrics и счётчики запросов, SQL-запросов и оформления заказа."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="buyer", password="pass12345", email="b@example.com")
+        self.client.force_authenticate(self.user)
+        shop = Shop.objects.create(name="Shop")
+        product = Product.objects.create(name="Phone", category=Category.objects.create(name="Phones"))
+        self.offer = ProductInfo.objects.create(product=product, shop=shop, external_id=1, quantity=5, price=100)
+        self.contact = Contact.objects.create(user=self.user, city="Москва", address="ул. 1", phone="+7")
+
+    def test_request_and_query_metrics(self):
+        view = {"view": "products-info"}
+        before = sample("http_requests_total", method="GET", status="200", **view)
+        queries_before = sample("http_request_db_queries_count", **view)
+
+        self.client.get(reverse("products-info"))
+
+        self.assertEqual(sample("http_requests_total", method="GET", status="200", **view), before + 1)
+        self.assertEqual(sample("http_request_db_queries_count", **view), queries_before + 1)
+        self.assertGreater(sample("http_request_duration_seconds_count", method="GET", **view), 0)
+
+        with self.settings(METRICS_TOKEN="secret"):
+            response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'http_requests_total{method="GET",status="200",view="products-info"}', response.content)
+
+    def test_unresolved_path_does_not_leak_url(self):
+        self.client.get("/no-such-page/12345/")
+        self.assertGreater(sample("http_requests_total", view="<unresolved>", method="GET", status="404"), 0)
+
+    def test_closed_without_token(self):
+        with self.settings(METRICS_TOKEN=""):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, status.HTTP_403_FORBIDDEN)
+            response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer ")
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_business_counters(self):
+        added = sample("shop_basket_mutations_total", action="add")
+        rejected = sample("shop_order_confirm_rejected_total", reason="contact")
+        confirmed = sample("shop_orders_confirmed_total")
+
+        self.client.post(reverse("order-basket"), {"items": [{"product_info": self.offer.id}]}, format="json")
+        self.client.post(reverse("order-confirm"), {}, format="json")
+        with mock.patch("shop.tasks.send_order_emails"):
+            self.client.post(reverse("order-confirm"), {"contact_id": self.contact.id}, format="json")
+
+        self.assertEqual(sample("shop_basket_mutations_total", action="add"), added + 1)
+        self.assertEqual(sample("shop_order_confirm_rejected_total", reason="contact"), rejected + 1)
+        self.assertEqual(sample("shop_orders_confirmed_total"), confirmed + 1)
+
+
+class CeleryMetricsTests(SimpleTestCase):
+    """Длительность и ошибки задач через сигналы Celery."""
+
+    def setUp(self):
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, "task_always_eager", eager)
+
+    def test_task_duration_and_failure(self):
+        name = _failing_task.name
+        failures = sample("celery_task_failures_total", task=name)
+        durations = sample("celery_task_duration_seconds_count", task=name, state="FAILURE")
+
+        _failing_task.apply()
+
+        self.assertEqual(sample("celery_task_failures_total", task=name), failures + 1)
+        self.assertEqual(sample("celery_task_duration_seconds_count", task=name, state="FAILURE"), durations + 1)
+
+
+class MultiprocessMetricsTests(SimpleTestCase):
+    """
+    PROMETHEUS_MULTIPROC_DIR: значения нескольких процессов складываются.
+    Режим выбирается при импорте prometheus_client, поэтому — в подпроцессах.
+    """
+
+    SCRIPT = textwrap.dedent("""
+        import sys
+        import django
+        django.setup()
+        from shop import metrics
+        if sys.argv[1] == "inc":
+            metrics.ORDERS_CONFIRMED.inc()
+        else:
+            from prometheus_client import generate_latest
+            sys.stdout.write(generate_latest(metrics.registry()).decode())
+    """)
+
+    def _run(self, env, mode):
+        return subprocess.run(
+            [sys.executable, "-c", self.SCRIPT, mode], cwd=BASE_DIR, env=env,
+            capture_output=True, text=True, check=True,
+        ).stdout
+
+    def test_values_are_summed_across_processes(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": "config.settings",
+                "DJANGO_SECRET_KEY": os.environ.get("DJANGO_SECRET_KEY", "x"),
+                "PROMETHEUS_MULTIPROC_DIR": directory,
+            }
+            self._run(env, "inc")
+            self._run(env, "inc")
+            output = self._run(env, "show")
+        self.assertIn("shop_orders_confirmed_total 2.0", output)
@@ -0,0 +1,155 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from shop import order_archive, shop_orders
+from shop.models import (
+    ArchivedOrder,
+    ArchivedOrderItem,
+    Category,
+    Order,
+    OrderItem,
+    Product,
+    ProductInfo,
+    Shop,
+    ShopDailySales,
+    ShopOrder,
+)
+from shop.tasks import refresh_shop_daily_sales
+
+
+@override_settings(ORDER_ARCHIVE_AFTER_DAYS=30, ORDER_ARCHIVE_BATCH_PAUSE=0)
+class OrderArchiveTests(APITestCase):
+    """
+    Архивация заказов (shop/order_archive.py): что переносится, снимок позиций,
+    чтение истории, карточки заказа и отчётов магазина вместе с архивом.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="buyer", password="pass12345")
+        self.client.force_authenticate(user=self.user)
+
+        self.partner = User.objects.create_user(username="partner", password="pass12345")
+        self.shop = Shop.objects.create(name="Shop", user=self.partner)
+        category = Category.objects.create(name="Category")
+        product = Product.objects.create(name="Phone", category=category)
+        self.offer = ProductInfo.objects.create(
+            product=product, shop=self.shop, external_id=1, quantity=10, price=100,
+        )
+        self.now = timezone.now()
+
+    def _make_order(self, status_value, days_ago, lines=((None, 1),), updated_days_ago=None):
+        order = Order.objects.create(user=self.user, status=status_value)
+        if updated_days_ago is None:
+            updated_days_ago = days_ago
+        Order.objects.filter(pk=order.pk).update(
+            created_at=self.now - timedelta(days=days_ago),
+            updated_at=self.now - timedelta(days=updated_days_ago),
+        )
+        for offer, quantity in lines:
+            OrderItem.objects.create(order=order, product_info=offer or self.offer, quantity=quantity)
+        return order
+
+    def test_moves_only_old_terminal_orders(self):
+        delivered = self._make_order("delivered", 60, [(None, 3)])
+        cancelled = self._make_order("cancelled", 40)
+        self._make_order("delivered", 60, updated_days_ago=5)
+        self._make_order("sent", 90)
+        self._make_order("basket", 90)
+
+        self.assertEqual(order_archive.archive(), 2)
+
+        self.assertEqual(
+            set(ArchivedOrder.objects.values_list("id", flat=True)), {delivered.id, cancelled.id},
+        )
+        self.assertFalse(Order.objects.filter(pk__in=[delivered.id, cancelled.id]).exists())
+        self.assertFalse(OrderItem.objects.filter(order_id=delivered.id).exists())
+        self.assertEqual(Order.objects.count(), 3)
+
+        archived = ArchivedOrder.objects.get(pk=delivered.id)
+        self.assertEqual((archived.status, archived.items_count, archived.total), ("delivered", 1, Decimal("300")))
+        item = ArchivedOrderItem.objects.get(order=archived)
+        self.assertEqual((item.product_name, item.shop_name, item.price, item.quantity), ("Phone", "Shop", 100, 3))
+
+    def test_deletes_shop_orders_with_their_items(self):
+        archived = self._make_order("delivered", 60, [(None, 2)])
+        live = self._make_order("sent", 60)
+        shop_orders.split(archived)
+        shop_orders.split(live)
+
+        self.assertEqual(order_archive.archive(), 1)
+
+        self.assertFalse(ShopOrder.objects.filter(order_id=archived.id).exists())
+        self.assertFalse(OrderItem.objects.filter(order_id=archived.id).exists())
+        self.assertTrue(ShopOrder.objects.filter(order_id=live.id, items__isnull=False).exists())
+
+    def test_archives_in_batches(self):
+        for days in range(31, 36):
+            self._make_order("delivered", days)
+
+        self.assertEqual(order_archive.archive(batch_size=2, max_batches=2), 4)
+        self.assertEqual(order_archive.archive(batch_size=2), 1)
+        self.assertEqual(ArchivedOrder.objects.count(), 5)
+
+    def test_history_merges_archive_with_keyset_pages(self):
+        live_new = self._make_order("new", 1)
+        archived_mid = self._make_order("delivered", 50)
+        live_old = self._make_order("sent", 70)
+        archived_old = self._make_order("cancelled", 80)
+        order_archive.archive()
+
+        url = reverse("order-history")
+        first = self.client.get(url, {"page_size": 2})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["id"] for r in first.data["results"]], [live_new.id, archived_mid.id])
+        self.assertEqual(first.data["results"][1]["total"], "100.00")
+
+        second = self.client.get(first.data["next"])
+        self.assertEqual([r["id"] for r in second.data["results"]], [live_old.id, archived_old.id])
+        self.assertIsNone(second.data["next"])
+
+        filtered = self.client.get(url, {"status": "cancelled"})
+        self.assertEqual([r["id"] for r in filtered.data["results"]], [archived_old.id])
+
+    def test_retrieve_archived_order(self):
+        order = self._make_order("delivered", 60, [(None, 2)])
+        order_archive.archive()
+        self.offer.price = 500
+        self.offer.save()
+
+        response = self.client.get(reverse("order-detail", args=[order.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], "delivered")
+        self.assertEqual(response.data["total_sum"], "200.00")
+        self.assertEqual(response.data["ordered_items"][0]["product"], "Phone")
+        self.assertIsNotNone(response.data["archived_at"])
+
+        other = User.objects.create_user(username="other", password="pass12345")
+        self.client.force_authenticate(user=other)
+        response = self.client.get(reverse("order-detail", args=[order.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_partner_stats_include_archived_sales(self):
+        self._make_order("delivered", 3, [(None, 2)], updated_days_ago=40)
+        self._make_order("cancelled", 3, [(None, 5)], updated_days_ago=40)
+        self._make_order("new", 3, [(None, 1)])
+        order_archive.archive()
+        self.assertEqual(ArchivedOrder.objects.count(), 2)
+
+        self.client.force_authenticate(user=self.partner)
+        url = reverse("partner-orders-stats")
+        live = self.client.get(url, {"source": "live"})
+        self.assertEqual(live.data["totals"]["units"], 3)
+        self.assertEqual(live.data["totals"]["revenue"], Decimal("300"))
+
+        refresh_shop_daily_sales()
+        self.assertEqual(ShopDailySales.objects.get(shop=self.shop).units, 3)
+        rollup = self.client.get(url, {"source": "rollup"})
+        self.assertEqual(rollup.data["results"], live.data["results"])
@@ -0,0 +1,117 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from shop.models import (
+    Shop,
+    Category,
+    Product,
+    ProductInfo,
+    Order,
+    OrderItem,
+)
+
+
+class OrderHistoryTests(APITestCase):
+    """
+    Тесты для GET /orders/history/:
+    фильтры, keyset-пагинация и агрегаты в одном запросе.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="buyer", password="pass12345")
+        self.client.force_authenticate(user=self.user)
+
+        shop = Shop.objects.create(name="Shop")
+        category = Category.objects.create(name="Category")
+        product = Product.objects.create(name="Product", category=category)
+        self.offer_a = ProductInfo.objects.create(
+            product=product, shop=shop, external_id=1, quantity=10, price=100,
+        )
+        self.offer_b = ProductInfo.objects.create(
+            product=product, shop=shop, external_id=2, quantity=10, price=250,
+        )
+
+        self.url = reverse("order-history")
+
+    def _make_order(self, status_value, created_at, lines=()):
+        order = Order.objects.create(user=self.user, status=status_value)
+        # created_at — auto_now_add, поэтому выставляем через update
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        for offer, quantity in lines:
+            OrderItem.objects.create(order=order, product_info=offer, quantity=quantity)
+        return order
+
+    def test_history_excludes_basket_and_aggregates_in_sql(self):
+        now = timezone.now()
+        self._make_order("basket", now, [(self.offer_a, 1)])
+        order = self._make_order(
+            "new", now - timedelta(days=1), [(self.offer_a, 2), (self.offer_b, 1)],
+        )
+        self._make_order("delivered", now - timedelta(days=2))
+
+        # заказы и архив заказов — по одному запросу
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual([r["status"] for r in results], ["new", "delivered"])
+        self.assertEqual(results[0]["id"], order.id)
+        self.assertEqual(results[0]["items_count"], 2)
+        self.assertEqual(Decimal(results[0]["total"]), Decimal("450"))
+        self.assertEqual(Decimal(results[1]["total"]), Decimal("0"))
+        self.assertIsNone(response.data["next"])
+
+    def test_history_filters_by_status_and_date(self):
+        now = timezone.now()
+        self._make_order("new", now - timedelta(days=1))
+        sent = self._make_order("sent", now - timedelta(days=5))
+        self._make_order("sent", now - timedelta(days=40))
+
+        created_from = (now - timedelta(days=10)).date().isoformat()
+        response = self.client.get(
+            self.url, {"status": "sent,delivered", "created_from": created_from},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["id"] for r in response.data["results"]], [sent.id])
+
+        response = self.client.get(self.url, {"created_to": "not-a-date"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # строка, а не список строк, как у остальных ошибок API
+        self.assertEqual(response.json(), {"error": 'Некорректное значение "created_to".'})
+
+    def test_keyset_pagination_walks_all_orders_once(self):
+        moment = timezone.now()
+        # одинаковый created_at — порядок должен определяться id
+        ids = [self._make_order("new", moment).id for _ in range(5)]
+
+        seen = []
+        url = f"{self.url}?page_size=2"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen += [r["id"] for r in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertEqual(seen, sorted(ids, reverse=True))
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(self.url, {"cursor": "garbage"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_order_detail_returns_full_items(self):
+        order = self._make_order("new", timezone.now(), [(self.offer_b, 2)])
+
+        response = self.client.get(reverse("order-detail", args=[order.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["ordered_items"]), 1)
+        self.assertEqual(response.data["total_sum"], Decimal("500"))
@@ -57,22 +57,23 @@ class OrderBasketTests(APITestCase):
         self.basket_url = reverse("order-basket")
         self.confirm_url = reverse("order-confirm")
 
-    def test_get_empty_basket_creates_order(self):
+    def test_get_without_basket_does_not_create_order(self):
         """
-        GET /orders/basket/ для нового пользователя:
-        должна создаться пустая корзина в состоянии 'basket'.
+        GET /orders/basket/ для нового пользователя: пустая корзина в ответе,
+        но строка Order не создаётся — она появится при первом POST.
         """
         response = self.client.get(self.basket_url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-
-        # в БД должна появиться корзина
-        basket = Order.objects.get(user=self.user, status="basket")
-        self.assertEqual(basket.ordered_items.count(), 0)
-
-        # и она же должна вернуться в ответе
-        self.assertEqual(response.data["id"], basket.id)
+        self.assertFalse(Order.objects.filter(user=self.user).exists())
+        self.assertIsNone(response.data["id"])
         self.assertEqual(response.data["status"], "basket")
+        self.assertEqual(response.data["ordered_items"], [])
+
+        # DELETE без корзины — тоже без записи в БД
+        response = self.client.delete(self.basket_url, {"items": [self.product_info.id]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Order.objects.filter(user=self.user).exists())
 
     def test_post_basket_adds_items(self):
         """
@@ -91,7 +92,7 @@ class OrderBasketTests(APITestCase):
         item = OrderItem.objects.get(order=basket, product_info=self.product_info)
         self.assertEqual(item.quantity, 2)
 
-    @patch("shop.views.send_order_emails")
+    @patch("shop.tasks.send_order_emails")
     def test_confirm_turns_basket_into_order_and_calls_celery(self, mock_task):
         """
         POST /orders/confirm/:
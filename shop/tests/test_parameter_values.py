@@ -0,0 +1,87 @@
+from django.urls import reverse
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from shop import active_shops
+from shop.models import (
+    Shop, Category, Product, ProductInfo, Parameter, ProductParameter, parse_number,
+)
+
+
+class ParameterValuesTests(APITestCase):
+    """
+    Числовые значения параметров: value_num заполняется при сохранении,
+    по нему работают диапазон ?value_min/?value_max и ?order_by_parameter.
+    """
+
+    def setUp(self):
+        active_shops.invalidate()
+
+        shop = Shop.objects.create(name="Shop")
+        category = Category.objects.create(name="Phones")
+        self.memory = Parameter.objects.create(name="Память", value_type=Parameter.TYPE_NUMBER)
+        color = Parameter.objects.create(name="Цвет")
+
+        self.offers = {}
+        for i, value in enumerate(["64", "512", "128", None]):
+            product = Product.objects.create(name=f"Phone {i}", category=category)
+            offer = ProductInfo.objects.create(
+                product=product, shop=shop, external_id=i, quantity=1, price=100,
+            )
+            if value is not None:
+                ProductParameter.objects.create(product_info=offer, parameter=self.memory, value=value)
+            ProductParameter.objects.create(product_info=offer, parameter=color, value="черный")
+            self.offers[value] = offer
+
+        self.url = reverse("products-info")
+
+    def test_parse_number(self):
+        self.assertEqual(parse_number("6,5"), 6.5)
+        self.assertEqual(parse_number(" 128 "), 128.0)
+        self.assertIsNone(parse_number("черный"))
+        self.assertIsNone(parse_number("nan"))
+        self.assertIsNone(parse_number(True))
+
+    def test_save_fills_value_num(self):
+        param = ProductParameter.objects.get(product_info=self.offers["512"], parameter=self.memory)
+        self.assertEqual(param.value_num, 512)
+
+        param.value = "1024"
+        param.save(update_fields=["value"])
+        param.refresh_from_db()
+        self.assertEqual(param.value_num, 1024)
+
+        self.assertFalse(
+            ProductParameter.objects.filter(parameter__name="Цвет", value_num__isnull=False).exists()
+        )
+
+    def test_numeric_range_filter(self):
+        response = self.client.get(
+            self.url, {"parameter": "Память", "value_min": "100", "value_max": "600"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(
+            [row["id"] for row in response.data],
+            [self.offers["512"].id, self.offers["128"].id],
+        )
+
+    def test_range_filter_rejects_non_number(self):
+        response = self.client.get(self.url, {"parameter": "Память", "value_min": "много"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"error": 'Некорректное значение "value_min".'})
+
+    def test_order_by_parameter_is_numeric(self):
+        response = self.client.get(self.url, {"order_by_parameter": "Память"})
+        self.assertEqual(
+            [row["id"] for row in response.data],
+            [self.offers[v].id for v in ("64", "128", "512", None)],
+        )
+
+        # без значения — всегда в конце
+        response = self.client.get(self.url, {"order_by_parameter": "-Память"})
+        self.assertEqual(
+            [row["id"] for row in response.data],
+            [self.offers[v].id for v in ("512", "128", "64", None)],
+        )
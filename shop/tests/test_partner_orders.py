@@ -0,0 +1,141 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from shop import shop_orders
+from shop.models import (
+    Shop,
+    Category,
+    Product,
+    ProductInfo,
+    Order,
+    OrderItem,
+    ShopDailySales,
+)
+from shop.tasks import refresh_shop_daily_sales
+
+
+class PartnerOrdersTests(APITestCase):
+    """
+    Тесты для /partner/orders/: магазин видит только свои позиции,
+    отчёт по продажам совпадает для live-агрегации и дневной свёртки.
+    """
+
+    def setUp(self):
+        self.partner = User.objects.create_user(username="partner", password="pass12345")
+        self.buyer = User.objects.create_user(username="buyer", password="pass12345")
+
+        self.shop = Shop.objects.create(name="My shop", user=self.partner)
+        other_shop = Shop.objects.create(name="Other shop")
+        category = Category.objects.create(name="Category")
+        product = Product.objects.create(name="Phone", category=category)
+
+        self.offer = ProductInfo.objects.create(
+            product=product, shop=self.shop, external_id=1, quantity=10, price=100,
+        )
+        self.other_offer = ProductInfo.objects.create(
+            product=product, shop=other_shop, external_id=1, quantity=10, price=999,
+        )
+
+        self.today = timezone.now()
+        self.order = self._make_order("new", self.today, [(self.offer, 2), (self.other_offer, 1)])
+        self._make_order("delivered", self.today - timedelta(days=1), [(self.offer, 3)])
+        self._make_order("cancelled", self.today, [(self.offer, 5)])
+        self._make_order("basket", self.today, [(self.offer, 7)])
+        self._make_order("new", self.today, [(self.other_offer, 1)])
+
+        self.list_url = reverse("partner-orders-list")
+        self.stats_url = reverse("partner-orders-stats")
+
+    def _make_order(self, status_value, created_at, lines):
+        order = Order.objects.create(user=self.buyer, status=status_value)
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        for offer, quantity in lines:
+            OrderItem.objects.create(order=order, product_info=offer, quantity=quantity)
+        if status_value != "basket":
+            # как при оформлении: позиции магазинов — в подзаказы
+            shop_orders.split(order)
+        return order
+
+    def test_non_partner_is_forbidden(self):
+        self.client.force_authenticate(user=self.buyer)
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_partner_sees_only_own_lines(self):
+        self.client.force_authenticate(user=self.partner)
+        response = self.client.get(self.list_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        # корзина и чужие заказы не видны; отменённый заказ — виден
+        self.assertEqual(len(results), 3)
+
+        order = next(r for r in results if r["id"] == self.order.id)
+        self.assertEqual([i["product_info"] for i in order["items"]], [self.offer.id])
+        self.assertEqual(Decimal(order["shop_total"]), Decimal("200"))
+
+    def test_stats_live_and_rollup_match(self):
+        self.client.force_authenticate(user=self.partner)
+
+        live = self.client.get(self.stats_url, {"source": "live"})
+        self.assertEqual(live.status_code, status.HTTP_200_OK)
+        # отменённые заказы и корзина в продажи не входят
+        self.assertEqual(live.data["totals"]["units"], 5)
+        self.assertEqual(live.data["totals"]["revenue"], Decimal("500"))
+        self.assertEqual([row["units"] for row in live.data["results"]], [3, 2])
+
+        refresh_shop_daily_sales()
+        self.assertEqual(ShopDailySales.objects.filter(shop=self.shop).count(), 2)
+
+        rollup = self.client.get(self.stats_url, {"source": "rollup"})
+        self.assertEqual(rollup.data["totals"], live.data["totals"])
+        self.assertEqual(rollup.data["results"], live.data["results"])
+
+    def test_rollup_refresh_is_incremental(self):
+        refresh_shop_daily_sales()
+        self._make_order("new", self.today, [(self.offer, 4)])
+
+        refresh_shop_daily_sales()
+
+        row = ShopDailySales.objects.get(shop=self.shop, day=self.today.date())
+        self.assertEqual(row.units, 6)
+
+    @override_settings(PARTNER_STATS_ROLLUP_LAG_SECONDS=60)
+    def test_rollup_picks_up_orders_committed_during_a_run(self):
+        now = timezone.now()
+        with mock.patch("shop.tasks.timezone.now", return_value=now):
+            refresh_shop_daily_sales()
+        # транзакция заказа началась до запуска, а закоммичена после него
+        order = self._make_order("new", self.today, [(self.offer, 4)])
+        Order.objects.filter(pk=order.pk).update(updated_at=now - timedelta(seconds=10))
+
+        with mock.patch("shop.tasks.timezone.now", return_value=now + timedelta(minutes=5)):
+            refresh_shop_daily_sales()
+        self.assertEqual(ShopDailySales.objects.get(shop=self.shop, day=self.today.date()).units, 6)
+
+    def test_stats_group_by_product(self):
+        self.client.force_authenticate(user=self.partner)
+        response = self.client.get(self.stats_url, {"group_by": "product"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["product_info"], self.offer.id)
+
+        response = self.client.get(self.stats_url, {"group_by": "week"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_stats_malformed_dates_are_rejected(self):
+        self.client.force_authenticate(user=self.partner)
+        for params in ({"date_to": "garbage"}, {"date_from": "garbage"}, {"date_to": "2025-02-30"}):
+            response = self.client.get(self.stats_url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertEqual(response.json(), {"error": 'Некорректный период "date_from" / "date_to".'})
@@ -0,0 +1,99 @@
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from shop.models import Shop, Category, Product, ProductInfo
+
+
+class PartnerStockTests(APITestCase):
+    """
+    POST /partner/stock/: массовое обновление остатков и цен
+    одним bulk_update, только для предложений своего магазина.
+    """
+
+    def setUp(self):
+        self.partner = User.objects.create_user(username="partner", password="pass12345")
+        self.shop = Shop.objects.create(name="Shop", user=self.partner)
+        self.other_shop = Shop.objects.create(name="Other")
+        category = Category.objects.create(name="Category")
+        product = Product.objects.create(name="Phone", category=category)
+
+        ProductInfo.objects.bulk_create([
+            ProductInfo(product=product, shop=self.shop, external_id=i, quantity=1, price=100)
+            for i in range(1, 1001)
+        ])
+        self.foreign = ProductInfo.objects.create(
+            product=product, shop=self.other_shop, external_id=5000, quantity=1, price=100,
+        )
+
+        self.client.force_authenticate(user=self.partner)
+        self.url = reverse("partner-stock")
+
+    def _post(self, items):
+        return self.client.post(self.url, {"items": items}, format="json")
+
+    def test_updates_counts_and_unknown_ids(self):
+        response = self._post([
+            {"external_id": 1, "quantity": 7, "price": "99.90"},
+            {"external_id": 2, "quantity": 1},
+            {"external_id": 3, "price": 150},
+            {"external_id": 5000, "quantity": 0},  # чужой магазин
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(response.data["unchanged"], 1)
+        self.assertEqual(response.data["unknown_ids"], [5000])
+
+        first = ProductInfo.objects.get(shop=self.shop, external_id=1)
+        self.assertEqual((first.quantity, first.price), (7, Decimal("99.90")))
+        self.assertEqual(ProductInfo.objects.get(shop=self.shop, external_id=3).price, Decimal("150"))
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.quantity, 1)
+
+    def test_query_count_is_batched(self):
+        def queries(items):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self._post(items)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(ctx.captured_queries)
+
+        small = queries([{"external_id": i, "quantity": 2} for i in range(1, 11)])
+        large = queries([{"external_id": i, "quantity": 3} for i in range(1, 1001)])
+
+        # запросы растут только с числом пачек bulk_update / bulk_create истории
+        # (на SQLite пачки ограничены числом параметров), а не с числом строк;
+        # +2 — пометка устаревших снимков каталога (пути категорий и UPDATE версий)
+        self.assertLessEqual(small, 8)
+        self.assertLessEqual(large, 20)
+        self.assertEqual(ProductInfo.objects.filter(shop=self.shop, quantity=3).count(), 1000)
+
+    def test_invalid_row_rejects_whole_request(self):
+        response = self._post([
+            {"external_id": 1, "quantity": 5},
+            {"external_id": 2, "quantity": -1},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ProductInfo.objects.get(shop=self.shop, external_id=1).quantity, 1)
+
+    def test_non_finite_and_oversized_prices_are_rejected(self):
+        for price in ("NaN", "Infinity", "-inf", 1e20, "100000000"):
+            response = self._post([{"external_id": 1, "price": price}])
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, price)
+            self.assertIsInstance(response.data["error"], str)
+        self.assertEqual(ProductInfo.objects.get(shop=self.shop, external_id=1).price, Decimal("100"))
+
+    def test_price_only_rows_do_not_write_quantity(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self._post([{"external_id": 1, "price": "150.00"}])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "shop_productinfo"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"quantity"', updates[0])
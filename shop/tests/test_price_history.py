@@ -0,0 +1,117 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from shop import price_history
+from shop.models import Shop, Category, Product, ProductInfo, PriceHistory
+
+
+class PriceHistoryTests(APITestCase):
+    """
+    История цен: пишется только при изменении, читается по периоду,
+    старые дни сжимаются до одной строки min/max/last.
+    """
+
+    def setUp(self):
+        self.partner = User.objects.create_user(username="partner", password="pass12345")
+        self.shop = Shop.objects.create(name="Shop", user=self.partner)
+        category = Category.objects.create(name="Category")
+        product = Product.objects.create(name="Phone", category=category)
+        self.offer = ProductInfo.objects.create(
+            product=product, shop=self.shop, external_id=1, quantity=5, price=100,
+        )
+
+    def _add(self, recorded_at, price, quantity=1):
+        return PriceHistory.objects.create(
+            product_info=self.offer, shop=self.shop, recorded_at=recorded_at,
+            price=price, price_min=price, price_max=price, quantity=quantity,
+        )
+
+    def test_stock_api_records_only_changes(self):
+        self.client.force_authenticate(user=self.partner)
+        url = reverse("partner-stock")
+
+        self.client.post(url, {"items": [{"external_id": 1, "price": 120}]}, format="json")
+        self.client.post(url, {"items": [{"external_id": 1, "price": 120}]}, format="json")
+        self.client.post(url, {"items": [{"external_id": 1, "quantity": 2}]}, format="json")
+
+        rows = list(PriceHistory.objects.order_by("id").values_list("price", "quantity"))
+        self.assertEqual(rows, [(Decimal("120"), 5), (Decimal("120"), 2)])
+
+        response = self.client.get(reverse("partner-stock-history"), {"external_id": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_record_skips_unchanged(self):
+        previous = {self.offer.id: (self.offer.price, self.offer.quantity)}
+        self.assertEqual(price_history.record([self.offer], previous), 0)
+        self.assertEqual(price_history.record([self.offer], {}), 1)
+
+    def test_record_compares_float_prices_from_import(self):
+        ProductInfo.objects.filter(pk=self.offer.pk).update(price=Decimal("19.99"))
+        self.offer.refresh_from_db()
+        previous = {self.offer.id: (self.offer.price, self.offer.quantity)}
+        # load_yaml_data.py присваивает цену из YAML как есть
+        self.offer.price = 19.99
+        self.assertEqual(price_history.record([self.offer], previous), 0)
+        self.offer.price = 20.5
+        self.assertEqual(price_history.record([self.offer], previous), 1)
+        self.assertEqual(PriceHistory.objects.get().price, Decimal("20.5"))
+
+    def test_reset_stock_is_recorded(self):
+        self.client.force_authenticate(user=self.partner)
+        response = self.client.post(reverse("partner-shop-reset-stock"))
+        self.assertEqual(response.data["updated"], 1)
+
+        rows = list(PriceHistory.objects.values_list("product_info", "price", "quantity"))
+        self.assertEqual(rows, [(self.offer.id, Decimal("100"), 0)])
+        response = self.client.get(reverse("partner-stock-history"), {"external_id": 1})
+        self.assertEqual(response.data["results"][0]["quantity"], 0)
+
+    def test_offer_history_range(self):
+        now = timezone.now()
+        self._add(now - timedelta(days=400), 90)
+        self._add(now - timedelta(days=10), 100)
+        self._add(now - timedelta(days=1), 110)
+
+        date_from = (now - timedelta(days=30)).date().isoformat()
+        response = self.client.get(
+            reverse("products-info-history", args=[self.offer.id]), {"date_from": date_from},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [Decimal(r["price"]) for r in response.data["results"]],
+            [Decimal("110"), Decimal("100")],
+        )
+
+        response = self.client.get(reverse("products-info-history", args=[self.offer.id]), {"date_to": "31.12"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"error": 'Некорректное значение "date_to".'})
+
+    def test_compaction_keeps_daily_min_max_last(self):
+        old_day = timezone.now() - timedelta(days=200)
+        start = old_day.replace(hour=8, minute=0, second=0, microsecond=0)
+        self._add(start, 100, quantity=5)
+        self._add(start + timedelta(hours=1), 80, quantity=4)
+        self._add(start + timedelta(hours=2), 130, quantity=3)
+        last = self._add(start + timedelta(hours=3), 110, quantity=2)
+        recent = self._add(timezone.now() - timedelta(days=1), 120)
+        self._add(timezone.now() - timedelta(days=1000), 50)
+
+        compacted, expired = price_history.compact(raw_days=90, keep_days=730)
+
+        self.assertEqual((compacted, expired), (3, 1))
+        day_row = PriceHistory.objects.get(id=last.id)
+        self.assertEqual(
+            (day_row.price, day_row.price_min, day_row.price_max, day_row.quantity),
+            (Decimal("110"), Decimal("80"), Decimal("130"), 2),
+        )
+        self.assertTrue(PriceHistory.objects.filter(id=recent.id).exists())
+        self.assertEqual(PriceHistory.objects.count(), 2)
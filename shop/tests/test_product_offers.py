@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+from django.urls import reverse
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from shop import active_shops
+from shop.models import Shop, Category, Product, ProductInfo
+
+
+class ProductOffersTests(APITestCase):
+    """
+    Сравнение цен: /products/{id}/offers/ и сводка best_price / offers_count /
+    min_price_shop в списке товаров без запросов на каждый товар.
+    """
+
+    def setUp(self):
+        active_shops.invalidate()
+
+        self.shops = [Shop.objects.create(name=f"Shop {i}") for i in range(3)]
+        self.category = Category.objects.create(name="Phones")
+        self.product = Product.objects.create(name="Phone", category=self.category)
+
+        self.cheap = ProductInfo.objects.create(
+            product=self.product, shop=self.shops[1], external_id=1, quantity=1, price=900,
+        )
+        ProductInfo.objects.create(
+            product=self.product, shop=self.shops[0], external_id=1, quantity=3, price=1000,
+        )
+        # дешевле всех, но нет в наличии — в сводку не попадает
+        ProductInfo.objects.create(
+            product=self.product, shop=self.shops[2], external_id=1, quantity=0, price=500,
+        )
+
+    def test_offers_sorted_by_price(self):
+        url = reverse("product-offers", args=[self.product.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [Decimal(o["price"]) for o in response.data],
+            [Decimal("500"), Decimal("900"), Decimal("1000")],
+        )
+
+        response = self.client.get(url, {"in_stock": "1"})
+        self.assertEqual(len(response.data), 2)
+
+    def test_list_has_price_summary(self):
+        response = self.client.get(reverse("product-list"), {"category_id": self.category.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        row = response.data[0]
+        self.assertEqual(Decimal(row["best_price"]), Decimal("900"))
+        self.assertEqual(row["offers_count"], 2)
+        self.assertEqual(row["min_price_shop"], {"id": self.shops[1].id, "name": "Shop 1"})
+        self.assertEqual(len(row["product_infos"]), 3)
+
+    def test_list_query_count_does_not_grow_with_products(self):
+        for i in range(10):
+            product = Product.objects.create(name=f"Phone {i}", category=self.category)
+            ProductInfo.objects.create(
+                product=product, shop=self.shops[0], external_id=100 + i, quantity=1, price=10,
+            )
+        active_shops.active_shop_ids()
+
+        # товары со сводкой + предложения + параметры предложений
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("product-list"))
+        self.assertEqual(len(response.data), 11)
+
+    def test_summary_skips_inactive_shop(self):
+        self.shops[1].is_active = False
+        self.shops[1].save()
+
+        response = self.client.get(reverse("product-detail", args=[self.product.id]))
+
+        self.assertEqual(Decimal(response.data["best_price"]), Decimal("1000"))
+        self.assertEqual(response.data["offers_count"], 1)
@@ -0,0 +1,147 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from shop import order_archive, recommendations
+from shop.models import (
+    Category,
+    Contact,
+    Order,
+    OrderItem,
+    Product,
+    ProductInfo,
+    ProductInfoCooccurrence,
+    Shop,
+    TaskCheckpoint,
+)
+from shop.tasks import refresh_related_products
+
+
+class CountPairsTests(SimpleTestCase):
+    """Подсчёт совместных покупок по позициям, упорядоченным по заказу."""
+
+    def test_pairs_in_both_directions(self):
+        pairs, orders = recommendations.count_pairs([(1, 10), (1, 20), (1, 30), (2, 10), (2, 20), (3, 10)])
+        self.assertEqual(orders, 3)
+        self.assertEqual(pairs[(10, 20)], 2)
+        self.assertEqual(pairs[(20, 10)], 2)
+        self.assertEqual(pairs[(30, 10)], 1)
+        self.assertNotIn((10, 10), pairs)
+        self.assertEqual(len(pairs), 6)
+
+
+@override_settings(RELATED_PRODUCTS_TOP=2)
+@override_settings(RELATED_PRODUCTS_LAG_SECONDS=0)
+class RelatedProductsTests(APITestCase):
+    """
+    Задача refresh_related_products и /api/v1/products-info/{id}/related/:
+    полный пересчёт, инкрементальные запуски, топ-N и один запрос на чтение.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="buyer", password="pass12345")
+        self.shop = Shop.objects.create(name="Shop")
+        category = Category.objects.create(name="Phones")
+        self.offers = [
+            ProductInfo.objects.create(
+                product=Product.objects.create(name=f"Product {n}", category=category),
+                shop=self.shop, external_id=n, quantity=5, price=100 + n,
+            )
+            for n in range(5)
+        ]
+
+    def _order(self, *indexes, status_value=Order.STATUS_NEW, confirmed=True):
+        order = Order.objects.create(
+            user=self.user, status=status_value, confirmed_at=timezone.now() if confirmed else None,
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product_info=self.offers[i]) for i in indexes
+        )
+        return order
+
+    def _related(self, index):
+        url = reverse("products-info-related", args=[self.offers[index].id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(row["id"], row["orders"]) for row in response.data]
+
+    def test_full_rebuild_then_incremental(self):
+        a, b, c, d, _ = (offer.id for offer in self.offers)
+        self._order(0, 1, 2)
+        self._order(0, 1, confirmed=False)  # оформлен до появления confirmed_at
+        self._order(0, 3, status_value=Order.STATUS_CANCELLED)
+        self._order(0, 3, status_value=Order.STATUS_BASKET, confirmed=False)
+
+        report = refresh_related_products()
+        self.assertEqual(report["orders"], 2)
+        self.assertEqual(self._related(0), [(b, 2), (c, 1)])
+        self.assertEqual(self._related(2), [(a, 1), (b, 1)])
+
+        # новые заказы только прибавляются к матрице, топ пересобирается
+        self._order(0, 3)
+        self._order(0, 3)
+        self._order(0, 3)
+        report = refresh_related_products()
+        self.assertEqual(report["orders"], 3)
+        self.assertEqual(self._related(0), [(d, 3), (b, 2)])
+        self.assertEqual(ProductInfoCooccurrence.objects.get(product_info_id=a, related_id=c).orders, 1)
+
+        # повторный запуск без новых заказов ничего не меняет
+        self.assertEqual(refresh_related_products()["orders"], 0)
+        self.assertEqual(self._related(0), [(d, 3), (b, 2)])
+
+    def test_rebuild_includes_archive(self):
+        order = self._order(0, 4, status_value=Order.STATUS_DELIVERED)
+        order_archive.archive_batch([order.id])
+        recommendations.rebuild()
+        self.assertEqual(self._related(4), [(self.offers[0].id, 1)])
+
+    def test_one_query_and_inactive_shops_hidden(self):
+        other = Shop.objects.create(name="Other")
+        offer = ProductInfo.objects.create(
+            product=self.offers[1].product, shop=other, external_id=1, quantity=5, price=90,
+        )
+        order = self._order(0, 1)
+        OrderItem.objects.create(order=order, product_info=offer)
+        refresh_related_products()
+        self._related(0)  # прогрев кэша active_shops
+
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self._related(0)), 2)
+
+        other.is_active = False
+        other.save()
+        self.assertEqual(self._related(0), [(self.offers[1].id, 1)])
+        self.assertEqual(self._related(3), [])
+
+    def test_confirm_sets_confirmed_at(self):
+        self.client.force_authenticate(self.user)
+        contact = Contact.objects.create(user=self.user, city="Москва", address="ул. 1", phone="+7")
+        self.client.post(reverse("order-basket"), {"items": [{"product_info": self.offers[0].id}]}, format="json")
+        TaskCheckpoint.objects.create(name="related_products", position=timezone.now())
+        with mock.patch("shop.tasks.send_order_emails"):
+            self.client.post(reverse("order-confirm"), {"contact_id": contact.id}, format="json")
+        self.assertIsNotNone(Order.objects.get(user=self.user).confirmed_at)
+        self.assertEqual(refresh_related_products()["orders"], 1)
+
+    @override_settings(RELATED_PRODUCTS_LAG_SECONDS=60)
+    def test_window_lags_behind_uncommitted_confirms(self):
+        now = timezone.now()
+        TaskCheckpoint.objects.create(name="related_products", position=now - timedelta(hours=1))
+        recent = self._order(0, 1)
+        Order.objects.filter(pk=recent.pk).update(confirmed_at=now - timedelta(seconds=10))
+        self._order(0, 2, status_value=Order.STATUS_CANCELLED)
+
+        with mock.patch("shop.tasks.timezone.now", return_value=now):
+            self.assertEqual(refresh_related_products()["orders"], 0)
+        # заказ попадает в следующее окно, отменённый — ни в одно
+        with mock.patch("shop.tasks.timezone.now", return_value=now + timedelta(seconds=120)):
+            self.assertEqual(refresh_related_products()["orders"], 1)
+        self.assertEqual(self._related(0), [(self.offers[1].id, 1)])
@@ -0,0 +1,83 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from shop import schema
+
+
+class SchemaCacheTests(APITestCase):
+    """
+    /api/schema/ отдаёт заранее собранную схему с ETag и не строит её
+    заново на каждый запрос; в DEBUG — живая генерация.
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.schema_dir = Path(tmp.name)
+
+        settings_override = override_settings(OPENAPI_SCHEMA_DIR=tmp.name, DEBUG=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        schema.reset()
+        self.addCleanup(schema.reset)
+        self.url = reverse("schema")
+
+    def test_build_command_writes_versioned_files(self):
+        stale = self.schema_dir / "schema-old.json"
+        stale.write_text("{}")
+
+        call_command("build_openapi_schema", stdout=StringIO())
+
+        names = sorted(p.name for p in self.schema_dir.iterdir())
+        key = schema.fingerprint()
+        self.assertEqual(names, [f"schema-{key}.json", f"schema-{key}.yaml"])
+
+    def test_schema_generated_once_and_served_with_etag(self):
+        with mock.patch.object(schema, "generate", wraps=schema.generate) as generate:
+            first = self.client.get(self.url, HTTP_ACCEPT="application/vnd.oai.openapi+json")
+            second = self.client.get(self.url, HTTP_ACCEPT="application/vnd.oai.openapi+json")
+            yaml = self.client.get(self.url)
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertIn("/api/v1/products-info/", first.json()["paths"])
+        self.assertEqual(first["ETag"], second["ETag"])
+        self.assertTrue(yaml.content.startswith(b"openapi:"))
+        self.assertNotEqual(yaml["ETag"], first["ETag"])
+
+        not_modified = self.client.get(
+            self.url,
+            HTTP_ACCEPT="application/vnd.oai.openapi+json",
+            HTTP_IF_NONE_MATCH=first["ETag"],
+        )
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified.content, b"")
+
+    def test_process_reads_prebuilt_schema_from_disk(self):
+        schema.build()
+        schema.reset()
+
+        with mock.patch.object(schema, "generate") as generate:
+            response = self.client.get(self.url)
+
+        generate.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(DEBUG=True)
+    def test_debug_generates_live(self):
+        with mock.patch.object(schema, "get_document") as get_document:
+            response = self.client.get(self.url)
+
+        get_document.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("ETag", response)
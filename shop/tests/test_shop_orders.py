@@ -0,0 +1,135 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from shop import shop_orders
+from shop.models import Category, Contact, Order, OrderItem, Product, ProductInfo, Shop, ShopOrder
+from shop.tasks import send_order_emails
+
+
+class ShopOrdersTests(APITestCase):
+    """
+    Разбиение заказа на подзаказы магазинов при оформлении:
+    суммы в SQL, фиксированное число запросов, письмо каждому магазину.
+    """
+
+    def setUp(self):
+        self.buyer = User.objects.create_user(username="buyer", password="pass12345", email="buyer@example.com")
+        self.partners = [
+            User.objects.create_user(username=f"partner{n}", password="pass12345", email=f"shop{n}@example.com")
+            for n in range(3)
+        ]
+        self.shops = [Shop.objects.create(name=f"Shop {n}", user=partner) for n, partner in enumerate(self.partners)]
+        category = Category.objects.create(name="Phones")
+        self.offers = [
+            ProductInfo.objects.create(
+                product=Product.objects.create(name=f"Phone {n}", category=category),
+                shop=self.shops[n % 3], external_id=n, quantity=10, price=100 * (n + 1),
+            )
+            for n in range(6)
+        ]
+        self.contact = Contact.objects.create(user=self.buyer, city="Москва", address="Улица", phone="+70000000000")
+
+    def _basket(self, offers):
+        basket = Order.objects.create(user=self.buyer, status=Order.STATUS_BASKET)
+        for n, offer in enumerate(offers):
+            OrderItem.objects.create(order=basket, product_info=offer, quantity=n + 1)
+        return basket
+
+    def test_confirm_splits_basket_by_shop(self):
+        basket = self._basket(self.offers[:5])
+        self.client.force_authenticate(self.buyer)
+        with mock.patch("shop.tasks.send_order_emails"):
+            response = self.client.post(reverse("order-confirm"), {"contact_id": self.contact.id}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        rows = {
+            shop_order.shop_id: (shop_order.items_count, shop_order.total)
+            for shop_order in ShopOrder.objects.filter(order=basket)
+        }
+        # offers 0,3 -> shop 0; 1,4 -> shop 1; 2 -> shop 2 (quantity = позиция + 1)
+        self.assertEqual(rows, {
+            self.shops[0].id: (2, Decimal(100 * 1 + 400 * 4)),
+            self.shops[1].id: (2, Decimal(200 * 2 + 500 * 5)),
+            self.shops[2].id: (1, Decimal(300 * 3)),
+        })
+        for item in OrderItem.objects.filter(order=basket).select_related("shop_order", "product_info"):
+            self.assertEqual(item.shop_order.shop_id, item.product_info.shop_id)
+
+    def test_split_query_count_does_not_grow_with_basket(self):
+        small, large = self._basket(self.offers[:1]), self._basket(self.offers)
+        with CaptureQueriesContext(connection) as captured:
+            shop_orders.split(small)
+        with self.assertNumQueries(len(captured)):
+            shop_orders.split(large)
+        self.assertEqual(ShopOrder.objects.filter(order=large).count(), 3)
+
+    def test_partner_sees_only_own_sub_order(self):
+        basket = self._basket(self.offers[:3])
+        Order.objects.filter(pk=basket.pk).update(status=Order.STATUS_NEW)
+        shop_orders.split(basket)
+
+        self.client.force_authenticate(self.partners[1])
+        response = self.client.get(reverse("partner-orders-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [order] = response.data["results"]
+        self.assertEqual(order["id"], basket.id)
+        self.assertEqual([item["product_info"] for item in order["items"]], [self.offers[1].id])
+        self.assertEqual(Decimal(order["shop_total"]), Decimal(400))
+
+    def test_one_email_per_shop(self):
+        self.partners[2].email = ""
+        self.partners[2].save()
+        basket = self._basket(self.offers)
+        Order.objects.filter(pk=basket.pk).update(status=Order.STATUS_NEW)
+        shop_orders.split(basket)
+
+        send_order_emails(basket.id, self.buyer.id)
+        shop_mail = [message for message in mail.outbox if message.to[0].startswith("shop")]
+        self.assertEqual(sorted(message.to[0] for message in shop_mail), ["shop0@example.com", "shop1@example.com"])
+        first = next(message for message in shop_mail if message.to == ["shop0@example.com"])
+        self.assertIn("Phone 0 × 1", first.body)
+        self.assertIn("Phone 3 × 4", first.body)
+        self.assertNotIn("Phone 1", first.body)
+
+    def test_concurrent_confirm_is_rejected_without_second_split(self):
+        basket = self._basket(self.offers[:2])
+        self.client.force_authenticate(self.buyer)
+        url = reverse("order-confirm")
+
+        def confirmed_meanwhile():
+            # другой запрос успел оформить корзину между проверками и блокировкой
+            Order.objects.filter(pk=basket.pk).update(status=Order.STATUS_NEW)
+            shop_orders.split(basket)
+            return frozenset()
+
+        with mock.patch("shop.tasks.send_order_emails") as task, \
+                mock.patch("shop.active_shops.inactive_shop_ids", side_effect=confirmed_meanwhile):
+            response = self.client.post(url, {"contact_id": self.contact.id}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {"error": "Корзина уже оформлена."})
+        task.delay.assert_not_called()
+        self.assertEqual(ShopOrder.objects.filter(order=basket).count(), 2)
+
+    def test_items_removed_before_lock_roll_back_confirm(self):
+        basket = self._basket(self.offers[:2])
+        self.client.force_authenticate(self.buyer)
+
+        def emptied_meanwhile():
+            OrderItem.objects.filter(order=basket).delete()
+            return frozenset()
+
+        with mock.patch("shop.tasks.send_order_emails"), \
+                mock.patch("shop.active_shops.inactive_shop_ids", side_effect=emptied_meanwhile):
+            response = self.client.post(reverse("order-confirm"), {"contact_id": self.contact.id}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        basket.refresh_from_db()
+        self.assertEqual(basket.status, Order.STATUS_BASKET)
@@ -0,0 +1,50 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+
+class SQLiteProfileTests(SimpleTestCase):
+    """
+    Профиль SQLite (shop/sqlite.py) применяется к каждому новому соединению
+    через connection_created; транзакции начинаются с BEGIN IMMEDIATE.
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "db.sqlite3")
+
+    def _pragmas(self):
+        wrapper = DatabaseWrapper({**connection.settings_dict, "NAME": self.path}, alias="sqlite_profile")
+        try:
+            with wrapper.cursor() as cursor:
+                values = {}
+                for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size"):
+                    cursor.execute(f"PRAGMA {name}")
+                    values[name] = cursor.fetchone()[0]
+                return values
+        finally:
+            wrapper.close()
+
+    def test_new_connection_gets_profile(self):
+        self.assertEqual(
+            self._pragmas(),
+            {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000, "cache_size": -32000},
+        )
+        self.assertEqual(connection.settings_dict["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+
+    @override_settings(SQLITE_TUNING=False)
+    def test_profile_can_be_disabled(self):
+        self.assertEqual(self._pragmas()["journal_mode"], "delete")
+
+    def test_benchmark_tuned_profile_has_no_lock_errors(self):
+        out = StringIO()
+        call_command(
+            "bench_sqlite_writes", threads=4, transactions=20, profile=["tuned"], stdout=out,
+        )
+        self.assertIn("транзакций 80/80, 'database is locked' 0", out.getvalue())
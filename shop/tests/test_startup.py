@@ -0,0 +1,42 @@
+from django.test import SimpleTestCase
+
+from shop import importtime
+
+# бюджет времени импорта на холодном старте, мс: примерно вдвое выше
+# замеров `manage.py importtime`, чтобы не зависеть от шума на CI
+IMPORT_BUDGET_MS = {
+    'web': 1500,
+    'worker': 800,
+    'import': 800,
+}
+
+WEB_ONLY_PACKAGES = ('baton', 'drf_spectacular', 'social_django', 'social_core', 'django.contrib.admin')
+
+
+class StartupImportTests(SimpleTestCase):
+    """
+    Холодный старт процессов по ролям: воркер и импорт не загружают
+    веб-подсистемы и укладываются в бюджет времени импорта.
+    """
+
+    def test_roles_fit_import_budget(self):
+        for role, budget in IMPORT_BUDGET_MS.items():
+            with self.subTest(role=role):
+                report = importtime.profile(role)
+                self.assertLess(report.total_ms, budget)
+
+    def test_worker_and_import_skip_web_only_subsystems(self):
+        for role in ('worker', 'import'):
+            report = importtime.profile(role)
+            with self.subTest(role=role):
+                self.assertEqual(
+                    [package for package in WEB_ONLY_PACKAGES if report.imported(package)], [],
+                )
+
+    def test_parse_importtime_output(self):
+        modules = importtime.parse(
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   celery.local\n"
+            "import time:       300 |        420 | celery\n"
+        )
+        self.assertEqual(modules, {"celery.local": (120, 120), "celery": (300, 420)})
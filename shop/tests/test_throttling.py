@@ -1,7 +1,15 @@
-from django.urls import reverse
-from rest_framework import status
-from rest_framework.test import APITestCase
+import threading
 import uuid
+from unittest.mock import patch
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status, throttling
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from shop.throttling import LocMemRateLimitBackend, ScopedRateThrottle, get_backend
 
 
 class RegisterThrottlingTestCase(APITestCase):
@@ -12,6 +20,7 @@ class RegisterThrottlingTestCase(APITestCase):
 
     def setUp(self):
         self.url = reverse('register')
+        get_backend().clear()
 
     def _build_payload(self):
         """
@@ -55,4 +64,77 @@ class RegisterThrottlingTestCase(APITestCase):
             response.status_code,
             status.HTTP_429_TOO_MANY_REQUESTS,
             "Ожидали 429 Too Many Requests при превышении лимита регистрации",
-        )
\ No newline at end of file
+        )
+
+class SharedThrottleBackendTestCase(SimpleTestCase):
+    """
+    GCRA-счётчики (shop/throttling.py): лимит общий для всех воркеров,
+    проверка атомарна, на ключ хранится одно значение.
+    """
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = type('View', (), {'throttle_scope': 'register'})()
+        LocMemRateLimitBackend('shared').clear()
+
+    def _request(self):
+        request = self.factory.post('/api/v1/auth/register/')
+        request.user = AnonymousUser()
+        return request
+
+    def _hits(self, throttle_cls, backends, rounds):
+        """Запросы по кругу через несколько "воркеров" со своим бэкендом у каждого."""
+        allowed = 0
+        for _ in range(rounds):
+            for backend in backends:
+                with patch('shop.throttling.get_backend', return_value=backend):
+                    allowed += throttle_cls().allow_request(self._request(), self.view)
+        return allowed
+
+    def test_limit_holds_across_workers(self):
+        # 4 воркера, у каждого свой экземпляр бэкенда, хранилище общее
+        workers = [LocMemRateLimitBackend('shared') for _ in range(4)]
+        self.assertEqual(self._hits(ScopedRateThrottle, workers, rounds=5), 5)
+
+    def test_drf_locmem_throttle_multiplies_limit(self):
+        # для сравнения: стандартный DRF с локальным кэшем в каждом воркере
+        workers = [LocMemCache(f'worker-{i}', {}) for i in range(4)]
+        allowed = 0
+        for _ in range(5):
+            for cache in workers:
+                throttle = throttling.ScopedRateThrottle()
+                throttle.cache = cache
+                allowed += throttle.allow_request(self._request(), self.view)
+        self.assertEqual(allowed, 20)
+
+    def test_concurrent_hits_are_atomic(self):
+        backend = LocMemRateLimitBackend('shared')
+        results = []
+
+        def worker():
+            for _ in range(25):
+                results.append(backend.hit('key', 50, 60)[0])
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sum(results), 50)
+        self.assertEqual(len(backend._store), 1)
+
+    def test_tokens_refill_over_time(self):
+        backend = LocMemRateLimitBackend('shared')
+        now = [1000.0]
+        backend.timer = lambda: now[0]
+
+        for _ in range(5):
+            self.assertTrue(backend.hit('key', 5, 3600)[0])
+        allowed, wait = backend.hit('key', 5, 3600)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 720)
+
+        now[0] += 720
+        self.assertTrue(backend.hit('key', 5, 3600)[0])
+        self.assertFalse(backend.hit('key', 5, 3600)[0])
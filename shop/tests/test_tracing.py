@@ -0,0 +1,133 @@
+import json
+import os
+from functools import partial
+from unittest import mock
+
+import sentry_sdk
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.wsgi import get_wsgi_application
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+from sentry_sdk.transport import Transport
+
+from config.celery import app as celery_app
+from config.sentry import sentry_options, trace_rates, traces_sampler
+from shop.models import Category, Contact, Product, ProductInfo, Shop
+
+RATES = {"off": 0.0, "default": 0.1, "checkout": 1.0, "catalog": 0.01, "task": 0.05}
+
+
+class RecordingTransport(Transport):
+    """Транспорт Sentry, который складывает транзакции в список вместо отправки."""
+
+    def __init__(self, options=None):
+        super().__init__(options)
+        self.transactions = []
+
+    def capture_envelope(self, envelope):
+        for item in envelope.items:
+            if item.type == "transaction":
+                self.transactions.append(item.payload.json)
+
+
+class TracesSamplerTests(SimpleTestCase):
+    """config.sentry.traces_sampler: частота по пути запроса, решение родителя сохраняется."""
+
+    def _rate(self, path):
+        return traces_sampler({"wsgi_environ": {"PATH_INFO": path}}, RATES)
+
+    def test_rates_by_endpoint(self):
+        self.assertEqual(self._rate("/api/v1/orders/confirm/"), 1.0)
+        self.assertEqual(self._rate("/api/v1/products-info/"), 0.01)
+        self.assertEqual(self._rate("/api/v1/categories/"), 0.01)
+        self.assertEqual(self._rate("/api/v1/bench/cache/"), 0.0)
+        self.assertEqual(self._rate("/api/schema/swagger/"), 0.0)
+        self.assertEqual(self._rate("/api/v1/orders/history/"), 0.1)
+        self.assertEqual(self._rate("/api/v1/orders/basket/"), 0.1)
+
+    def test_parent_decision_and_tasks(self):
+        self.assertEqual(traces_sampler({"parent_sampled": True, "wsgi_environ": {"PATH_INFO": "/api/v1/shops/"}}, RATES), 1.0)
+        # служебные пути не трассируются даже с входящим sentry-trace
+        self.assertEqual(traces_sampler({"parent_sampled": True, "wsgi_environ": {"PATH_INFO": "/api/schema/"}}, RATES), 0.0)
+        self.assertEqual(traces_sampler({"parent_sampled": True, "wsgi_environ": {"PATH_INFO": "/metrics"}}, RATES), 0.0)
+        self.assertEqual(traces_sampler({"parent_sampled": False, "celery_job": {"task": "x"}}, RATES), 0.0)
+        self.assertEqual(traces_sampler({"celery_job": {"task": "shop.tasks.archive_orders"}}, RATES), 0.05)
+
+    def test_rates_from_env(self):
+        env = {"SENTRY_TRACES_SAMPLE_RATE": "0.2", "SENTRY_TRACES_CHECKOUT_RATE": "oops"}
+        with mock.patch.dict(os.environ, env):
+            rates = trace_rates()
+        self.assertEqual(rates["default"], 0.2)
+        self.assertEqual(rates["checkout"], 1.0)
+        self.assertEqual(rates["catalog"], 0.01)
+
+
+@override_settings(EMAIL_HOST="localhost", EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class CheckoutTracingTests(APITestCase):
+    """
+    Сквозная трасса оформления заказа с транспортом-заглушкой: span'ы
+    корзины и оформления в транзакции запроса, задача писем — в той же трассе.
+    """
+
+    def setUp(self):
+        self.transport = RecordingTransport()
+        options = sentry_options("https://public@sentry.invalid/1")
+        # корзина идёт по частоте "default" — в тесте трассируется всё, кроме "off"
+        options["traces_sampler"] = partial(traces_sampler, rates={**RATES, "default": 1.0})
+        sentry_sdk.init(transport=self.transport, **options)
+        self.addCleanup(sentry_sdk.init)
+
+        eager = celery_app.conf.task_always_eager
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, "task_always_eager", eager)
+
+        self.user = User.objects.create_user(username="buyer", password="pass12345", email="b@example.com")
+        self.token = str(AccessToken.for_user(self.user))
+        self.app = get_wsgi_application()
+        shop = Shop.objects.create(name="Shop")
+        product = Product.objects.create(name="Phone", category=Category.objects.create(name="Phones"))
+        self.offer = ProductInfo.objects.create(product=product, shop=shop, external_id=1, quantity=5, price=100)
+        self.contact = Contact.objects.create(user=self.user, city="Москва", address="ул. 1", phone="+7")
+
+    def _call(self, method, path, payload=None):
+        """
+        Запрос через WSGI-приложение: транзакции Sentry открывает обёртка
+        WSGIHandler, тестовый клиент Django её обходит.
+        """
+        factory, headers = RequestFactory(), {"HTTP_AUTHORIZATION": f"Bearer {self.token}"}
+        if method == "get":
+            environ = factory.get(path, **headers).environ
+        else:
+            environ = factory.post(path, json.dumps(payload), content_type="application/json", **headers).environ
+        statuses = []
+        body = b"".join(self.app(environ, lambda status, headers, *args: statuses.append(status)))
+        return int(statuses[0].split()[0]), body
+
+    def _transaction(self, name):
+        return next(t for t in self.transport.transactions if t["transaction"] == name)
+
+    def test_confirm_trace_reaches_celery_task(self):
+        self._call("post", reverse("order-basket"), {"items": [{"product_info": self.offer.id}]})
+        code, _ = self._call("post", reverse("order-confirm"), {"contact_id": self.contact.id})
+        self.assertEqual(code, 200)
+        self.assertEqual(len(mail.outbox), 1)
+        sentry_sdk.flush()
+
+        basket = self._transaction("/api/v1/orders/basket/")
+        self.assertIn("basket.mutate", {span["op"] for span in basket["spans"]})
+
+        confirm = self._transaction("/api/v1/orders/confirm/")
+        ops = {span["op"] for span in confirm["spans"]}
+        self.assertTrue({"order.check_availability", "order.place", "serialize"} <= ops)
+
+        task = self._transaction("shop.tasks.send_order_emails")
+        self.assertEqual(task["contexts"]["trace"]["trace_id"], confirm["contexts"]["trace"]["trace_id"])
+        self.assertTrue({"task.load", "email.send"} <= {span["op"] for span in task["spans"]})
+
+    def test_bench_is_not_traced(self):
+        self._call("get", reverse("bench-cache"))
+        sentry_sdk.flush()
+        self.assertEqual(self.transport.transactions, [])
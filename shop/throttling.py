@@ -0,0 +1,169 @@
+"""
+Throttle-классы DRF с общим для всех воркеров хранилищем счётчиков.
+
+Стандартные throttle-классы DRF хранят в кэше список временных меток
+каждого запроса и переписывают его целиком на каждой проверке; при
+CACHES по умолчанию (locmem) у каждого gunicorn-воркера свои счётчики,
+и фактический лимит умножается на число воркеров.
+
+Здесь используется GCRA (generic cell rate algorithm, эквивалент token
+bucket): на ключ хранится одно число — "теоретическое время прибытия"
+следующего запроса, проверка и обновление делаются атомарно за одно
+обращение к хранилищу (Lua-скрипт в Redis).
+
+Хранилище выбирается настройкой THROTTLE_BACKEND:
+- shop.throttling.RedisRateLimitBackend  — общий Redis (по умолчанию при REDIS_URL);
+- shop.throttling.LocMemRateLimitBackend — память процесса (разработка без
+  Redis, тесты — shop/tests/runner.py, нагрузочный тест).
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework import throttling
+
+logger = logging.getLogger(__name__)
+
+
+def _gcra(tat, now, limit, period):
+    """
+    Один шаг GCRA. Возвращает (разрешён ли запрос, новое tat, сколько ждать).
+
+    За период period пропускается не больше limit запросов; после исчерпания
+    "ведра" запросы снова разрешаются по одному раз в period / limit секунд.
+    """
+    interval = period / limit
+    tat = max(tat if tat is not None else now, now)
+    new_tat = tat + interval
+    allow_at = new_tat - period
+    if allow_at > now:
+        return False, tat, allow_at - now
+    return True, new_tat, 0.0
+
+
+class LocMemRateLimitBackend:
+    """
+    Счётчики в памяти процесса. Экземпляры с одинаковым name делят хранилище
+    (как LocMemCache с одинаковым LOCATION).
+    """
+    _stores = {}
+    _stores_lock = threading.Lock()
+    timer = staticmethod(time.time)
+    # при таком числе ключей из хранилища выбрасываются истёкшие
+    max_entries = 10000
+
+    def __init__(self, name='default'):
+        with self._stores_lock:
+            self._store, self._lock = self._stores.setdefault(name, ({}, threading.Lock()))
+
+    def hit(self, key, limit, period):
+        now = self.timer()
+        with self._lock:
+            allowed, tat, wait = _gcra(self._store.get(key), now, limit, period)
+            if allowed:
+                self._store[key] = tat
+                if len(self._store) > self.max_entries:
+                    self._prune(now)
+            return allowed, wait
+
+    def _prune(self, now):
+        for stale in [k for k, tat in self._store.items() if tat <= now]:
+            del self._store[stale]
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+
+
+class RedisRateLimitBackend:
+    """
+    Счётчики в Redis: один EVALSHA на проверку, один ключ со сроком жизни на клиента.
+    Время берётся из Redis (TIME), чтобы часы воркеров не влияли на лимиты.
+    Если Redis недоступен, запрос пропускается (fail-open) с записью в лог.
+    """
+    SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local interval = period / limit
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if tat == nil or tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if allow_at > now then
+    return {0, tostring(allow_at - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, '0'}
+"""
+
+    def __init__(self, url=None):
+        import redis  # только для этого backend-а
+
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(url or settings.THROTTLE_REDIS_URL)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def hit(self, key, limit, period):
+        try:
+            allowed, wait = self._script(keys=[f'throttle:{key}'], args=[limit, period])
+        except self._errors:
+            logger.warning('Rate limit backend unavailable, request allowed', exc_info=True)
+            return True, 0.0
+        return bool(allowed), float(wait)
+
+
+_backend = None
+_backend_path = None
+
+
+def get_backend():
+    global _backend, _backend_path
+    if _backend is None or _backend_path != settings.THROTTLE_BACKEND:
+        _backend_path = settings.THROTTLE_BACKEND
+        _backend = import_string(_backend_path)()
+    return _backend
+
+
+class SharedRateThrottleMixin:
+    """
+    Заменяет алгоритм SimpleRateThrottle (список меток в кэше) на GCRA
+    в общем хранилище. Ключи и лимиты берутся как у исходных классов DRF.
+    """
+    _wait = None
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        allowed, self._wait = get_backend().hit(self.key, self.num_requests, self.duration)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class AnonRateThrottle(SharedRateThrottleMixin, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(SharedRateThrottleMixin, throttling.UserRateThrottle):
+    pass
+
+
+class ScopedRateThrottle(SharedRateThrottleMixin, throttling.ScopedRateThrottle):
+    def allow_request(self, request, view):
+        # как в DRF: лимит определяется throttle_scope конкретного view
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
@@ -0,0 +1,23 @@
+"""
+Собственные span'ы Sentry для горячих путей (config/sentry.py).
+
+Пока Sentry не подключён (нет SENTRY_DSN), sentry_sdk даже не
+импортируется, а span() возвращает пустой контекстный менеджер.
+"""
+import sys
+from contextlib import nullcontext
+
+
+def span(op, name=None):
+    """with span("basket.mutate", "POST"): ... — дочерний span текущей трассы."""
+    sdk = sys.modules.get("sentry_sdk")
+    if sdk is None or not sdk.get_client().is_active():
+        return nullcontext()
+    return sdk.start_span(op=op, name=name)
+
+
+def serialize(serializer):
+    """serializer.data внутри span serialize с именем класса сериализатора."""
+    name = type(getattr(serializer, "child", serializer)).__name__
+    with span("serialize", name):
+        return serializer.data
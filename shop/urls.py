@@ -7,6 +7,12 @@ from .views import (
     ProductViewSet,
     OrderViewSet,
     ContactViewSet,
+    PartnerOrderViewSet,
+    PartnerShopViewSet,
+    PartnerStockView,
+    PartnerStockHistoryView,
+    ProductInfoHistoryView,
+    ProductInfoRelatedView,
 )
 
 from .views import SentryDebugAPIView
@@ -18,9 +24,23 @@ router.register(r'categories', CategoryViewSet)
 router.register(r'products', ProductViewSet)
 router.register(r'orders', OrderViewSet)
 router.register(r'contacts', ContactViewSet, basename='contacts')
+router.register(r'partner/orders', PartnerOrderViewSet, basename='partner-orders')
+router.register(r'partner/shop', PartnerShopViewSet, basename='partner-shop')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('partner/stock/', PartnerStockView.as_view(), name='partner-stock'),
+    path('partner/stock/history/', PartnerStockHistoryView.as_view(), name='partner-stock-history'),
+    path(
+        'products-info/<int:pk>/history/',
+        ProductInfoHistoryView.as_view(),
+        name='products-info-history',
+    ),
+    path(
+        'products-info/<int:pk>/related/',
+        ProductInfoRelatedView.as_view(),
+        name='products-info-related',
+    ),
     path("debug/sentry/", SentryDebugAPIView.as_view(), name="debug-sentry"),
     path("bench/cache/", CacheBenchmarkView.as_view(), name="bench-cache"),
 ]
\ No newline at end of file
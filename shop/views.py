@@ -1,44 +1,153 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, OuterRef, Prefetch, Subquery
+from django.http import Http404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 
 from rest_framework import viewsets, permissions, generics, status
 from rest_framework.decorators import action
-from rest_framework.generics import ListAPIView
+from rest_framework.exceptions import APIException, ErrorDetail, PermissionDenied, ValidationError
+from rest_framework.generics import ListAPIView, get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
-from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.views import APIView
 
-from .tasks import send_order_emails
-from .models import Shop, Category, Product, Order, Contact, ProductInfo, OrderItem
+from . import (
+    active_shops, analytics, catalog_cache, catalog_snapshots, category_counts, metrics, price_history,
+    shop_orders, tracing,
+)
+from .models import (
+    Shop, Category, Product, Order, Contact, ProductInfo, OrderItem, PriceHistory,
+    ProductParameter, ArchivedOrder, RelatedProductInfo, parse_number,
+)
+from .pagination import KeysetPagination, PriceHistoryPagination
+from .throttling import ScopedRateThrottle
 from .serializers import (
     ShopSerializer,
     CategorySerializer,
     ProductReadSerializer,
     ProductWriteSerializer,
     OrderSerializer,
+    OrderSummarySerializer,
+    ArchivedOrderSerializer,
+    PartnerOrderSerializer,
+    PartnerShopSerializer,
+    PriceHistorySerializer,
     ContactSerializer,
     RegisterSerializer,
     ProductInfoSerializer,
+    RelatedProductInfoSerializer,
 )
 
 
+class InvalidQueryParam(APIException):
+    """
+    400 {"error": "Некорректное значение \"<name>\"."} для query-параметра.
+    detail задаётся словарём со строкой, поэтому тело ответа не зависит от того,
+    как ValidationError разворачивает сообщения в списки.
+    """
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_code = 'invalid'
+
+    def __init__(self, name):
+        self.detail = {'error': ErrorDetail(f'Некорректное значение "{name}".', code=self.default_code)}
+
+
+def catalog_offers():
+    """
+    Товарные предложения для выдачи каталога: со связанными product/shop/category,
+    параметрами и без магазинов, которые не принимают заказы.
+
+    Отключённые магазины берутся из кэша active_shops, поэтому фильтр —
+    это shop_id NOT IN (...) без JOIN, а при отсутствии таких магазинов
+    запрос вообще не меняется.
+    """
+    qs = ProductInfo.objects.select_related(
+        'product',
+        'shop',
+        'product__category',
+    ).prefetch_related(
+        'parameters',
+    )
+    inactive = active_shops.inactive_shop_ids()
+    if inactive:
+        qs = qs.exclude(shop_id__in=inactive)
+    return qs
+
+
+def _filter_category_subtree(qs, category_id, prefix='category__'):
+    """
+    ?category_id= — категория вместе с подкатегориями: путь категории
+    берётся по pk, товары отбираются префиксом по индексу Category.path.
+    """
+    try:
+        category_id = int(category_id)
+    except (TypeError, ValueError):
+        raise InvalidQueryParam('category_id')
+    path = Category.objects.filter(pk=category_id).values_list('path', flat=True).first()
+    if path is None:
+        return qs.none()
+    return qs.filter(**Category.subtree_lookup(path, prefix=prefix))
+
+
+class TracedListMixin:
+    """
+    list() как в ListModelMixin, но строки выбираются до сериализации,
+    а сама сериализация идёт в span serialize (shop/tracing.py).
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        data = tracing.serialize(self.get_serializer(rows, many=True))
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
 class ShopViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Shop.objects.all()
     serializer_class = ShopSerializer
     permission_classes = [AllowAny]
 
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Category.objects.all()
+    """
+    Дерево категорий: parent, path и счётчики предложений
+    (offers_count — в самой категории, subtree_offers_count — с подкатегориями).
+    Список упорядочен по пути — родитель перед потомками.
+    """
+    queryset = Category.objects.prefetch_related('shops').order_by('path')
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(TracedListMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
 
+    def get_queryset(self):
+        qs = Product.objects.all()
+        if self.action in ("list", "retrieve"):
+            # сводка "от X ₽ в N магазинах" — подзапросами в том же SQL,
+            # предложения всех товаров страницы — одним prefetch
+            qs = qs.with_price_summary(
+                exclude_shop_ids=active_shops.inactive_shop_ids(),
+            ).prefetch_related(
+                Prefetch('infos', queryset=catalog_offers(), to_attr='active_infos')
+            )
+            category_id = self.request.query_params.get('category_id')
+            if category_id:
+                qs = _filter_category_subtree(qs, category_id)
+        return qs
+
     def get_permissions(self):
         # чтение — всем
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "offers"):
             return [AllowAny()]
         # запись/изменение — только админ
         return [IsAdminUser()]
@@ -47,21 +156,110 @@ class ProductViewSet(viewsets.ModelViewSet):
         # GET
         if self.action in ("list", "retrieve"):
             return ProductReadSerializer
+        if self.action == "offers":
+            return ProductInfoSerializer
         # POST/PUT/PATCH
         return ProductWriteSerializer
 
+    @action(detail=True, methods=['get'], url_path='offers')
+    def offers(self, request, *args, **kwargs):
+        """
+        Сравнение цен: предложения товара во всех магазинах, от дешёвых к дорогим.
+
+        GET /api/v1/products/{id}/offers/
+        GET /api/v1/products/{id}/offers/?in_stock=1   — только в наличии
+        """
+        product = self.get_object()
+        qs = catalog_offers().filter(product=product).order_by('price', 'id')
+        if request.query_params.get('in_stock') in ('1', 'true', 'True', 'yes', 'on'):
+            qs = qs.filter(quantity__gt=0)
+        serializer = self.get_serializer(qs, many=True)
+        return Response(serializer.data)
+
 class OrderViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = OrderSerializer
     queryset = Order.objects.all()   # ← ДОБАВИТЬ ЭТО
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).order_by('-created_at')
+        qs = Order.objects.filter(user=self.request.user)
+        if self.action == 'history':
+            # корзина — не заказ, в историю не попадает
+            return qs.exclude(status=Order.STATUS_BASKET).with_summary()
+        return qs.with_items().order_by('-created_at')
 
     def perform_create(self, serializer):
         # user проставляем автоматически
         serializer.save(user=self.request.user)
 
+    def retrieve(self, request, *args, **kwargs):
+        """Заказ по id; перенесённый в архив (shop/order_archive.py) отдаётся из архива."""
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            archived = get_object_or_404(
+                ArchivedOrder.objects.prefetch_related('items'), user=request.user, pk=kwargs['pk'],
+            )
+            return Response(ArchivedOrderSerializer(archived).data)
+
+    def _order_data(self, order):
+        """Сериализует заказ, подгрузив позиции одним prefetch."""
+        order = Order.objects.with_items().get(pk=order.pk)
+        return tracing.serialize(OrderSerializer(order))
+
+    @staticmethod
+    def _empty_basket_data(user):
+        """Ответ GET /basket/ для пользователя без корзины (в формате OrderSerializer)."""
+        return {
+            'id': None,
+            'user': user.pk,
+            'status': Order.STATUS_BASKET,
+            'contact': None,
+            'ordered_items': [],
+            'total_sum': 0,
+            'created_at': None,
+            'updated_at': None,
+        }
+
+    @staticmethod
+    def _touch_basket(basket):
+        """
+        updated_at корзины — время последнего изменения позиций:
+        по нему shop/baskets.py находит брошенные корзины.
+        """
+        Order.objects.filter(pk=basket.pk).update(updated_at=timezone.now())
+
+    # ---------- ИСТОРИЯ ЗАКАЗОВ ----------
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path='history',
+        serializer_class=OrderSummarySerializer,
+        pagination_class=KeysetPagination,
+    )
+    def history(self, request, *args, **kwargs):
+        """
+        История заказов текущего пользователя (без корзины), от новых к старым.
+
+        GET /api/v1/orders/history/
+
+        Query-параметры:
+        - ?status=new,sent            — один или несколько статусов через запятую
+        - ?created_from=2025-01-01    — дата/время создания "от" (включительно)
+        - ?created_to=2025-01-31      — дата/время создания "до" (включительно)
+        - ?page_size=50&cursor=...    — keyset-пагинация, cursor берётся из "next"
+
+        Каждая строка — id, статус, число позиций и сумма (считаются в SQL).
+        Полный состав заказа: GET /api/v1/orders/{id}/
+        Старые доставленные и отменённые заказы читаются из архива
+        (ArchivedOrder) и вклеиваются в ту же ленту.
+        """
+        qs = _filter_orders(self.get_queryset(), request.query_params)
+        archived = _filter_orders(ArchivedOrder.objects.filter(user=request.user), request.query_params)
+        page = self.paginate_queryset([qs, archived])
+        return self.get_paginated_response(tracing.serialize(self.get_serializer(page, many=True)))
+
     # ---------- КОРЗИНА ----------
 
     @action(detail=False, methods=['get', 'post', 'delete'], url_path='basket')
@@ -75,16 +273,18 @@ class OrderViewSet(viewsets.ModelViewSet):
         """
         user = request.user
 
-        # Получаем или создаём заказ в статусе 'basket'
-        basket, _ = Order.objects.get_or_create(
-            user=user,
-            status='basket',
-        )
+        # корзина создаётся только при добавлении товара: GET и DELETE
+        # без корзины отвечают пустой корзиной, не записывая строку в Order;
+        # POST читает корзину сам, под блокировкой
+        basket = None
+        if request.method != 'POST':
+            basket = Order.objects.filter(user=user, status=Order.STATUS_BASKET).first()
 
         # ---------- GET: показать корзину ----------
         if request.method == 'GET':
-            serializer = OrderSerializer(basket)
-            return Response(serializer.data)
+            if basket is None:
+                return Response(self._empty_basket_data(user))
+            return Response(self._order_data(basket))
 
         # ---------- POST: добавить / обновить позиции ----------
         if request.method == 'POST':
@@ -104,45 +304,58 @@ class OrderViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            for item in items_data:
-                product_info_id = item.get('product_info')
-                quantity = int(item.get('quantity', 1))
-
-                if not product_info_id:
-                    return Response(
-                        {'error': 'Для каждой позиции нужно указать "product_info".'},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                try:
-                    product_info = ProductInfo.objects.get(id=product_info_id)
-                except ProductInfo.DoesNotExist:
-                    return Response(
-                        {'error': f'ProductInfo с id={product_info_id} не найден.'},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                if quantity <= 0:
-                    # 0 или меньше — удаляем позицию
-                    OrderItem.objects.filter(
+            with tracing.span("basket.mutate", "add"), transaction.atomic():
+                # строка корзины блокируется, как в confirm: позиция не добавится
+                # в корзину, которую в этот момент оформляют (и делят на подзаказы)
+                basket = Order.objects.select_for_update().filter(user=user, status=Order.STATUS_BASKET).first()
+                if basket is None:
+                    basket, _ = Order.objects.get_or_create(user=user, status=Order.STATUS_BASKET)
+
+                for item in items_data:
+                    product_info_id = item.get('product_info')
+                    quantity = int(item.get('quantity', 1))
+
+                    if not product_info_id:
+                        return Response(
+                            {'error': 'Для каждой позиции нужно указать "product_info".'},
+                            status=status.HTTP_400_BAD_REQUEST,
+                        )
+
+                    try:
+                        product_info = ProductInfo.objects.get(id=product_info_id)
+                    except ProductInfo.DoesNotExist:
+                        return Response(
+                            {'error': f'ProductInfo с id={product_info_id} не найден.'},
+                            status=status.HTTP_400_BAD_REQUEST,
+                        )
+
+                    if quantity > 0 and not active_shops.is_shop_active(product_info.shop_id):
+                        return Response(
+                            {'error': f'Магазин товара id={product_info_id} сейчас не принимает заказы.'},
+                            status=status.HTTP_400_BAD_REQUEST,
+                        )
+
+                    if quantity <= 0:
+                        # 0 или меньше — удаляем позицию
+                        OrderItem.objects.filter(
+                            order=basket,
+                            product_info=product_info
+                        ).delete()
+                        continue
+
+                    # создаём или обновляем позицию
+                    order_item, created = OrderItem.objects.get_or_create(
                         order=basket,
-                        product_info=product_info
-                    ).delete()
-                    continue
-
-                # создаём или обновляем позицию
-                order_item, created = OrderItem.objects.get_or_create(
-                    order=basket,
-                    product_info=product_info,
-                    defaults={'quantity': quantity},
-                )
-                if not created and order_item.quantity != quantity:
-                    order_item.quantity = quantity
-                    order_item.save()
+                        product_info=product_info,
+                        defaults={'quantity': quantity},
+                    )
+                    if not created and order_item.quantity != quantity:
+                        order_item.quantity = quantity
+                        order_item.save()
 
-            basket.refresh_from_db()
-            serializer = OrderSerializer(basket)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+                self._touch_basket(basket)
+            metrics.BASKET_MUTATIONS.labels('add').inc()
+            return Response(self._order_data(basket), status=status.HTTP_200_OK)
 
         # ---------- DELETE: удалить позиции ----------
         if request.method == 'DELETE':
@@ -159,14 +372,23 @@ class OrderViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            OrderItem.objects.filter(
-                order=basket,
-                product_info_id__in=items_ids,
-            ).delete()
-
-            basket.refresh_from_db()
-            serializer = OrderSerializer(basket)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            if basket is None:
+                return Response(self._empty_basket_data(user), status=status.HTTP_200_OK)
+
+            with tracing.span("basket.mutate", "remove"), transaction.atomic():
+                basket = Order.objects.select_for_update().filter(
+                    pk=basket.pk, status=Order.STATUS_BASKET,
+                ).first()
+                if basket is None:
+                    # корзину только что оформили
+                    return Response(self._empty_basket_data(user), status=status.HTTP_200_OK)
+                OrderItem.objects.filter(
+                    order=basket,
+                    product_info_id__in=items_ids,
+                ).delete()
+                self._touch_basket(basket)
+            metrics.BASKET_MUTATIONS.labels('remove').inc()
+            return Response(self._order_data(basket), status=status.HTTP_200_OK)
 
     # ---------- ПОДТВЕРЖДЕНИЕ ЗАКАЗА ----------
 
@@ -188,6 +410,7 @@ class OrderViewSet(viewsets.ModelViewSet):
         try:
             basket = Order.objects.get(user=user, status='basket')
         except Order.DoesNotExist:
+            metrics.ORDERS_REJECTED.labels('empty_basket').inc()
             return Response(
                 {'error': 'Корзина пуста.'},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -195,13 +418,28 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         # проверяем, что в корзине есть позиции
         if not basket.ordered_items.exists():
+            metrics.ORDERS_REJECTED.labels('empty_basket').inc()
             return Response(
                 {'error': 'Нельзя оформить заказ с пустой корзиной.'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        # магазин мог отключиться, пока товар лежал в корзине
+        inactive = active_shops.inactive_shop_ids()
+        with tracing.span("order.check_availability", "inactive shops"):
+            unavailable = bool(inactive) and basket.ordered_items.filter(
+                product_info__shop_id__in=inactive,
+            ).exists()
+        if unavailable:
+            metrics.ORDERS_REJECTED.labels('inactive_shop').inc()
+            return Response(
+                {'error': 'В корзине есть товары магазинов, которые сейчас не принимают заказы.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         contact_id = request.data.get('contact_id')
         if not contact_id:
+            metrics.ORDERS_REJECTED.labels('contact').inc()
             return Response(
                 {'error': 'Нужно указать "contact_id".'},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -210,21 +448,108 @@ class OrderViewSet(viewsets.ModelViewSet):
         try:
             contact = Contact.objects.get(id=contact_id, user=user)
         except Contact.DoesNotExist:
+            metrics.ORDERS_REJECTED.labels('contact').inc()
             return Response(
                 {'error': 'Контакт не найден или не принадлежит пользователю.'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Обновляем заказ: ставим контакт и статус
-        basket.contact = contact
-        basket.status = 'new'  # или 'confirmed' — как у тебя в ТЗ
-        basket.save()
+        with tracing.span("order.place", "basket -> new"), transaction.atomic():
+            # корзина перечитывается под блокировкой строки: второй confirm
+            # (двойной клик) и изменения корзины (basket POST/DELETE) ждут
+            # конца транзакции, а оформленную корзину повторно не оформить
+            basket = Order.objects.select_for_update().filter(
+                pk=basket.pk, status=Order.STATUS_BASKET,
+            ).first()
+            if basket is None:
+                metrics.ORDERS_REJECTED.labels('empty_basket').inc()
+                return Response(
+                    {'error': 'Корзина уже оформлена.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            # Обновляем заказ: ставим контакт и статус
+            basket.contact = contact
+            basket.status = 'new'  # или 'confirmed' — как у тебя в ТЗ
+            basket.confirmed_at = timezone.now()
+            basket.save()
+
+            # позиции каждого магазина — в его подзаказ (shop/shop_orders.py)
+            with tracing.span("order.split", "per-shop sub-orders"):
+                created = shop_orders.split(basket)
+            if not created:
+                # позиции удалили после проверки выше — заказ не оформляется
+                transaction.set_rollback(True)
+                metrics.ORDERS_REJECTED.labels('empty_basket').inc()
+                return Response(
+                    {'error': 'Нельзя оформить заказ с пустой корзиной.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        with tracing.span("order.notify", "send_order_emails"):
+            # 👉 ВАЖНО: вместо синхронной отправки писем — Celery-задача
+            # (Celery импортируется при первом заказе, а не при старте веб-процесса);
+            # с задачей уходит контекст трассы запроса (CeleryIntegration)
+            from .tasks import send_order_emails
+            send_order_emails.delay(order_id=basket.id, user_id=user.id)
+
+        metrics.ORDERS_CONFIRMED.inc()
+        return Response(self._order_data(basket), status=status.HTTP_200_OK)
+
+def _filter_orders(qs, params):
+    """
+    Общие фильтры списков заказов: ?status=a,b, ?created_from=, ?created_to=.
+    При некорректной дате — 400 {"error": ...}.
+    """
+    statuses = params.get('status')
+    if statuses:
+        qs = qs.filter(status__in=[s for s in statuses.split(',') if s])
+
+    created_from = params.get('created_from')
+    if created_from:
+        bound = _parse_date_bound(created_from)
+        if bound is None:
+            raise InvalidQueryParam('created_from')
+        qs = qs.filter(created_at__gte=bound)
 
-        # 👉 ВАЖНО: вместо синхронной отправки писем — Celery-задача
-        send_order_emails.delay(order_id=basket.id, user_id=user.id)
+    created_to = params.get('created_to')
+    if created_to:
+        bound = _parse_date_bound(created_to, end=True)
+        if bound is None:
+            raise InvalidQueryParam('created_to')
+        qs = qs.filter(created_at__lt=bound)
+
+    return qs
+
+
+def _parse_date_bound(value, end=False):
+    """
+    Разбирает дату ('2025-01-31') или дату-время в ISO-формате.
+
+    Для даты без времени при end=True возвращает начало следующего дня,
+    чтобы фильтр created_at < bound включал весь указанный день.
+    Возвращает aware datetime или None, если значение не распознано.
+    """
+    try:
+        moment = parse_datetime(value)
+        day = None if moment else parse_date(value)
+    except ValueError:
+        return None
+
+    if moment is None:
+        if day is None:
+            return None
+        moment = datetime.combine(day, time.min)
+        if end:
+            moment += timedelta(days=1)
+    elif end:
+        # для точного времени граница включительная
+        moment += timedelta(microseconds=1)
+
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
 
-        serializer = OrderSerializer(basket)
-        return Response(serializer.data, status=status.HTTP_200_OK)
 
 class ContactViewSet(viewsets.ModelViewSet):
     serializer_class = ContactSerializer
@@ -249,7 +574,7 @@ class RegisterView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
     permission_classes = [AllowAny]
 
-class ProductInfoListView(ListAPIView):
+class ProductInfoListView(TracedListMixin, ListAPIView):
     """
     Эндпоинт для списка товарных предложений.
 
@@ -259,7 +584,7 @@ class ProductInfoListView(ListAPIView):
         товары только из указанного магазина
 
     - ?category_id=3
-        товары только указанной категории
+        товары указанной категории и всех её подкатегорий
 
     - ?search=iphone
         поиск по названию товара (product.name, регистронезависимо)
@@ -274,25 +599,34 @@ class ProductInfoListView(ListAPIView):
     - ?parameter=Диагональ (дюйм)&value=6.5
         фильтр по параметру товара (через ProductParameter)
 
+    - ?parameter=Встроенная память (Гб)&value_min=128&value_max=512
+        диапазон по числовому значению параметра (ProductParameter.value_num)
+
+    - ?order_by_parameter=Диагональ (дюйм)   (или с "-" для убывания)
+        сортировка по числовому значению параметра
+
     Все фильтры можно комбинировать, например:
     /api/v1/products-info/?shop_id=1&category_id=2&in_stock=1&price_max=120000
     """
     serializer_class = ProductInfoSerializer
     permission_classes = [AllowAny]
 
+    def list(self, request, *args, **kwargs):
+        # ?category_id=N / ?shop_id=N — из готового снимка, если он актуален
+        # (CATALOG_SNAPSHOTS_ENABLED, shop/catalog_snapshots.py)
+        response = catalog_snapshots.serve(request)
+        if response is not None:
+            return response
+        return super().list(request, *args, **kwargs)
+
     def get_queryset(self):
         """
-        Базовый queryset:
+        Базовый queryset — catalog_offers():
         - подгружаем связанные product, shop, category через select_related
         - подгружаем параметры товара через prefetch_related('parameters')
+        - скрываем предложения магазинов, которые не принимают заказы
         """
-        qs = ProductInfo.objects.select_related(
-            'product',
-            'shop',
-            'product__category',
-        ).prefetch_related(
-            'parameters',
-        )
+        qs = catalog_offers()
 
         params = self.request.query_params
 
@@ -304,7 +638,7 @@ class ProductInfoListView(ListAPIView):
         # --- фильтр по категории ---
         category_id = params.get('category_id')
         if category_id:
-            qs = qs.filter(product__category_id=category_id)
+            qs = _filter_category_subtree(qs, category_id, prefix='product__category__')
 
         # --- поиск по названию товара ---
         search = params.get('search')
@@ -325,14 +659,33 @@ class ProductInfoListView(ListAPIView):
         if in_stock in ('1', 'true', 'True', 'yes', 'on'):
             qs = qs.filter(quantity__gt=0)
 
-        # --- фильтр по параметру товара ---
+        # --- фильтр по параметру товара (точное значение и/или числовой диапазон) ---
         param_name = params.get('parameter')
-        param_value = params.get('value')
-        if param_name and param_value:
-            qs = qs.filter(
-                parameters__parameter__name=param_name,
-                parameters__value=param_value,
-            ).distinct()
+        if param_name:
+            lookups = {}
+            if params.get('value'):
+                lookups['parameters__value'] = params['value']
+            for name, lookup in (('value_min', 'gte'), ('value_max', 'lte')):
+                if params.get(name):
+                    number = parse_number(params[name])
+                    if number is None:
+                        raise InvalidQueryParam(name)
+                    lookups[f'parameters__value_num__{lookup}'] = number
+            if lookups:
+                # все условия в одном filter() — к одной строке ProductParameter
+                qs = qs.filter(parameters__parameter__name=param_name, **lookups).distinct()
+
+        # --- сортировка по числовому параметру ---
+        order_param = params.get('order_by_parameter')
+        if order_param:
+            descending = order_param.startswith('-')
+            value_num = ProductParameter.objects.filter(
+                product_info=OuterRef('pk'),
+                parameter__name=order_param.lstrip('-'),
+            ).values('value_num')[:1]
+            sort_value = F('sort_value').desc(nulls_last=True) if descending \
+                else F('sort_value').asc(nulls_last=True)
+            qs = qs.annotate(sort_value=Subquery(value_num)).order_by(sort_value, 'id')
 
         return qs
 
@@ -343,3 +696,371 @@ class SentryDebugAPIView(APIView):
         # Специально вызываем необработанное исключение
         raise RuntimeError("Sentry test: intentional exception")
         # return Response({"ok": True})
+
+
+class PartnerShopMixin:
+    """
+    Для эндпоинтов магазина-партнёра: магазин определяется по владельцу
+    (Shop.user). Администратор может указать ?shop_id= явно.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_shop(self):
+        if not hasattr(self, '_shop'):
+            user = self.request.user
+            shop_id = self.request.query_params.get('shop_id')
+            if user.is_staff and shop_id:
+                shop = Shop.objects.filter(id=shop_id).first()
+            else:
+                shop = Shop.objects.filter(user=user).first()
+            if shop is None:
+                raise PermissionDenied('Доступно только магазинам-партнёрам.')
+            self._shop = shop
+        return self._shop
+
+
+class PartnerOrderViewSet(PartnerShopMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Заказы, в которых есть товары магазина текущего партнёра
+    (подзаказы ShopOrder, создаются при оформлении).
+
+    GET /api/v1/partner/orders/          — список (фильтры как у истории заказов,
+                                           keyset-пагинация ?cursor=)
+    GET /api/v1/partner/orders/{id}/     — один заказ
+    GET /api/v1/partner/orders/stats/    — продажи по дням или товарам
+
+    В каждом заказе видны только позиции этого магазина и сумма по ним.
+    """
+    serializer_class = PartnerOrderSerializer
+    pagination_class = KeysetPagination
+    queryset = Order.objects.all()
+
+    def get_queryset(self):
+        shop = self.get_shop()
+        # подзаказы магазина (shop/shop_orders.py): заказы, сумма и позиции
+        # находятся по индексу shop_id, без просмотра чужих позиций
+        return (
+            Order.objects
+            .filter(shop_orders__shop=shop)
+            .exclude(status=Order.STATUS_BASKET)
+            .select_related('contact')
+            .annotate(shop_total=F('shop_orders__total'))
+            .prefetch_related(
+                Prefetch(
+                    'ordered_items',
+                    queryset=OrderItem.objects.filter(shop_order__shop=shop).select_related('product_info__product'),
+                    to_attr='shop_items',
+                )
+            )
+        )
+
+    def filter_queryset(self, queryset):
+        if self.action == 'list':
+            queryset = _filter_orders(queryset, self.request.query_params)
+        return queryset
+
+    @action(detail=False, methods=['get'], url_path='stats')
+    def stats(self, request, *args, **kwargs):
+        """
+        Продажи магазина (выручка и штуки), сгруппированные в SQL.
+
+        Query-параметры:
+        - ?date_from=2025-01-01&date_to=2025-01-31  (по умолчанию — последние 30 дней)
+        - ?group_by=day|product                      (по умолчанию day)
+        - ?source=live|rollup  — считать по OrderItem или по дневной свёртке
+          ShopDailySales (по умолчанию — настройка PARTNER_STATS_USE_ROLLUP)
+        """
+        shop = self.get_shop()
+        params = request.query_params
+
+        group_by = params.get('group_by', analytics.GROUP_BY_DAY)
+        if group_by not in analytics.GROUP_BY_CHOICES:
+            return Response(
+                {'error': 'group_by должен быть "day" или "product".'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # сначала разбираются обе границы: parse_date() на мусоре возвращает None,
+        # и значение по умолчанию для date_from можно считать только от настоящей даты
+        try:
+            date_to = parse_date(params['date_to']) if params.get('date_to') else timezone.now().date()
+            date_from = parse_date(params['date_from']) if params.get('date_from') else None
+        except ValueError:
+            date_from = date_to = None
+        if date_to is not None and date_from is None and not params.get('date_from'):
+            date_from = date_to - timedelta(days=29)
+        if date_from is None or date_to is None or date_from > date_to:
+            return Response(
+                {'error': 'Некорректный период "date_from" / "date_to".'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        source = params.get('source')
+        if source is None:
+            source = 'rollup' if settings.PARTNER_STATS_USE_ROLLUP else 'live'
+        sales = analytics.rollup_sales if source == 'rollup' else analytics.live_sales
+        rows = sales(shop, date_from, date_to, group_by)
+
+        return Response({
+            'shop': shop.id,
+            'date_from': date_from,
+            'date_to': date_to,
+            'group_by': group_by,
+            'source': source,
+            'totals': {
+                'units': sum(row['units'] for row in rows),
+                'revenue': sum(row['revenue'] for row in rows),
+            },
+            'results': rows,
+        })
+
+
+class PartnerShopViewSet(PartnerShopMixin, viewsets.GenericViewSet):
+    """
+    Управление своим магазином.
+
+    GET  /api/v1/partner/shop/               — магазин текущего партнёра
+    POST /api/v1/partner/shop/status/        — {"is_active": false} приём заказов вкл/выкл
+    POST /api/v1/partner/shop/reset-stock/   — обнулить остатки всех предложений
+    """
+    serializer_class = PartnerShopSerializer
+    queryset = Shop.objects.all()
+
+    def list(self, request, *args, **kwargs):
+        return Response(self.get_serializer(self.get_shop()).data)
+
+    @action(detail=False, methods=['post'], url_path='status')
+    def set_status(self, request, *args, **kwargs):
+        shop = self.get_shop()
+        serializer = self.get_serializer(shop, data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        # save() (а не update()) — чтобы сработал сигнал и сбросился кэш active_shops
+        serializer.save()
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['post'], url_path='reset-stock')
+    def reset_stock(self, request, *args, **kwargs):
+        shop = self.get_shop()
+        in_stock = ProductInfo.objects.filter(shop=shop, quantity__gt=0)
+        with transaction.atomic():
+            # прежние цена и остаток — для истории (как в PartnerStockView)
+            offers = list(
+                in_stock.only('id', 'shop_id', 'quantity', 'price').annotate(
+                    category_id=F('product__category_id'),
+                ).select_for_update(of=('self',))
+            )
+            previous = {offer.id: (offer.price, offer.quantity) for offer in offers}
+            category_ids = {offer.category_id for offer in offers}
+            # один UPDATE на все предложения магазина
+            updated = ProductInfo.objects.filter(pk__in=list(previous)).update(quantity=0)
+            for offer in offers:
+                offer.quantity = 0
+            price_history.record(offers, previous)
+            category_counts.refresh(category_ids)
+        if updated:
+            catalog_cache.invalidate_offers(shop.id, category_ids)
+        return Response({'shop': shop.id, 'updated': updated})
+
+
+# ProductInfo.price: max_digits=10, decimal_places=2
+MAX_STOCK_PRICE = Decimal(10) ** 8
+
+
+def _parse_stock_rows(items):
+    """
+    Разбирает строки {"external_id", "quantity", "price"} для массового обновления.
+
+    Валидация ручная (без сериализатора на каждую строку), чтобы тысячи
+    строк разбирались за миллисекунды. Возвращает {external_id: (quantity, price)},
+    где отсутствующее поле — None; при повторе external_id побеждает последняя строка.
+    """
+    rows = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValidationError({'error': f'Строка {index}: ожидается объект.'})
+        try:
+            external_id = int(item['external_id'])
+            quantity = item.get('quantity')
+            quantity = None if quantity is None else int(quantity)
+            price = item.get('price')
+            if price is not None:
+                price = Decimal(str(price))
+                # NaN / Infinity и цены, не влезающие в ProductInfo.price (max_digits=10)
+                if not price.is_finite() or abs(price) >= MAX_STOCK_PRICE:
+                    raise ValueError(price)
+                price = price.quantize(Decimal('0.01'))
+            negative = (quantity is not None and quantity < 0) or (price is not None and price < 0)
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            raise ValidationError(
+                {'error': f'Строка {index}: нужны целые "external_id"/"quantity" и число "price" '
+                          f'меньше {MAX_STOCK_PRICE}.'}
+            )
+        if quantity is None and price is None:
+            raise ValidationError({'error': f'Строка {index}: укажите "quantity" и/или "price".'})
+        if negative:
+            raise ValidationError({'error': f'Строка {index}: значения не могут быть отрицательными.'})
+        rows[external_id] = (quantity, price)
+    return rows
+
+
+class PartnerStockView(PartnerShopMixin, APIView):
+    """
+    Массовое обновление остатков и цен магазина текущего партнёра.
+
+    POST /api/v1/partner/stock/
+    {
+      "items": [
+        {"external_id": 4216292, "quantity": 12, "price": "110000.00"},
+        {"external_id": 4216313, "quantity": 0}
+      ]
+    }
+
+    Строки сопоставляются по (shop, external_id). Всё применяется в одной
+    транзакции: один SELECT ... FOR UPDATE нужных предложений и bulk_update
+    только изменившихся строк и колонок. В ответе — количество обновлённых,
+    неизменных и неизвестных external_id.
+    """
+
+    def post(self, request, *args, **kwargs):
+        shop = self.get_shop()
+
+        items = request.data.get('items')
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'Поле "items" должно быть непустым списком.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > settings.PARTNER_STOCK_MAX_ROWS:
+            return Response(
+                {'error': f'Не больше {settings.PARTNER_STOCK_MAX_ROWS} строк за запрос.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        rows = _parse_stock_rows(items)
+        distinct = len(rows)
+
+        with tracing.span("stock.update", f"{len(rows)} rows"), transaction.atomic():
+            # строки блокируются до конца транзакции: параллельное обновление
+            # того же предложения ждёт, а не перезаписывает его старым значением
+            offers = ProductInfo.objects.filter(
+                shop=shop, external_id__in=list(rows),
+            ).only('id', 'shop_id', 'external_id', 'quantity', 'price').annotate(
+                # категория — для пометки устаревших снимков каталога, тем же запросом
+                category_id=F('product__category_id'),
+            ).select_for_update(of=('self',))
+
+            changed = []
+            fields = set()
+            previous = {}
+            # предложения, которые появились в наличии или закончились
+            stock_flipped = []
+            for offer in offers:
+                quantity, price = rows.pop(offer.external_id)
+                previous[offer.id] = (offer.price, offer.quantity)
+                dirty = False
+                if quantity is not None and offer.quantity != quantity:
+                    if (offer.quantity > 0) != (quantity > 0):
+                        stock_flipped.append(offer.id)
+                    offer.quantity = quantity
+                    fields.add('quantity')
+                    dirty = True
+                if price is not None and offer.price != price:
+                    offer.price = price
+                    fields.add('price')
+                    dirty = True
+                if dirty:
+                    changed.append(offer)
+
+            if changed:
+                # пишутся только колонки, которые хоть где-то изменились
+                ProductInfo.objects.bulk_update(changed, sorted(fields), batch_size=1000)
+            price_history.record(changed, previous)
+            if shop.is_active:
+                category_counts.refresh_for_offers(stock_flipped)
+
+        if changed:
+            catalog_cache.invalidate_offers(shop.id, {offer.category_id for offer in changed})
+
+        # в rows остались external_id, которых у магазина нет
+        unknown = sorted(rows)
+        return Response({
+            'received': len(items),
+            'updated': len(changed),
+            'unchanged': distinct - len(changed) - len(unknown),
+            'unknown': len(unknown),
+            'unknown_ids': unknown[:100],
+        })
+
+
+def _filter_history(qs, params):
+    """?date_from= / ?date_to= (дата или дата-время, включительно) по recorded_at."""
+    for name, lookup, end in (('date_from', 'recorded_at__gte', False), ('date_to', 'recorded_at__lt', True)):
+        value = params.get(name)
+        if value:
+            bound = _parse_date_bound(value, end=end)
+            if bound is None:
+                raise InvalidQueryParam(name)
+            qs = qs.filter(**{lookup: bound})
+    return qs
+
+
+class ProductInfoHistoryView(ListAPIView):
+    """
+    История цены и остатка предложения, от новых записей к старым.
+
+    GET /api/v1/products-info/{id}/history/?date_from=2025-01-01&date_to=2025-12-31
+
+    Старые периоды хранятся по дням: price — последняя цена дня,
+    price_min / price_max — диапазон за день.
+    """
+    serializer_class = PriceHistorySerializer
+    pagination_class = PriceHistoryPagination
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        qs = PriceHistory.objects.filter(product_info_id=self.kwargs['pk'])
+        return _filter_history(qs, self.request.query_params)
+
+
+class ProductInfoRelatedView(ListAPIView):
+    """
+    Предложения, которые чаще всего покупали вместе с данным.
+
+    GET /api/v1/products-info/{id}/related/
+
+    Список заранее посчитан задачей refresh_related_products
+    (shop/recommendations.py) и читается одним запросом по индексу;
+    предложения магазинов, которые не принимают заказы, скрываются.
+    """
+    serializer_class = RelatedProductInfoSerializer
+    pagination_class = None
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        qs = (
+            RelatedProductInfo.objects.filter(product_info_id=self.kwargs['pk'])
+            .select_related('related__product', 'related__shop')
+            .order_by('rank')
+        )
+        inactive = active_shops.inactive_shop_ids()
+        if inactive:
+            qs = qs.exclude(related__shop_id__in=inactive)
+        return qs
+
+
+class PartnerStockHistoryView(PartnerShopMixin, ListAPIView):
+    """
+    История цен и остатков всех предложений магазина партнёра.
+
+    GET /api/v1/partner/stock/history/?date_from=...&date_to=...&external_id=...
+    """
+    serializer_class = PriceHistorySerializer
+    pagination_class = PriceHistoryPagination
+
+    def get_queryset(self):
+        qs = PriceHistory.objects.filter(shop=self.get_shop())
+        external_id = self.request.query_params.get('external_id')
+        if external_id:
+            qs = qs.filter(product_info__external_id=external_id)
+        return _filter_history(qs, self.request.query_params)
+